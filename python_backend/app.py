@@ -1,11 +1,48 @@
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import asyncio
-from main import MedicalAIOrchestrator
+import json
+import logging
+import threading
+from utils.deadline import Deadline
+from utils.metrics import STARTUP_PROFILE, render_metrics, span, startup_step, track_request
+with startup_step("import.main"):
+    from main import MedicalAIOrchestrator
+    from patient_data_processor.case_result_cache import IdempotencyKeyConflict
 from config import Config
 
-app = FastAPI()
+# Components are built lazily; the lifespan hook warms them up in the background
+orchestrator = MedicalAIOrchestrator(Config())
+warm_up_state = {"state": "pending" if Config.WARM_UP_ON_STARTUP else "lazy", "error": None}
+# Set once the worker can take traffic; serve.py waits on it during rolling restarts
+warm_up_done = threading.Event()
+
+async def _warm_up():
+    warm_up_state["state"] = "warming"
+    try:
+        with startup_step("warm_up"):
+            await asyncio.to_thread(orchestrator.warm_up)
+        warm_up_state["state"] = "ready"
+    except Exception as e:
+        logging.error(f"Orchestrator warm-up failed: {e}")
+        warm_up_state["state"] = "failed"
+        warm_up_state["error"] = str(e)
+    finally:
+        warm_up_done.set()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_up_task = asyncio.create_task(_warm_up()) if Config.WARM_UP_ON_STARTUP else None
+    if warm_up_task is None:
+        warm_up_done.set()
+    yield
+    if warm_up_task and not warm_up_task.done():
+        warm_up_task.cancel()
+    await asyncio.to_thread(orchestrator.shutdown)
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -19,22 +56,82 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-orchestrator = MedicalAIOrchestrator(Config())
-
-class PatientCaseRequest(BaseModel):
+class PatientCase(BaseModel):
     medical_report_text: str
     current_symptoms: list[str]
 
+class PatientCaseRequest(PatientCase):
+    include_timings: bool = False
+    # Overrides Config.CASE_DEADLINE_SECONDS for this case
+    deadline_seconds: float | None = None
+    # "full" or "snippets"; overrides Config.RETRIEVAL_MODE for this case
+    retrieval_mode: str | None = None
+
+class PatientCasesRequest(BaseModel):
+    cases: list[PatientCase]
+    include_timings: bool = False
+
 @app.post("/process_case/")
-async def process_case(req: PatientCaseRequest):
-    try:
-        result = await orchestrator.process_patient_case(
-            req.medical_report_text,
-            req.current_symptoms
-        )
-        return {"status": "success", "result": result}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+async def process_case(req: PatientCaseRequest, http_response: Response,
+                       idempotency_key: str | None = Header(default=None, alias="Idempotency-Key")):
+    deadline = Deadline(req.deadline_seconds if req.deadline_seconds is not None else Config.CASE_DEADLINE_SECONDS)
+    with track_request() as timings:
+        try:
+            with span("process_case", kind="request"):
+                result = await orchestrator.process_patient_case(
+                    req.medical_report_text,
+                    req.current_symptoms,
+                    deadline=deadline,
+                    retrieval_mode=req.retrieval_mode,
+                    idempotency_key=idempotency_key
+                )
+            response = {"status": "success", "result": result}
+        except IdempotencyKeyConflict as e:
+            http_response.status_code = 409
+            response = {"status": "error", "message": str(e)}
+        except Exception as e:
+            response = {"status": "error", "message": str(e)}
+    if deadline.bounded or deadline.degradations:
+        response["degradations"] = deadline.degradations
+    if req.include_timings:
+        response["timings"] = timings.as_dict()
+    return response
+
+@app.post("/process_cases/")
+async def process_cases(req: PatientCasesRequest):
+    """Processes a batch of cases with shared search, crawling and summarization."""
+    if len(req.cases) > Config.MAX_BATCH_CASES:
+        return {"status": "error", "message": f"At most {Config.MAX_BATCH_CASES} cases per batch."}
+    with track_request() as timings:
+        try:
+            with span("process_cases", kind="request"):
+                results = await orchestrator.process_patient_cases([case.model_dump() for case in req.cases])
+            response = {"status": "success", "results": results}
+        except Exception as e:
+            response = {"status": "error", "message": str(e)}
+    if req.include_timings:
+        response["timings"] = timings.as_dict()
+    return response
+
+@app.get("/metrics")
+async def metrics():
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def ready():
+    """Readiness: 200 once warm-up has finished (or when running lazily), 503 before."""
+    is_ready = warm_up_state["state"] in ("ready", "lazy")
+    body = {
+        "status": warm_up_state["state"],
+        "error": warm_up_state["error"],
+        "components": orchestrator.component_status(),
+        "startup_profile": dict(STARTUP_PROFILE),
+    }
+    return Response(content=json.dumps(body), media_type="application/json", status_code=200 if is_ready else 503)
 
 #run uvicorn app:app --reload
 if __name__ == "__main__":
@@ -0,0 +1,131 @@
+# benchmarks/fixtures.py
+import random
+import sqlite3
+
+# Deterministic input generators for the microbenchmarks. Every generator takes a
+# size and a seed so that two runs (or two commits) benchmark identical inputs.
+
+DISEASES = ["diabetes", "hypertension", "fever", "flu", "migraine", "cancer", "infection"]
+SYMPTOMS = ["headache", "fatigue", "nausea", "vomiting", "cough", "runny nose", "blurred vision",
+            "frequent urination", "increased thirst"]
+DRUGS = ["metformin", "lisinopril", "paracetamol", "ibuprofen", "penicillin", "aspirin", "amlodipine"]
+LAB_TESTS = ["A1C", "Fasting Glucose", "Cholesterol", "Blood Pressure", "Creatinine", "Hemoglobin"]
+FILLER = ["the", "patient", "reported", "clinical", "study", "results", "showed", "significant",
+          "improvement", "after", "weeks", "of", "therapy", "in", "most", "adults", "with", "chronic"]
+RELATION_PHRASES = ["treats", "is used for", "caused by", "symptom of", "side effect", "can cause"]
+ONTOLOGY_TERMS = ["hypertension", "diabetes mellitus", "myocardial infarction", "unstable angina",
+                  "prediabetes", "headache", "fever"]
+DOMAINS = ["www.mayoclinic.org", "webmd.com", "medlineplus.gov", "example.edu", "health.example.com",
+           "random-blog.net", "unknown.xyz", "www.nih.gov"]
+
+
+def _rng(seed: int) -> random.Random:
+    return random.Random(seed)
+
+
+def make_medical_report(num_items: int, seed: int = 0) -> str:
+    """A report in the format MedicalReportParser expects, with num_items entries per list field."""
+    rng = _rng(seed)
+    diagnoses = ", ".join(rng.choice(DISEASES).title() for _ in range(num_items))
+    medications = ", ".join(f"{rng.choice(DRUGS).title()} {rng.choice([5, 10, 25, 500])}mg QD" for _ in range(num_items))
+    symptoms = ", ".join(rng.choice(SYMPTOMS) for _ in range(num_items))
+    labs = ", ".join(f"{rng.choice(LAB_TESTS)} {rng.randint(50, 200)} mg/dL" for _ in range(num_items))
+    return (
+        "Patient Name: Jane Smith\n"
+        "Date of Birth: 1972-08-22\n"
+        "Last Visit: 2025-01-10\n"
+        f"Diagnosis: {diagnoses}\n"
+        f"Medications: {medications}\n"
+        "Allergies: Penicillin\n"
+        f"Previous Symptoms: {symptoms}\n"
+        f"Lab Results (Recent): {labs}.\n"
+    )
+
+
+def make_keywords(num_keywords: int, seed: int = 0) -> list[str]:
+    """A keyword list mixing ontology terms, free-text symptoms and noise."""
+    rng = _rng(seed)
+    pool = ONTOLOGY_TERMS + SYMPTOMS + DISEASES
+    keywords = []
+    for i in range(num_keywords):
+        term = rng.choice(pool)
+        if i % 3 == 0:
+            term = f"Severe {term.title()}!"
+        keywords.append(term)
+    return keywords
+
+
+def make_medical_text(num_sentences: int, seed: int = 0) -> str:
+    """Running medical prose containing entities and relation cue phrases."""
+    rng = _rng(seed)
+    sentences = []
+    for _ in range(num_sentences):
+        words = rng.sample(FILLER, 6)
+        head = rng.choice(DRUGS + SYMPTOMS)
+        tail = rng.choice(DISEASES + SYMPTOMS)
+        sentence = f"{' '.join(words[:3]).capitalize()} {head} {rng.choice(RELATION_PHRASES)} {tail} {' '.join(words[3:])}."
+        sentences.append(sentence)
+    return " ".join(sentences)
+
+
+def make_html(num_paragraphs: int, seed: int = 0) -> str:
+    """An article-like HTML page with navigation, nested content divs and a footer."""
+    rng = _rng(seed)
+    paragraphs = "\n".join(f"<p>{make_medical_text(3, seed=rng.randint(0, 10**6))}</p>" for _ in range(num_paragraphs))
+    return (
+        "<html><head><title>Condition overview</title></head><body>"
+        "<div class='navbar'><a href='/'>Home</a><a href='/a'>A-Z</a></div>"
+        f"<main><article><div class='content'>{paragraphs}</div></article></main>"
+        "<div class='footer'>Copyright</div>"
+        "</body></html>"
+    )
+
+
+def make_urls(num_urls: int, seed: int = 0) -> list[str]:
+    rng = _rng(seed)
+    return [f"https://{rng.choice(DOMAINS)}/conditions/{rng.randint(0, 10**6)}" for _ in range(num_urls)]
+
+
+def make_entities(text: str) -> list[dict]:
+    """Entity dicts in the MedicalEntityExtractor.extract format, found by exact matching."""
+    lowered = text.lower()
+    entities = []
+    for label, terms in (("DRUG", DRUGS), ("SYMPTOM", SYMPTOMS), ("DISEASE", DISEASES)):
+        for term in terms:
+            start = lowered.find(term)
+            while start != -1:
+                entities.append({"text": term, "label": label, "start": start, "end": start + len(term)})
+                start = lowered.find(term, start + 1)
+    return entities
+
+
+def populate_knowledge_graph(db_path: str, num_conditions: int, symptoms_per_condition: int = 5, seed: int = 0):
+    """
+    Bulk-loads a synthetic graph of num_conditions diseases, each with its own
+    SYMPTOM_OF symptoms and a TREATS drug, directly through sqlite.
+    """
+    rng = _rng(seed)
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        num_symptoms = max(symptoms_per_condition * 4, num_conditions // 2)
+        entities = [(f"condition {i}", "DISEASE", "benchmark") for i in range(num_conditions)]
+        entities += [(f"symptom {i}", "SYMPTOM", "benchmark") for i in range(num_symptoms)]
+        entities += [(f"drug {i}", "DRUG", "benchmark") for i in range(num_conditions)]
+        cursor.executemany("INSERT OR IGNORE INTO entities (text, label, source_url) VALUES (?, ?, ?)", entities)
+        ids = dict(cursor.execute("SELECT text, id FROM entities"))
+        relations = []
+        for i in range(num_conditions):
+            condition_id = ids[f"condition {i}"]
+            for s in rng.sample(range(num_symptoms), symptoms_per_condition):
+                relations.append((ids[f"symptom {s}"], "SYMPTOM_OF", condition_id, "benchmark"))
+            relations.append((ids[f"drug {i}"], "TREATS", condition_id, "benchmark"))
+            if i:
+                relations.append((ids[f"drug {i}"], "INTERACTS_WITH", ids[f"drug {i - 1}"], "benchmark"))
+        cursor.executemany(
+            "INSERT INTO relations (head_id, relation_type, tail_id, source_url) VALUES (?, ?, ?, ?)",
+            relations
+        )
+        conn.commit()
+    finally:
+        conn.close()
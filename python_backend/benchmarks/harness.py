@@ -0,0 +1,139 @@
+# benchmarks/harness.py
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+
+class Benchmark:
+    """
+    A named benchmark parametrized by input size. `setup(size, workdir)` builds the
+    fixtures for one size and returns the zero-argument callable that is timed.
+    """
+    def __init__(self, name: str, setup, sizes: tuple[int, ...]):
+        self.name = name
+        self.setup = setup
+        self.sizes = sizes
+
+
+BENCHMARKS: list[Benchmark] = []
+
+
+def benchmark(name: str, sizes: tuple[int, ...]):
+    """Registers a setup function as a benchmark."""
+    def decorator(setup):
+        BENCHMARKS.append(Benchmark(name, setup, sizes))
+        return setup
+    return decorator
+
+
+def _time_loops(fn, loops: int) -> float:
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        return time.perf_counter() - start
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def measure(fn, repeats: int = 5, min_time: float = 0.1, memory: bool = False) -> dict:
+    """
+    Times fn like timeit: calibrates the loop count so one repeat takes at least
+    min_time seconds, then reports per-call statistics across repeats.
+    """
+    fn()  # Warm-up (imports, caches, lazy initialisation)
+    loops = 1
+    while True:
+        elapsed = _time_loops(fn, loops)
+        if elapsed >= min_time or loops >= 1_000_000:
+            break
+        loops *= 10 if elapsed < min_time / 10 else 2
+
+    per_call = [_time_loops(fn, loops) / loops for _ in range(repeats)]
+    result = {
+        "loops": loops,
+        "repeats": repeats,
+        "min_s": min(per_call),
+        "median_s": statistics.median(per_call),
+        "mean_s": statistics.fmean(per_call),
+        "stdev_s": statistics.stdev(per_call) if len(per_call) > 1 else 0.0,
+    }
+    if memory:
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        result["peak_bytes"] = peak
+    return result
+
+
+def _git_revision() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(__file__), timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment_info() -> dict:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "git_revision": _git_revision(),
+    }
+
+
+def save_results(path: str, results: list[dict]):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment_info(), "results": results}, f, indent=2)
+    logging.info(f"Wrote {len(results)} benchmark results to {path}")
+
+
+def load_results(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {(r["name"], r["size"]): r for r in data.get("results", []) if "median_s" in r}
+
+
+def compare_results(base_path: str, new_path: str, threshold: float = 0.10) -> int:
+    """
+    Prints a side-by-side comparison of two result files and returns the number of
+    benchmarks whose median got slower by more than `threshold` (as a fraction).
+    """
+    base = load_results(base_path)
+    new = load_results(new_path)
+    regressions = 0
+    print(f"{'benchmark':<40} {'size':>8} {'base (ms)':>12} {'new (ms)':>12} {'change':>9}")
+    for key in sorted(set(base) | set(new)):
+        name, size = key
+        if key not in base or key not in new:
+            side = "new only" if key in new else "base only"
+            print(f"{name:<40} {size:>8} {side:>35}")
+            continue
+        before = base[key]["median_s"]
+        after = new[key]["median_s"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif change < -threshold:
+            flag = "  improved"
+        print(f"{name:<40} {size:>8} {before * 1e3:>12.4f} {after * 1e3:>12.4f} {change:>+8.1%}{flag}")
+    return regressions
@@ -0,0 +1,232 @@
+# benchmarks/run_benchmarks.py
+import argparse
+import itertools
+import logging
+import os
+import sys
+import tempfile
+
+# Ensure the backend root is in sys.path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks import fixtures
+from benchmarks.harness import BENCHMARKS, benchmark, measure, save_results, compare_results
+
+ONTOLOGY_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'medical_ontology.json')
+TRUSTED_DOMAINS = ['mayoclinic.org', 'webmd.com', 'medlineplus.gov', 'healthline.com', 'who.int', 'cdc.gov', 'nih.gov']
+
+
+@benchmark("report_parser.parse", sizes=(5, 50, 500))
+def bench_report_parser(size, workdir):
+    from patient_data_processor.report_parser import MedicalReportParser
+    parser = MedicalReportParser()
+    report = fixtures.make_medical_report(size)
+    return lambda: parser.parse(report)
+
+
+@benchmark("query_expander.expand_queries", sizes=(10, 100, 1000))
+def bench_query_expander(size, workdir):
+    from information_retrieval.query_expander import QueryExpander
+    expander = QueryExpander(ontology_path=ONTOLOGY_PATH)
+    keywords = fixtures.make_keywords(size)
+    return lambda: expander.expand_queries(keywords)
+
+
+@benchmark("text_preprocessor.preprocess_for_search", sizes=(10, 100, 1000))
+def bench_preprocess_for_search(size, workdir):
+    from utils.text_preprocessing import TextPreprocessor
+    preprocessor = TextPreprocessor()
+    text = fixtures.make_medical_text(size)
+    return lambda: preprocessor.preprocess_for_search(text)
+
+
+@benchmark("text_preprocessor.normalize_medical_term", sizes=(100, 1000))
+def bench_normalize_medical_term(size, workdir):
+    from utils.text_preprocessing import TextPreprocessor
+    preprocessor = TextPreprocessor()
+    terms = fixtures.make_keywords(size)
+    return lambda: [preprocessor.normalize_medical_term(term) for term in terms]
+
+
+@benchmark("text_preprocessor.extract_keywords", sizes=(10, 100, 1000))
+def bench_extract_keywords(size, workdir):
+    from utils.text_preprocessing import TextPreprocessor
+    preprocessor = TextPreprocessor()
+    text = fixtures.make_medical_text(size)
+    return lambda: preprocessor.extract_keywords(text)
+
+
+@benchmark("web_crawler.parse_html", sizes=(10, 100, 1000))
+def bench_parse_html(size, workdir):
+    from data_ingestion.web_crawler import WebCrawler
+    crawler = WebCrawler(rate_limit_seconds=0)
+    html = fixtures.make_html(size)
+    return lambda: crawler.parse_html(html)
+
+
+@benchmark("entity_extractor.extract", sizes=(10, 100, 1000))
+def bench_entity_extractor(size, workdir):
+    from information_synthesis.entity_extractor import MedicalEntityExtractor
+    extractor = MedicalEntityExtractor()
+    text = fixtures.make_medical_text(size)
+    return lambda: extractor.extract(text)
+
+
+@benchmark("relation_extractor.extract", sizes=(10, 50, 200))
+def bench_relation_extractor(size, workdir):
+    from information_synthesis.relation_extractor import MedicalRelationExtractor
+    extractor = MedicalRelationExtractor()
+    text = fixtures.make_medical_text(size)
+    entities = fixtures.make_entities(text)
+    return lambda: extractor.extract(text, entities)
+
+
+@benchmark("entity_extractor.extract_spans", sizes=(10, 100, 1000))
+def bench_entity_extractor_spans(size, workdir):
+    from information_synthesis.entity_extractor import MedicalEntityExtractor
+    extractor = MedicalEntityExtractor()
+    text = fixtures.make_medical_text(size)
+    return lambda: extractor.extract_spans(text)
+
+
+@benchmark("relation_extractor.extract_spans", sizes=(10, 50, 200))
+def bench_relation_extractor_spans(size, workdir):
+    from information_synthesis.relation_extractor import MedicalRelationExtractor
+    from information_synthesis.spans import EntitySpans
+    extractor = MedicalRelationExtractor()
+    text = fixtures.make_medical_text(size)
+    entities = EntitySpans.from_dicts(fixtures.make_entities(text))
+    return lambda: extractor.extract_spans(text, entities)
+
+
+@benchmark("tesummarizer.textrank_summarize", sizes=(10, 100, 500))
+def bench_textrank(size, workdir):
+    from information_synthesis.tesummarizer import textrank_summarize
+    text = fixtures.make_medical_text(size)
+    return lambda: textrank_summarize(text, num_sentences=3)
+
+
+@benchmark("document.build", sizes=(10, 100, 1000))
+def bench_document_build(size, workdir):
+    # The extractor and TextRank benchmarks reuse one cached Document per text;
+    # this is the one-off tokenization they share
+    from utils.document import Document
+    text = fixtures.make_medical_text(size)
+    return lambda: Document(text)
+
+
+@benchmark("source_evaluator.evaluate_url", sizes=(100, 1000, 10000))
+def bench_source_evaluator(size, workdir):
+    from information_retrieval.source_evaluator import SourceEvaluator
+    evaluator = SourceEvaluator(trusted_domains=TRUSTED_DOMAINS)
+    urls = fixtures.make_urls(size)
+    return lambda: [evaluator.evaluate_url(url) for url in urls]
+
+
+def _knowledge_graph(size, workdir):
+    from information_synthesis.knowledge_graph import MedicalKnowledgeGraph
+    db_path = os.path.join(workdir, f"kg_{size}.db")
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    kg = MedicalKnowledgeGraph(db_path=db_path)
+    fixtures.populate_knowledge_graph(db_path, size)
+    return kg
+
+
+@benchmark("knowledge_graph.query_related_conditions", sizes=(100, 1000, 10000))
+def bench_kg_related_conditions(size, workdir):
+    kg = _knowledge_graph(size, workdir)
+    symptoms = [f"symptom {i}" for i in range(0, 20)]
+    return lambda: [kg.query_related_conditions(symptom) for symptom in symptoms]
+
+
+@benchmark("knowledge_graph.rank_conditions", sizes=(100, 1000, 10000))
+def bench_kg_rank_conditions(size, workdir):
+    kg = _knowledge_graph(size, workdir)
+    kg.condition_index()
+    symptoms = [f"symptom {i}" for i in range(0, 20)]
+    return lambda: kg.rank_conditions(symptoms)
+
+
+@benchmark("knowledge_graph.query_drugs_for_condition", sizes=(100, 1000, 10000))
+def bench_kg_drugs_for_condition(size, workdir):
+    kg = _knowledge_graph(size, workdir)
+    conditions = [f"condition {i}" for i in range(0, min(size, 20))]
+    return lambda: [kg.query_drugs_for_condition(condition) for condition in conditions]
+
+
+@benchmark("knowledge_graph.check_drug_interaction", sizes=(100, 1000, 10000))
+def bench_kg_drug_interaction(size, workdir):
+    kg = _knowledge_graph(size, workdir)
+    pairs = [(f"drug {i}", f"drug {i - 1}") for i in range(1, min(size, 21))]
+    return lambda: [kg.check_drug_interaction(a, b) for a, b in pairs]
+
+
+@benchmark("knowledge_graph.add_entities", sizes=(10, 100))
+def bench_kg_add_entities(size, workdir):
+    kg = _knowledge_graph(100, workdir)
+    counter = itertools.count()
+
+    def insert_batch():
+        batch = next(counter)
+        kg.add_entities([{"text": f"new entity {batch} {i}", "label": "SYMPTOM"} for i in range(size)])
+    return insert_batch
+
+
+@benchmark("knowledge_graph.add_relations", sizes=(10, 100))
+def bench_kg_add_relations(size, workdir):
+    kg = _knowledge_graph(1000, workdir)
+    relations = [
+        {"head": {"text": f"symptom {i}"}, "relation": "SYMPTOM_OF", "tail": {"text": f"condition {i}"}}
+        for i in range(size)
+    ]
+    return lambda: kg.add_relations(relations)
+
+
+def run(selected: list[str] | None, quick: bool, repeats: int, min_time: float, memory: bool) -> list[dict]:
+    results = []
+    with tempfile.TemporaryDirectory(prefix="medai_bench_") as workdir:
+        for bench in BENCHMARKS:
+            if selected and not any(pattern in bench.name for pattern in selected):
+                continue
+            sizes = bench.sizes[:1] if quick else bench.sizes
+            for size in sizes:
+                entry = {"name": bench.name, "size": size}
+                try:
+                    fn = bench.setup(size, workdir)
+                    entry.update(measure(fn, repeats=repeats, min_time=min_time, memory=memory))
+                    peak = f"  peak={entry['peak_bytes'] / 1024:.1f} KiB" if "peak_bytes" in entry else ""
+                    print(f"{bench.name:<45} size={size:<7} median={entry['median_s'] * 1e3:10.4f} ms"
+                          f"  ({entry['loops']} loops x {entry['repeats']}){peak}")
+                except Exception as e:
+                    # Missing optional dependencies or data (e.g. NLTK corpora) skip just this benchmark.
+                    entry["error"] = f"{type(e).__name__}: {' '.join(str(e).replace('*', '').split())[:160]}"
+                    print(f"{bench.name:<45} size={size:<7} SKIPPED ({entry['error']})")
+                results.append(entry)
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the CPU-bound python_backend modules.")
+    parser.add_argument("-k", "--filter", action="append", help="Only run benchmarks whose name contains this (repeatable).")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="Where to write the JSON results.")
+    parser.add_argument("--quick", action="store_true", help="Only run the smallest size of each benchmark.")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.1, help="Minimum seconds per repeat.")
+    parser.add_argument("--memory", action="store_true", help="Also record peak traced memory per call.")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="Compare two result files instead of running.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown reported as a regression.")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        regressions = compare_results(args.compare[0], args.compare[1], threshold=args.threshold)
+        return 1 if regressions else 0
+
+    results = run(args.filter, args.quick, args.repeats, args.min_time, args.memory)
+    save_results(args.output, results)
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(main())
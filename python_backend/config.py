@@ -9,6 +9,7 @@ class Config:
     GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
     SEARCH_API_KEY = os.getenv('SEARCH_API_KEY')
     SEARCH_API_ENDPOINT = os.getenv('SEARCH_API_ENDPOINT')
+    GEMINI_API_BASE_URL = os.getenv('GEMINI_API_BASE_URL', 'https://generativelanguage.googleapis.com/v1beta/models')
 
     # Trusted Medical Domains
     TRUSTED_MEDICAL_DOMAINS = [
@@ -19,29 +20,113 @@ class Config:
         'who.int',
         'cdc.gov',
         'nih.gov'
-    ]
+    ] + [d.strip() for d in os.getenv('EXTRA_TRUSTED_DOMAINS', '').split(',') if d.strip()]
 
     # Model Paths
     NER_MODEL_PATH = os.getenv('NER_MODEL_PATH', 'models/ner_model')
     REL_MODEL_PATH = os.getenv('REL_MODEL_PATH', 'models/rel_model')
     MEDICAL_ONTOLOGY_PATH = os.path.join(os.path.dirname(__file__), 'data', 'medical_ontology.json')
     KNOWLEDGE_GRAPH_DB_PATH = os.getenv('KNOWLEDGE_GRAPH_DB_PATH', 'data/knowledge_graph.db')
+    # Crawled articles, shared by all worker processes
+    ARTICLE_DB_PATH = os.getenv('ARTICLE_DB_PATH', 'data/medical_data.db')
 
+    # LLM tiers: fast model for per-source summaries and JSON formatting, strong model
+    # for the final recommendation (retried on the fast model after its deadline; 0 = no deadline)
+    LLM_FAST_MODEL = os.getenv('LLM_FAST_MODEL', 'gemini-2.0-flash-lite')
+    LLM_STRONG_MODEL = os.getenv('LLM_STRONG_MODEL', 'gemini-2.0-flash')
+    LLM_STRONG_DEADLINE_SECONDS = float(os.getenv('LLM_STRONG_DEADLINE_SECONDS', 20))
+    # Shortest timeout of a recommendation LLM call when the case deadline is nearly used up
+    LLM_MIN_CALL_TIMEOUT_SECONDS = float(os.getenv('LLM_MIN_CALL_TIMEOUT_SECONDS', 2))
+
+    # LLM calls in flight per worker (0 = unbounded); waiting calls are admitted by priority
+    # (urgent cases first, final recommendations before per-source summaries; utils/llm_scheduler.py)
+    LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 8))
+    # Symptoms that make a case urgent, comma-separated (empty = utils/llm_scheduler.py defaults)
+    LLM_URGENT_SYMPTOMS = [s.strip().lower() for s in os.getenv('LLM_URGENT_SYMPTOMS', '').split(',') if s.strip()]
     # Summarizer Configuration
     SUMMARIZER_MODEL_NAME = os.getenv('SUMMARIZER_MODEL_NAME', 'gpt-3.5-turbo')
+    # Read (and write through) per-article summaries in the article store instead of
+    # always calling the LLM; see data_ingestion/summarize_articles.py
+    MATERIALIZED_SUMMARIES_ENABLED = os.getenv('MATERIALIZED_SUMMARIES_ENABLED', 'True').lower() == 'true'
+    # Summarize several sources in one LLM call (prompt.packed_text) up to a token budget
+    PACKED_SUMMARIES_ENABLED = os.getenv('PACKED_SUMMARIES_ENABLED', 'False').lower() == 'true'
+    PACKED_SUMMARY_TOKEN_BUDGET = int(os.getenv('PACKED_SUMMARY_TOKEN_BUDGET', 8000))
+    PACKED_SUMMARY_MAX_DOCUMENTS = int(os.getenv('PACKED_SUMMARY_MAX_DOCUMENTS', 5))
 
     # Logging Configuration
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     LOG_FILE = os.getenv('LOG_FILE', 'app.log')
+    # Records are written as JSON lines from a background thread (utils/structured_logging.py);
+    # strings in a record are cut at LOG_MAX_FIELD_CHARS. LOG_SAMPLE_RATES keeps verbose
+    # per-stage records at the given rate, e.g. "parse_report=0.1,expand_queries=0.1".
+    # Values under the LOG_REDACT_FIELDS keys are replaced by their size, comma-separated
+    # (empty = the patient-data keys in utils/structured_logging.py).
+    LOG_JSON = os.getenv('LOG_JSON', 'True').lower() == 'true'
+    LOG_MAX_FIELD_CHARS = int(os.getenv('LOG_MAX_FIELD_CHARS', 2000))
+    LOG_SAMPLE_RATES = os.getenv('LOG_SAMPLE_RATES', 'parse_report=0.1,expand_queries=0.1')
+    LOG_REDACT_FIELDS = [f.strip() for f in os.getenv('LOG_REDACT_FIELDS', '').split(',') if f.strip()]
 
     # Search Configuration
     MAX_SEARCH_RESULTS = int(os.getenv('MAX_SEARCH_RESULTS', 10))
     SEARCH_TIMEOUT = int(os.getenv('SEARCH_TIMEOUT', 30))
+    # Search result cache (shared by all workers); negative = queries that returned no items
+    SEARCH_CACHE_ENABLED = os.getenv('SEARCH_CACHE_ENABLED', 'True').lower() == 'true'
+    SEARCH_CACHE_DB_PATH = os.getenv('SEARCH_CACHE_DB_PATH', 'data/search_cache.db')
+    SEARCH_CACHE_TTL_SECONDS = float(os.getenv('SEARCH_CACHE_TTL_SECONDS', 24 * 3600))
+    SEARCH_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv('SEARCH_CACHE_NEGATIVE_TTL_SECONDS', 3600))
+    # Search API quota shared by all workers: calls per day (reset at midnight Pacific) and
+    # per minute, and the most API calls (uncached queries) one case may make
+    SEARCH_QUOTA_ENABLED = os.getenv('SEARCH_QUOTA_ENABLED', 'True').lower() == 'true'
+    SEARCH_QUOTA_DB_PATH = os.getenv('SEARCH_QUOTA_DB_PATH', 'data/search_quota.db')
+    SEARCH_DAILY_QUOTA = int(os.getenv('SEARCH_DAILY_QUOTA', 10000))
+    SEARCH_PER_MINUTE_QUOTA = int(os.getenv('SEARCH_PER_MINUTE_QUOTA', 100))
+    SEARCH_MAX_QUERIES_PER_CASE = int(os.getenv('SEARCH_MAX_QUERIES_PER_CASE', 10))
+    CRAWLER_RATE_LIMIT_SECONDS = float(os.getenv('CRAWLER_RATE_LIMIT_SECONDS', 1))
+    # Pages are streamed and cut off after this many bytes
+    CRAWLER_MAX_BYTES = int(os.getenv('CRAWLER_MAX_BYTES', 2 * 1024 * 1024))
+    # Hedged requests (utils/hedging.py): duplicate a call that is slower than the given
+    # percentile of recent latencies; hedges are capped at HEDGE_MAX_RATE of all calls
+    HEDGE_MAX_RATE = float(os.getenv('HEDGE_MAX_RATE', 0.05))
+    HEDGE_LLM_ENABLED = os.getenv('HEDGE_LLM_ENABLED', 'False').lower() == 'true'
+    HEDGE_LLM_PERCENTILE = float(os.getenv('HEDGE_LLM_PERCENTILE', 0.95))
+    HEDGE_CRAWLER_ENABLED = os.getenv('HEDGE_CRAWLER_ENABLED', 'False').lower() == 'true'
+    HEDGE_CRAWLER_PERCENTILE = float(os.getenv('HEDGE_CRAWLER_PERCENTILE', 0.95))
+
+    # Per-report case state, so returning patients only pay for new symptoms/queries
+    CASE_STATE_ENABLED = os.getenv('CASE_STATE_ENABLED', 'True').lower() == 'true'
+    CASE_STATE_DB_PATH = os.getenv('CASE_STATE_DB_PATH', 'data/case_state.db')
+    CASE_STATE_TTL_SECONDS = float(os.getenv('CASE_STATE_TTL_SECONDS', 7 * 24 * 3600))
+    # Final results of whole cases, reused for identical resubmissions and retries (also
+    # looked up by the Idempotency-Key header of /process_case/)
+    CASE_RESULT_CACHE_ENABLED = os.getenv('CASE_RESULT_CACHE_ENABLED', 'True').lower() == 'true'
+    CASE_RESULT_CACHE_DB_PATH = os.getenv('CASE_RESULT_CACHE_DB_PATH', 'data/case_results.db')
+    CASE_RESULT_CACHE_TTL_SECONDS = float(os.getenv('CASE_RESULT_CACHE_TTL_SECONDS', 3600))
 
     # API Configuration
     API_HOST = os.getenv('API_HOST', '0.0.0.0')
     API_PORT = int(os.getenv('API_PORT', 5000))
     DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
+    # Number of worker processes for serve.py (0 = available CPUs / (1 + CPU_POOL_WORKERS))
+    WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 0))
+    # Directory where serve.py workers share their metrics ('' = a temporary directory per run)
+    METRICS_DIR = os.getenv('METRICS_DIR', '')
+    GRACEFUL_SHUTDOWN_SECONDS = float(os.getenv('GRACEFUL_SHUTDOWN_SECONDS', 30))
+    # Build all orchestrator components in the background at startup instead of on first request
+    WARM_UP_ON_STARTUP = os.getenv('WARM_UP_ON_STARTUP', 'True').lower() == 'true'
+    # "full": crawl and summarize sources; "snippets": evidence from search titles/snippets only
+    RETRIEVAL_MODE = os.getenv('RETRIEVAL_MODE', 'full')
+    # Per-case deadline in seconds (0 = none; a request may set its own). Search and crawl
+    # get these shares of the remaining time; the recommendation keeps the reserve.
+    CASE_DEADLINE_SECONDS = float(os.getenv('CASE_DEADLINE_SECONDS', 0))
+    DEADLINE_SEARCH_SHARE = float(os.getenv('DEADLINE_SEARCH_SHARE', 0.25))
+    DEADLINE_CRAWL_SHARE = float(os.getenv('DEADLINE_CRAWL_SHARE', 0.4))
+    DEADLINE_RECOMMENDATION_RESERVE_SECONDS = float(os.getenv('DEADLINE_RECOMMENDATION_RESERVE_SECONDS', 15))
+    # Batch endpoint (/process_cases/): maximum cases per request and concurrent summaries
+    MAX_BATCH_CASES = int(os.getenv('MAX_BATCH_CASES', 50))
+    BATCH_SUMMARY_CONCURRENCY = int(os.getenv('BATCH_SUMMARY_CONCURRENCY', 4))
+    # Worker processes per API worker for HTML parsing of crawled pages and report parsing
+    # (utils/cpu_executor.py; 0 = run them inline)
+    CPU_POOL_WORKERS = int(os.getenv('CPU_POOL_WORKERS', 2))
 
     SEARCH_ENGINE_ID = os.getenv('SEARCH_ENGINE_ID', 'your_default_engine_id')
\ No newline at end of file
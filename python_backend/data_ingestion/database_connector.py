@@ -1,7 +1,16 @@
 # data_ingestion/database_connector.py
 import sqlite3
+import hashlib
 import logging
-from web_crawler import WebCrawler
+import os
+import time
+import sys
+
+# Ensure the parent directory is in sys.path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.sqlite_utils import connect
+from data_ingestion.web_crawler import WebCrawler
 
 class DatabaseConnector:
     def __init__(self, db_path: str = "medical_data.db"):
@@ -13,7 +22,7 @@ class DatabaseConnector:
         """Creates a dummy table for storing medical articles/facts."""
         conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = connect(self.db_path)
             cursor = conn.cursor()
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS articles (
@@ -26,6 +35,18 @@ class DatabaseConnector:
                     credibility_score REAL
                 )
             """)
+            # Materialized per-article summaries, keyed by content hash and prompt version
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS article_summaries (
+                    content_hash TEXT,
+                    prompt_version TEXT,
+                    url TEXT,
+                    summary TEXT,
+                    model TEXT,
+                    created_at REAL,
+                    PRIMARY KEY (content_hash, prompt_version)
+                )
+            """)
             conn.commit()
             logging.info("Database schema initialized.")
         except sqlite3.Error as e:
@@ -38,7 +59,7 @@ class DatabaseConnector:
         """Inserts a medical article into the database."""
         conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = connect(self.db_path)
             cursor = conn.cursor()
             cursor.execute(
                 "INSERT OR IGNORE INTO articles (url, title, content, source, publish_date, credibility_score) VALUES (?, ?, ?, ?, ?, ?)",
@@ -56,7 +77,7 @@ class DatabaseConnector:
         """Retrieves an article by its URL."""
         conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = connect(self.db_path)
             cursor = conn.cursor()
             cursor.execute("SELECT url, title, content, source, publish_date, credibility_score FROM articles WHERE url = ?", (url,))
             row = cursor.fetchone()
@@ -78,7 +99,7 @@ class DatabaseConnector:
         conn = None
         articles = []
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = connect(self.db_path)
             cursor = conn.cursor()
             # Basic LIKE query, in production use FTS (Full-Text Search)
             cursor.execute(
@@ -98,6 +119,89 @@ class DatabaseConnector:
                 conn.close()
         return articles
     
+    @staticmethod
+    def content_hash(content: str) -> str:
+        return hashlib.sha256((content or "").encode("utf-8")).hexdigest()
+
+    def iter_articles(self, batch_size: int = 100):
+        """Yields every stored article, reading the table in batches of `batch_size` rows."""
+        last_id = 0
+        while True:
+            conn = None
+            rows = []
+            try:
+                conn = connect(self.db_path)
+                rows = conn.execute(
+                    "SELECT id, url, title, content, source, publish_date, credibility_score FROM articles WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            except sqlite3.Error as e:
+                logging.error(f"Error iterating articles after id {last_id}: {e}")
+            finally:
+                if conn:
+                    conn.close()
+            if not rows:
+                return
+            for row in rows:
+                yield {
+                    "url": row[1], "title": row[2], "content": row[3],
+                    "source": row[4], "publish_date": row[5], "credibility_score": row[6]
+                }
+            last_id = rows[-1][0]
+
+    def corpus_generation(self) -> str | None:
+        """
+        Changes whenever an article or a materialized summary is added or replaced (a
+        replaced summary gets a new rowid); None if the store cannot be read.
+        """
+        conn = None
+        try:
+            conn = connect(self.db_path)
+            row = conn.execute(
+                "SELECT (SELECT COUNT(*) || ':' || IFNULL(MAX(id), 0) FROM articles),"
+                " (SELECT COUNT(*) || ':' || IFNULL(MAX(rowid), 0) FROM article_summaries)"
+            ).fetchone()
+            return f"articles={row[0]};summaries={row[1]}"
+        except sqlite3.Error as e:
+            logging.error(f"Error reading corpus generation: {e}")
+            return None
+        finally:
+            if conn:
+                conn.close()
+
+    def get_summary(self, content_hash: str, prompt_version: str) -> str | None:
+        """Retrieves the materialized summary for a content hash, if one exists for this prompt version."""
+        conn = None
+        try:
+            conn = connect(self.db_path)
+            row = conn.execute(
+                "SELECT summary FROM article_summaries WHERE content_hash = ? AND prompt_version = ?",
+                (content_hash, prompt_version)
+            ).fetchone()
+            return row[0] if row else None
+        except sqlite3.Error as e:
+            logging.error(f"Error retrieving summary for content hash {content_hash[:12]}: {e}")
+            return None
+        finally:
+            if conn:
+                conn.close()
+
+    def upsert_summary(self, content_hash: str, prompt_version: str, url: str, summary: str, model: str):
+        """Stores (or replaces) the materialized summary for a content hash and prompt version."""
+        conn = None
+        try:
+            conn = connect(self.db_path)
+            conn.execute(
+                "INSERT OR REPLACE INTO article_summaries (content_hash, prompt_version, url, summary, model, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (content_hash, prompt_version, url, summary, model, time.time())
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Error storing summary for '{url}': {e}")
+        finally:
+            if conn:
+                conn.close()
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     db_connector = DatabaseConnector()
@@ -0,0 +1,296 @@
+# data_ingestion/load_ontology.py
+import argparse
+import codecs
+import csv
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+
+# Ensure the parent directory is in sys.path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Config
+from information_synthesis.knowledge_graph import MedicalKnowledgeGraph
+from utils.sqlite_utils import connect
+
+# Offline job: streams a large terminology file into the knowledge graph. The file is
+# read record by record (never whole) and written in bulk transactions of --batch-size
+# records. Each transaction also stores the byte offset reached in the file, so an
+# interrupted load resumes where its last committed batch ended.
+#
+# Input formats:
+#   jsonl  one JSON object per line, either
+#            {"text": "fever", "label": "SYMPTOM"}                                 (entity)
+#            {"head": "fever", "relation": "SYMPTOM_OF", "tail": "influenza",
+#             "head_label": "SYMPTOM", "tail_label": "DISEASE"}                    (relation)
+#            {"term": "hypertension", "label": "DISEASE", "synonyms": ["HTN"]}     (term + SYNONYM_OF)
+#   csv    delimited with a header row (or --columns), same field names as jsonl
+#   rrf    pipe-delimited without a header (UMLS style); --columns names the fields,
+#          empty names skip a column, e.g. --columns "head,,relation,tail"
+#
+#   python data_ingestion/load_ontology.py relations.rrf --format rrf \
+#       --columns "head,relation,tail" --head-label SYMPTOM --tail-label DISEASE
+
+SOURCE_TAG = "ontology_load"
+# SQLite's default limit on host parameters per statement is 999
+_MAX_PARAMS = 900
+
+
+def _lines(handle, offset: int, position: list[int]):
+    """Decoded lines of a binary file from `offset`; position[0] is the byte offset after the last line read."""
+    handle.seek(offset)
+    position[0] = offset
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    for raw_line in handle:
+        position[0] += len(raw_line)
+        yield decoder.decode(raw_line)
+
+
+def _records_from_row(row: dict, defaults: dict) -> list[dict]:
+    """Entity and relation records for one input row (see the formats above)."""
+    row = {key: value for key, value in row.items() if key and value not in (None, "")}
+    records = []
+    if "term" in row:
+        label = row.get("label") or defaults["label"]
+        records.append({"kind": "entity", "text": row["term"], "label": label})
+        synonyms = row.get("synonyms") or []
+        if isinstance(synonyms, str):
+            synonyms = [synonym for synonym in synonyms.split(defaults["synonym_separator"]) if synonym]
+        for synonym in synonyms:
+            records.append({
+                "kind": "relation", "head": synonym, "relation": "SYNONYM_OF", "tail": row["term"],
+                "head_label": label, "tail_label": label,
+            })
+    elif "head" in row and "tail" in row:
+        relation = row.get("relation") or defaults["relation"]
+        if relation:
+            records.append({
+                "kind": "relation", "head": row["head"], "relation": relation, "tail": row["tail"],
+                "head_label": row.get("head_label") or defaults["head_label"],
+                "tail_label": row.get("tail_label") or defaults["tail_label"],
+            })
+    elif "text" in row:
+        records.append({"kind": "entity", "text": row["text"], "label": row.get("label") or defaults["label"]})
+    return records
+
+
+def iter_records(path: str, file_format: str, offset: int = 0, columns: list[str] | None = None,
+                 delimiter: str | None = None, defaults: dict | None = None):
+    """
+    Yields (byte offset after the row, records of the row) for every row of the file
+    from `offset` on. Offsets are row boundaries, safe to resume from.
+    """
+    defaults = {"label": "UNKNOWN", "head_label": "UNKNOWN", "tail_label": "UNKNOWN", "relation": None,
+                "synonym_separator": ";", **(defaults or {})}
+    with open(path, "rb") as handle:
+        if file_format == "jsonl":
+            position = [offset]
+            for line in _lines(handle, offset, position):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    logging.warning(f"Skipping invalid JSON at byte {position[0]}: {e}")
+                    continue
+                yield position[0], _records_from_row(row, defaults)
+            return
+
+        delimiter = delimiter or ("|" if file_format == "rrf" else ",")
+        quoting = csv.QUOTE_NONE if file_format == "rrf" else csv.QUOTE_MINIMAL
+        if columns is None:
+            if file_format == "rrf":
+                raise ValueError("--columns is required for rrf files")
+            header_position = [0]
+            columns = next(csv.reader(_lines(handle, 0, header_position), delimiter=delimiter))
+            offset = max(offset, header_position[0])
+        position = [offset]
+        for values in csv.reader(_lines(handle, offset, position), delimiter=delimiter, quoting=quoting):
+            yield position[0], _records_from_row(dict(zip(columns, values)), defaults)
+
+
+class OntologyLoader:
+    """Writes records into the knowledge graph database in bulk transactions, with a resumable checkpoint."""
+    def __init__(self, db_path: str, source: str = SOURCE_TAG):
+        self.db_path = db_path
+        self.source = source
+        MedicalKnowledgeGraph(db_path=db_path)  # creates the schema
+        self.conn = connect(db_path)
+        self.conn.execute("PRAGMA cache_size=-65536")  # 64 MiB page cache for the bulk load
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS ontology_loads (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime REAL,
+                byte_offset INTEGER,
+                entities INTEGER,
+                relations INTEGER,
+                updated_at REAL
+            )
+        """)
+        self.conn.commit()
+        self._ensure_unique_relations()
+
+    def _ensure_unique_relations(self):
+        """
+        Relations are unique per (head, type, tail, source), so that a restarted or
+        changed file does not insert the relations of an earlier load a second time.
+        """
+        create_index = ("CREATE UNIQUE INDEX IF NOT EXISTS idx_relations_unique "
+                        "ON relations (head_id, relation_type, tail_id, source_url)")
+        try:
+            self.conn.execute(create_index)
+        except sqlite3.IntegrityError:
+            # Duplicates left by earlier loads: keep the first copy of each relation
+            removed = self.conn.execute(
+                "DELETE FROM relations WHERE id NOT IN "
+                "(SELECT MIN(id) FROM relations GROUP BY head_id, relation_type, tail_id, source_url)"
+            ).rowcount
+            logging.info(f"Removed {removed} duplicate relations before indexing.")
+            self.conn.execute(create_index)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def checkpoint(self, path: str) -> dict | None:
+        """The stored progress for this file, if the file has not changed since."""
+        stat = os.stat(path)
+        row = self.conn.execute(
+            "SELECT size, mtime, byte_offset, entities, relations FROM ontology_loads WHERE path = ?",
+            (os.path.abspath(path),)
+        ).fetchone()
+        if row is None or row[0] != stat.st_size or row[1] != stat.st_mtime:
+            return None
+        return {"byte_offset": row[2], "entities": row[3], "relations": row[4]}
+
+    def _entity_ids(self, texts: set[str]) -> dict[str, int]:
+        ids = {}
+        texts = list(texts)
+        for start in range(0, len(texts), _MAX_PARAMS):
+            chunk = texts[start:start + _MAX_PARAMS]
+            ids.update(self.conn.execute(
+                f"SELECT text, id FROM entities WHERE text IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall())
+        return ids
+
+    def write_batch(self, records: list[dict], path: str, byte_offset: int, totals: dict):
+        """Writes one batch and the checkpoint in a single transaction."""
+        entities = {}
+        relations = []
+        for record in records:
+            if record["kind"] == "entity":
+                entities[record["text"].lower()] = record["label"].upper()
+            else:
+                head, tail = record["head"].lower(), record["tail"].lower()
+                entities.setdefault(head, record["head_label"].upper())
+                entities.setdefault(tail, record["tail_label"].upper())
+                relations.append((head, record["relation"].upper(), tail))
+
+        stat = os.stat(path)
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+            inserted = self.conn.executemany(
+                "INSERT OR IGNORE INTO entities (text, label, source_url) VALUES (?, ?, ?)",
+                [(text, label, self.source) for text, label in entities.items()]
+            ).rowcount
+            # An entity first stored as an UNKNOWN relation endpoint gets its real label
+            self.conn.executemany(
+                "UPDATE entities SET label = ? WHERE text = ? AND label = 'UNKNOWN'",
+                [(label, text) for text, label in entities.items() if label != "UNKNOWN"]
+            )
+            inserted_relations = 0
+            if relations:
+                ids = self._entity_ids({text for head, _, tail in relations for text in (head, tail)})
+                inserted_relations = self.conn.executemany(
+                    "INSERT OR IGNORE INTO relations (head_id, relation_type, tail_id, source_url) VALUES (?, ?, ?, ?)",
+                    [(ids[head], relation, ids[tail], self.source) for head, relation, tail in relations]
+                ).rowcount
+            totals["entities"] += max(inserted, 0)
+            totals["relations"] += max(inserted_relations, 0)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO ontology_loads (path, size, mtime, byte_offset, entities, relations, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (os.path.abspath(path), stat.st_size, stat.st_mtime, byte_offset, totals["entities"], totals["relations"], time.time())
+            )
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+
+
+def load_file(loader: OntologyLoader, path: str, file_format: str, batch_size: int = 10000, restart: bool = False,
+              columns: list[str] | None = None, delimiter: str | None = None, defaults: dict | None = None,
+              progress_seconds: float = 5.0) -> dict:
+    """Streams one file into the knowledge graph; returns the totals for the file."""
+    size = os.path.getsize(path)
+    checkpoint = None if restart else loader.checkpoint(path)
+    offset = checkpoint["byte_offset"] if checkpoint else 0
+    totals = {"entities": checkpoint["entities"], "relations": checkpoint["relations"]} if checkpoint else {"entities": 0, "relations": 0}
+    if checkpoint:
+        logging.info(f"Resuming {path} at byte {offset} of {size} ({totals['relations']} relations loaded before).")
+    if offset >= size and checkpoint:
+        logging.info(f"{path} is already fully loaded.")
+        return totals
+
+    started = time.monotonic()
+    last_report = started
+    batch = []
+    for byte_offset, records in iter_records(path, file_format, offset, columns, delimiter, defaults):
+        batch.extend(records)
+        if len(batch) >= batch_size:
+            loader.write_batch(batch, path, byte_offset, totals)
+            batch = []
+            now = time.monotonic()
+            if now - last_report >= progress_seconds:
+                last_report = now
+                elapsed = now - started
+                logging.info(
+                    f"{path}: {100.0 * byte_offset / max(size, 1):.1f}% "
+                    f"({totals['entities']} entities, {totals['relations']} relations, "
+                    f"{(byte_offset - offset) / max(elapsed, 1e-9) / 1e6:.1f} MB/s)"
+                )
+    # The last (possibly empty) batch marks the whole file as loaded
+    loader.write_batch(batch, path, size, totals)
+    logging.info(f"Loaded {path} in {time.monotonic() - started:.1f}s: {totals}")
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream a terminology file into the knowledge graph.")
+    parser.add_argument("paths", nargs="+", help="Files to load, in order.")
+    parser.add_argument("--db-path", default=Config.KNOWLEDGE_GRAPH_DB_PATH)
+    parser.add_argument("--format", choices=("jsonl", "csv", "rrf"), help="Input format (default: from the file extension).")
+    parser.add_argument("--columns", help="Comma-separated field names of the delimited columns (required for rrf).")
+    parser.add_argument("--delimiter", help="Column delimiter (default ',' for csv, '|' for rrf).")
+    parser.add_argument("--label", default="UNKNOWN", help="Label of entities/terms that have none.")
+    parser.add_argument("--head-label", default="UNKNOWN", help="Label of relation heads that have none.")
+    parser.add_argument("--tail-label", default="UNKNOWN", help="Label of relation tails that have none.")
+    parser.add_argument("--relation", help="Relation type of rows that have none.")
+    parser.add_argument("--synonym-separator", default=";", help="Separator of a delimited 'synonyms' column.")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Records per transaction.")
+    parser.add_argument("--restart", action="store_true", help="Ignore the stored checkpoint and load from the start.")
+    parser.add_argument("--source", default=SOURCE_TAG, help="source_url recorded on loaded rows.")
+    args = parser.parse_args(argv)
+
+    defaults = {"label": args.label, "head_label": args.head_label, "tail_label": args.tail_label,
+                "relation": args.relation, "synonym_separator": args.synonym_separator}
+    columns = [column.strip() for column in args.columns.split(",")] if args.columns else None
+    loader = OntologyLoader(args.db_path, source=args.source)
+    try:
+        for path in args.paths:
+            file_format = args.format or {".jsonl": "jsonl", ".csv": "csv", ".rrf": "rrf"}.get(os.path.splitext(path)[1].lower())
+            if file_format is None:
+                parser.error(f"Cannot infer the format of {path}; pass --format.")
+            load_file(loader, path, file_format, args.batch_size, args.restart, columns, args.delimiter, defaults)
+    finally:
+        loader.close()
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
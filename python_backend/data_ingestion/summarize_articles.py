@@ -0,0 +1,79 @@
+# data_ingestion/summarize_articles.py
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+# Ensure the parent directory is in sys.path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Config
+from data_ingestion.database_connector import DatabaseConnector
+from gemini_llm import GeminiLLM, GeminiLLMError
+from prompt import text, SUMMARY_PROMPT_VERSION
+
+# Offline batch job: walks the articles table and materializes one summary per
+# article, keyed by content hash and prompt version. Articles whose content and
+# prompt version are unchanged since the last run are skipped, so re-running it
+# only summarizes new or changed articles.
+#
+#   python data_ingestion/summarize_articles.py --concurrency 4
+
+
+async def summarize_articles(db_connector: DatabaseConnector, llm: GeminiLLM, concurrency: int = 4,
+                             limit: int | None = None, force: bool = False) -> dict:
+    stats = {"seen": 0, "skipped": 0, "summarized": 0, "failed": 0}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def summarize(article: dict, content_hash: str):
+        async with semaphore:
+            try:
+                summary = await llm.generate(text(article["content"]), tier="fast", call_type="background")
+            except GeminiLLMError as e:
+                stats["failed"] += 1
+                logging.error(f"Failed to summarize {article['url']}: {e}")
+                return
+        db_connector.upsert_summary(content_hash, SUMMARY_PROMPT_VERSION, article["url"], summary, llm.model_for("fast"))
+        stats["summarized"] += 1
+        logging.info(f"Summarized {article['url']}")
+
+    pending = set()
+    for article in db_connector.iter_articles():
+        if limit is not None and stats["seen"] >= limit:
+            break
+        stats["seen"] += 1
+        if not article.get("content"):
+            stats["skipped"] += 1
+            continue
+        content_hash = DatabaseConnector.content_hash(article["content"])
+        if not force and db_connector.get_summary(content_hash, SUMMARY_PROMPT_VERSION) is not None:
+            stats["skipped"] += 1
+            continue
+        pending.add(asyncio.create_task(summarize(article, content_hash)))
+        # Keep the number of in-flight tasks bounded so memory stays flat on large corpora
+        if len(pending) >= concurrency * 4:
+            _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+    if pending:
+        await asyncio.wait(pending)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Materialize per-article summaries for the article store.")
+    parser.add_argument("--db-path", default=Config.ARTICLE_DB_PATH)
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum concurrent LLM calls.")
+    parser.add_argument("--limit", type=int, help="Only look at the first N articles.")
+    parser.add_argument("--force", action="store_true", help="Re-summarize even if a current summary exists.")
+    args = parser.parse_args(argv)
+
+    db_connector = DatabaseConnector(db_path=args.db_path)
+    llm = GeminiLLM.from_config(Config)
+    stats = asyncio.run(summarize_articles(db_connector, llm, args.concurrency, args.limit, args.force))
+    logging.info(f"Summary job finished: {stats}")
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
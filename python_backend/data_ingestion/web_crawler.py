@@ -1,19 +1,120 @@
 # data_ingestion/web_crawler.py
 import requests
+import urllib3
 from bs4 import BeautifulSoup
+import codecs
 import logging
+import os
+import sys
+import threading
 import time
 from urllib.parse import urljoin, urlparse
 
+# Ensure the parent directory is in sys.path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.hedging import hedged_call_sync
+from utils.metrics import REGISTRY, record_bytes, record_error
+
+FETCH_SECONDS = REGISTRY.histogram(
+    "medai_crawler_fetch_duration_seconds",
+    "Duration of page downloads by outcome (ok/truncated/unsupported_type/deadline/error).",
+    ("outcome",),
+)
+
+# Content types worth parsing; anything else (PDFs, images, archives...) is not downloaded
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+CHUNK_SIZE = 16 * 1024
+# Without read1() (urllib3 < 2) a read blocks until it has the whole chunk, so chunks are small
+SMALL_CHUNK_SIZE = 1024
+
+
+class _DeadlineExceeded(Exception):
+    pass
+
+
+def _socket_of(raw):
+    """The socket a urllib3 response reads from, or None if it cannot be found."""
+    sock = getattr(getattr(raw, "connection", None), "sock", None)
+    if sock is None:
+        # http.client drops the connection's socket once the response owns it
+        # (close-delimited bodies); the response's buffered reader still holds it
+        sock = getattr(getattr(getattr(getattr(raw, "_fp", None), "fp", None), "raw", None), "_sock", None)
+    return sock if hasattr(sock, "settimeout") else None
+
+
+def _read_chunks(response: requests.Response, deadline_at: float):
+    """
+    Yields the (decompressed) body of a streamed response. Before every read the socket
+    timeout is set to the time left until `deadline_at` (time.monotonic()), so a server
+    that drips bytes just fast enough to beat the read timeout cannot hold a download past
+    its deadline; raises _DeadlineExceeded when it is reached.
+    """
+    raw = response.raw
+    sock = _socket_of(raw)
+    read1 = getattr(raw, "read1", None)
+    try:
+        while True:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise _DeadlineExceeded()
+            if sock is not None:
+                try:
+                    sock.settimeout(remaining)
+                except OSError:
+                    # Closed once the whole body was read; the next read returns b""
+                    sock = None
+            if read1 is not None:
+                # One socket read per call: returns whatever has arrived
+                chunk = read1(CHUNK_SIZE, decode_content=True)
+            else:
+                chunk = raw.read(SMALL_CHUNK_SIZE, decode_content=True)
+            if not chunk:
+                return
+            yield chunk
+    except urllib3.exceptions.ReadTimeoutError:
+        raise _DeadlineExceeded()
+    except urllib3.exceptions.HTTPError as e:
+        # What iter_content() would raise for the same failures
+        raise requests.exceptions.ConnectionError(e)
+
+
+def _incremental_decoder(encoding: str | None, url: str = ""):
+    """
+    Decoder for the declared charset. An unknown or bogus charset falls back to UTF-8
+    with replacement, as response.text does (apparent_encoding would need the whole body).
+    """
+    try:
+        return codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    except LookupError:
+        logging.warning(f"Unknown charset '{encoding}' for {url}; decoding as UTF-8.")
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
 class WebCrawler:
-    def __init__(self, rate_limit_seconds=1, max_pages=50):
+    def __init__(self, rate_limit_seconds=1, max_pages=50, hedge_policy=None, max_bytes=2 * 1024 * 1024):
         self.rate_limit_seconds = rate_limit_seconds
         self.max_pages = max_pages
+        # Optional utils.hedging.HedgePolicy: slow page requests are hedged with a duplicate
+        self.hedge_policy = hedge_policy
+        # Pages are streamed and cut off after this many bytes
+        self.max_bytes = max_bytes
         self.crawled_urls = set()
+        self._stats = {"fetches": 0, "bytes": 0, "seconds": 0.0}
+        self._stats_lock = threading.Lock()
         logging.info("Initialized WebCrawler.")
 
-    def fetch_page(self, url: str) -> str | None:
-        """Fetches content from a URL."""
+    def stats(self) -> dict:
+        """Fetch count, bytes received, time spent and per-outcome counts of this crawler."""
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def fetch_page(self, url: str, timeout: float = 10) -> str | None:
+        """
+        Fetches content from a URL. The body is streamed and decoded incrementally;
+        downloads stop at `max_bytes` (the text received so far is returned), on a
+        content type other than HTML/text, or when `timeout` seconds have passed in
+        total, so memory and time per page are bounded whatever the server sends.
+        """
         if url in self.crawled_urls:
             logging.debug(f"Skipping already crawled: {url}")
             return None
@@ -23,13 +124,59 @@ class WebCrawler:
         try:
             time.sleep(self.rate_limit_seconds) # Be polite
             headers = {'User-Agent': 'Mozilla/5.0 (compatible; MedicalAI/1.0)'} # Identify your bot
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status() # Raise an exception for HTTP errors
-            return response.text
+            if self.hedge_policy is not None:
+                return hedged_call_sync(self.hedge_policy, lambda: self._download(url, headers, timeout))
+            return self._download(url, headers, timeout)
         except requests.exceptions.RequestException as e:
+            record_error("crawler", type(e).__name__)
             logging.error(f"Failed to fetch {url}: {e}")
             return None
 
+    def _download(self, url: str, headers: dict, timeout: float) -> str | None:
+        start = time.monotonic()
+        received = 0
+        outcome = "error"
+        try:
+            with requests.get(url, headers=headers, timeout=timeout, stream=True) as response:
+                response.raise_for_status() # Raise an exception for HTTP errors
+                content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+                if content_type and content_type not in HTML_CONTENT_TYPES:
+                    outcome = "unsupported_type"
+                    logging.warning(f"Skipping {url}: unsupported content type '{content_type}'.")
+                    return None
+
+                # Same encoding choice as response.text, decoded chunk by chunk
+                decoder = _incremental_decoder(response.encoding, url)
+                parts = []
+                outcome = "ok"
+                try:
+                    for chunk in _read_chunks(response, start + timeout):
+                        if received + len(chunk) > self.max_bytes:
+                            chunk = chunk[:self.max_bytes - received]
+                            outcome = "truncated"
+                        received += len(chunk)
+                        parts.append(decoder.decode(chunk))
+                        if outcome == "truncated":
+                            logging.warning(f"Truncated {url} at {self.max_bytes} bytes.")
+                            break
+                except _DeadlineExceeded:
+                    outcome = "deadline"
+                    logging.warning(f"Gave up on {url} after {timeout}s ({received} bytes received).")
+                    return None
+                parts.append(decoder.decode(b"", final=True))
+                return "".join(parts)
+        finally:
+            elapsed = time.monotonic() - start
+            record_bytes("crawler", received)
+            FETCH_SECONDS.observe(elapsed, outcome=outcome)
+            if outcome in ("unsupported_type", "deadline"):
+                record_error("crawler", outcome)
+            with self._stats_lock:
+                self._stats["fetches"] += 1
+                self._stats["bytes"] += received
+                self._stats["seconds"] += elapsed
+                self._stats[outcome] = self._stats.get(outcome, 0) + 1
+
     def parse_html(self, html_content: str) -> str:
         """Parses HTML to extract main text content."""
         if not html_content:
@@ -1,8 +1,13 @@
 import json
+import logging
 import os
 import asyncio
+import time
 import httpx # Import httpx
 from prompt import text, text2, text3, extract_from_json # Import your prompt text from a separate file
+from utils.hedging import HedgePolicy, hedged_call
+from utils.llm_scheduler import LLMScheduler
+from utils.metrics import span, record_error, record_bytes, PROMPT_SIZE, LLM_CALL_SECONDS, LLM_TOKENS, LLM_FALLBACKS
 # dot env
 from dotenv import load_dotenv
 load_dotenv()
@@ -10,13 +15,111 @@ load_dotenv()
 # Assuming 'prompt.py' contains a 'text' variable with your initial prompt
 # from prompt import text # Uncomment if you have this file, otherwise define 'text' directly
 
+class GeminiLLMError(Exception):
+    """Raised by GeminiLLM.generate when the API call fails or returns no usable text."""
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class GeminiLLMTimeout(GeminiLLMError):
+    """Raised by GeminiLLM.generate when a call with a `timeout` has not finished in time."""
+
+
 class GeminiLLM:
-    def __init__(self, api_key: str = "", model_name: str = "gemini-2.0-flash"):
+    """
+    Client for the Gemini generateContent API. Call sites pick a tier (e.g. "fast"
+    for per-source summaries and JSON formatting, "strong" for the final
+    recommendation); each tier maps to a model and may have a deadline after which
+    the call is abandoned and retried on the tier named as its fallback. Calls
+    without a tier, or with an unknown one, use `model_name`. With a `hedge_policy`,
+    slow calls are hedged with a duplicate request (see utils/hedging.py). With a
+    `scheduler`, calls wait for a slot in priority order of their call type and the
+    calling case's urgency (see utils/llm_scheduler.py).
+    """
+    def __init__(self, api_key: str = "", model_name: str = "gemini-2.0-flash",
+                 base_url: str = "https://generativelanguage.googleapis.com/v1beta/models",
+                 tiers: dict | None = None, hedge_policy: HedgePolicy | None = None,
+                 scheduler: LLMScheduler | None = None):
         self.api_key = api_key
         self.model_name = model_name
-        self.base_url = "https://generativelanguage.googleapis.com/v1beta/models"
+        self.base_url = base_url.rstrip("/")
+        # tier name -> {"model": str, "deadline_seconds": float | None, "fallback": tier name | None}
+        self.tiers = tiers or {}
+        self.hedge_policy = hedge_policy
+        self.scheduler = scheduler
+        self._model_stats = {}
+
+    @classmethod
+    def from_config(cls, config) -> "GeminiLLM":
+        return cls(
+            api_key=config.GEMINI_API_KEY,
+            base_url=config.GEMINI_API_BASE_URL,
+            tiers={
+                "fast": {"model": config.LLM_FAST_MODEL},
+                "strong": {
+                    "model": config.LLM_STRONG_MODEL,
+                    "deadline_seconds": config.LLM_STRONG_DEADLINE_SECONDS or None,
+                    "fallback": "fast",
+                },
+            },
+            hedge_policy=HedgePolicy("gemini", percentile=config.HEDGE_LLM_PERCENTILE) if config.HEDGE_LLM_ENABLED else None,
+            scheduler=LLMScheduler(max_concurrency=config.LLM_MAX_CONCURRENCY) if config.LLM_MAX_CONCURRENCY > 0 else None,
+        )
+
+    def model_for(self, tier: str | None = None) -> str:
+        """The model a call on `tier` is sent to first."""
+        return self.tiers.get(tier, {}).get("model") or self.model_name
+
+    def model_stats(self) -> dict:
+        """Per-model call count, errors, mean latency and token totals of this process."""
+        return {
+            model: {**stats, "mean_latency_seconds": round(stats["total_seconds"] / stats["calls"], 6) if stats["calls"] else 0.0}
+            for model, stats in self._model_stats.items()
+        }
 
-    async def predict(self, prompt: str) -> str:
+    async def generate(self, prompt: str, tier: str | None = None, call_type: str = "summary",
+                       timeout: float | None = None) -> str:
+        """
+        Returns the generated text, raising GeminiLLMError on any failure. `call_type`
+        ("recommendation", "summary" or "background") sets the call's scheduling priority.
+        `timeout` bounds the whole call, including the wait for a slot, a tier fallback and
+        hedges; GeminiLLMTimeout is raised when it passes.
+        """
+        if timeout is None:
+            return await self._scheduled(prompt, tier, call_type)
+        try:
+            return await asyncio.wait_for(self._scheduled(prompt, tier, call_type), timeout=timeout)
+        except asyncio.TimeoutError:
+            record_error("gemini", "timeout")
+            raise GeminiLLMTimeout(f"No response within {timeout:.1f}s.") from None
+
+    async def _scheduled(self, prompt: str, tier: str | None, call_type: str) -> str:
+        if self.scheduler is None:
+            return await self._generate_on_tier(prompt, tier)
+        async with self.scheduler.slot(call_type):
+            return await self._generate_on_tier(prompt, tier)
+
+    async def _generate_on_tier(self, prompt: str, tier: str | None) -> str:
+        route = self.tiers.get(tier, {})
+        model = self.model_for(tier)
+        deadline = route.get("deadline_seconds")
+        fallback_model = self.model_for(route["fallback"]) if route.get("fallback") else None
+        if not deadline or not fallback_model or fallback_model == model:
+            return await self._call(prompt, model)
+        try:
+            return await asyncio.wait_for(self._call(prompt, model), timeout=deadline)
+        except asyncio.TimeoutError:
+            LLM_FALLBACKS.inc(tier=tier, model=model, fallback_model=fallback_model)
+            logging.warning(f"{model} missed the {deadline}s deadline of tier '{tier}'; retrying on {fallback_model}.")
+            return await self._call(prompt, fallback_model)
+
+    async def _call(self, prompt: str, model: str) -> str:
+        if self.hedge_policy is None:
+            return await self._generate(prompt, model)
+        return await hedged_call(self.hedge_policy, lambda: self._generate(prompt, model), key=model)
+
+    async def _generate(self, prompt: str, model: str) -> str:
         payload = {
             "contents": [
                 {"role": "user", "parts": [{"text": prompt}]}
@@ -26,29 +129,75 @@ class GeminiLLM:
             }
         }
 
-        api_url = f"{self.base_url}/{self.model_name}:generateContent?key={self.api_key}"
+        api_url = f"{self.base_url}/{model}:generateContent?key={self.api_key}"
+        PROMPT_SIZE.observe(len(prompt), model=model)
 
+        start = time.perf_counter()
+        outcome = "error"
         try:
             # Use httpx.AsyncClient for making asynchronous requests
-            async with httpx.AsyncClient() as client:
-                response = await client.post(api_url, json=payload, timeout=30.0) # Add a timeout for safety
-                response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
-                result = response.json()
-
-            if result and result.get("candidates") and len(result["candidates"]) > 0 and \
-               result["candidates"][0].get("content") and result["candidates"][0]["content"].get("parts") and \
-               len(result["candidates"][0]["content"]["parts"]) > 0:
-                # Extract the text from the response
-                return result["candidates"][0]["content"]["parts"][0].get("text", "No text part found in response.")
-            else:
-                return f"Error: Unexpected response structure from Gemini API: {json.dumps(result)}"
-
+            with span("gemini.generate_content", kind="outbound"):
+                async with httpx.AsyncClient() as client:
+                    response = await client.post(api_url, json=payload, timeout=30.0) # Add a timeout for safety
+                    record_bytes("gemini", len(response.content))
+                    response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
+                    result = response.json()
+            outcome = "ok"
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
         except httpx.HTTPStatusError as e:
-            return f"HTTP error occurred: {e.response.status_code} - {e.response.text}"
+            record_error("gemini", f"http_{e.response.status_code}")
+            raise GeminiLLMError(f"HTTP error occurred: {e.response.status_code} - {e.response.text}",
+                                 status_code=e.response.status_code) from e
         except httpx.RequestError as e:
-            return f"An error occurred while requesting {e.request.url!r}: {e}"
+            record_error("gemini", type(e).__name__)
+            raise GeminiLLMError(f"An error occurred while requesting {e.request.url!r}: {e}") from e
         except Exception as e:
-            return f"An unexpected error occurred: {e}"
+            record_error("gemini", type(e).__name__)
+            raise GeminiLLMError(f"An unexpected error occurred: {e}") from e
+        finally:
+            self._record_call(model, outcome, time.perf_counter() - start)
+
+        usage = (result.get("usageMetadata") if isinstance(result, dict) else None) or {}
+        self._record_tokens(model, usage.get("promptTokenCount", 0), usage.get("candidatesTokenCount", 0))
+
+        if result and result.get("candidates") and len(result["candidates"]) > 0 and \
+           result["candidates"][0].get("content") and result["candidates"][0]["content"].get("parts") and \
+           len(result["candidates"][0]["content"]["parts"]) > 0:
+            # Extract the text from the response
+            return result["candidates"][0]["content"]["parts"][0].get("text", "No text part found in response.")
+        record_error("gemini", "unexpected_response")
+        raise GeminiLLMError(f"Error: Unexpected response structure from Gemini API: {json.dumps(result)}")
+
+    async def predict(self, prompt: str, tier: str | None = None, call_type: str = "summary") -> str:
+        """Like generate(), but returns the error message as text instead of raising."""
+        try:
+            return await self.generate(prompt, tier, call_type)
+        except GeminiLLMError as e:
+            return str(e)
+
+    def _stats_for(self, model: str) -> dict:
+        return self._model_stats.setdefault(
+            model, {"calls": 0, "errors": 0, "total_seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0}
+        )
+
+    def _record_call(self, model: str, outcome: str, seconds: float):
+        LLM_CALL_SECONDS.observe(seconds, model=model, outcome=outcome)
+        stats = self._stats_for(model)
+        stats["calls"] += 1
+        stats["total_seconds"] += seconds
+        if outcome != "ok":
+            stats["errors"] += 1
+
+    def _record_tokens(self, model: str, prompt_tokens: int, completion_tokens: int):
+        if prompt_tokens:
+            LLM_TOKENS.inc(prompt_tokens, model=model, kind="prompt")
+        if completion_tokens:
+            LLM_TOKENS.inc(completion_tokens, model=model, kind="completion")
+        stats = self._stats_for(model)
+        stats["prompt_tokens"] += prompt_tokens
+        stats["completion_tokens"] += completion_tokens
 
 async def main():
     api = os.getenv("GEMINI_API_KEY")
@@ -0,0 +1,138 @@
+# information_retrieval/search_cache.py
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from utils.metrics import CACHE_REQUESTS
+from utils.sqlite_utils import connect
+
+
+class SearchResultCache:
+    """
+    Persistent TTL cache for search API responses, shared by all worker processes.
+    Entries are keyed by (normalized query, num_results, engine id). Queries that
+    returned no items are cached too, with a shorter TTL, so they are not retried
+    on every case.
+    """
+    def __init__(self, db_path: str = "search_cache.db", ttl_seconds: float = 86400,
+                 negative_ttl_seconds: float = 3600):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._stats = {"hit": 0, "negative_hit": 0, "miss": 0}
+        self._stats_lock = threading.Lock()
+        self._initialize_db()
+        self.purge_expired()
+        logging.info(f"Initialized SearchResultCache at {db_path} (ttl={ttl_seconds}s, negative ttl={negative_ttl_seconds}s)")
+
+    def _initialize_db(self):
+        conn = None
+        try:
+            conn = connect(self.db_path)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS search_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    query TEXT,
+                    num_results INTEGER,
+                    engine_id TEXT,
+                    items TEXT,
+                    is_negative INTEGER,
+                    created_at REAL,
+                    expires_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_expires ON search_cache (expires_at)")
+            conn.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Error initializing search cache: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def _key(self, query: str, num_results: int, engine_id: str) -> str:
+        raw = f"{self.normalize_query(query)}\x1f{num_results}\x1f{engine_id}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _count(self, result: str):
+        with self._stats_lock:
+            self._stats[result] += 1
+        CACHE_REQUESTS.inc(cache="search", result=result)
+
+    def get(self, query: str, num_results: int, engine_id: str) -> list[dict] | None:
+        """
+        Returns the cached search items (an empty list for a cached negative result),
+        or None on a miss or an expired entry.
+        """
+        conn = None
+        row = None
+        try:
+            conn = connect(self.db_path)
+            row = conn.execute(
+                "SELECT items, is_negative FROM search_cache WHERE cache_key = ? AND expires_at > ?",
+                (self._key(query, num_results, engine_id), time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            logging.error(f"Error reading search cache for '{query}': {e}")
+        finally:
+            if conn:
+                conn.close()
+
+        if row is None:
+            self._count("miss")
+            return None
+        if row[1]:
+            self._count("negative_hit")
+            return []
+        self._count("hit")
+        return json.loads(row[0])
+
+    def put(self, query: str, num_results: int, engine_id: str, items: list[dict]):
+        """Stores a search response; an empty item list is stored as a negative entry."""
+        now = time.time()
+        is_negative = not items
+        ttl = self.negative_ttl_seconds if is_negative else self.ttl_seconds
+        conn = None
+        try:
+            conn = connect(self.db_path)
+            conn.execute(
+                "INSERT OR REPLACE INTO search_cache (cache_key, query, num_results, engine_id, items, is_negative, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self._key(query, num_results, engine_id), self.normalize_query(query), num_results, engine_id,
+                 json.dumps(items or []), int(is_negative), now, now + ttl)
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Error writing search cache for '{query}': {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    def purge_expired(self) -> int:
+        """Deletes expired entries and returns how many were removed."""
+        conn = None
+        try:
+            conn = connect(self.db_path)
+            cursor = conn.execute("DELETE FROM search_cache WHERE expires_at <= ?", (time.time(),))
+            conn.commit()
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            logging.error(f"Error purging search cache: {e}")
+            return 0
+        finally:
+            if conn:
+                conn.close()
+
+    def stats(self) -> dict:
+        """Hit/miss counts of this process and the resulting hit ratio."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = sum(stats.values())
+        stats["hit_ratio"] = round((stats["hit"] + stats["negative_hit"]) / lookups, 4) if lookups else 0.0
+        return stats
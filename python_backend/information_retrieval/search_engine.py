@@ -1,81 +1,251 @@
 # information_retrieval/search_engine.py
 import requests
 import logging
+from urllib.parse import urlparse
 from config import Config
 from information_retrieval.source_evaluator import SourceEvaluator
 from data_ingestion.web_crawler import WebCrawler
+from utils.deadline import Deadline
+from utils.hedging import HedgePolicy
+from utils.metrics import span, record_bytes, record_cache, record_error
+
+# Below this much remaining time a search or page request is not started at all
+MIN_CALL_SECONDS = 0.5
 
 class MedicalSearchEngine:
-    def __init__(self, api_key: str, search_endpoint: str, source_evaluator: SourceEvaluator):
+    def __init__(self, api_key: str, search_endpoint: str, source_evaluator: SourceEvaluator, article_store=None,
+                 search_cache=None, cpu_executor=None, search_quota=None):
         self.api_key = api_key
         self.search_endpoint = search_endpoint
         self.search_engine_id = Config.SEARCH_ENGINE_ID # From Config
         self.source_evaluator = source_evaluator
-        self.web_crawler = WebCrawler()
+        self.web_crawler = WebCrawler(
+            rate_limit_seconds=Config.CRAWLER_RATE_LIMIT_SECONDS,
+            max_bytes=Config.CRAWLER_MAX_BYTES,
+            hedge_policy=HedgePolicy("crawler", percentile=Config.HEDGE_CRAWLER_PERCENTILE) if Config.HEDGE_CRAWLER_ENABLED else None
+        )
+        # Optional DatabaseConnector shared by all workers: crawled pages are stored there
+        # and reused instead of being fetched again.
+        self.article_store = article_store
+        # Optional SearchResultCache for API responses (including empty ones)
+        self.search_cache = search_cache
+        # Optional SearchQuota that every API call must take a slot from
+        self.search_quota = search_quota
+        # Optional CpuExecutor that parses pages in worker processes
+        self.cpu_executor = cpu_executor
         logging.info("Initialized MedicalSearchEngine.")
 
-    def search_medical_information(self, queries: list[str], num_results: int = 5) -> list[dict]:
+    def search_medical_information(self, queries: list[str], num_results: int = 5,
+                                   deadline: Deadline | None = None) -> list[dict]:
         """
         Performs a search using an external API (e.g., Google Custom Search) and
         then potentially crawls the top results to extract content.
         Filters and ranks results based on source credibility.
         """
+        return self.crawl_results(self.collect_results(queries, num_results, deadline), deadline=deadline)
+
+    def collect_results(self, queries: list[str], num_results: int = 5, deadline: Deadline | None = None,
+                        max_api_calls: int | None = None) -> list[dict]:
+        """
+        Runs every query against the search API and returns the trusted results, ranked
+        by credibility. Nothing is crawled yet; a URL found by several queries appears
+        once per query. Queries that no longer fit before `deadline` are skipped, and so
+        are uncached queries beyond `max_api_calls` or the search quota; queries should
+        therefore come most valuable first.
+        """
+        deadline = deadline or Deadline()
         all_results = []
+        api_calls = 0
         for query in queries:
-            logging.info(f"Searching for query: '{query}'")
-            params = {
-                "key": self.api_key,
-                "cx": self.search_engine_id,
-                "q": query,
-                "num": num_results
-            }
-            try:
-                response = requests.get(self.search_endpoint, params=params, timeout=15)
-                response.raise_for_status()
-                search_data = response.json()
-                if "items" in search_data:
-                    for item in search_data["items"]:
-                        # Basic filtering and scoring based on URL
-                        credibility = self.source_evaluator.evaluate_url(item.get('link', ''))
-                        if credibility > 0: # Only consider trusted sources
-                            all_results.append({
-                                "title": item.get('title'),
-                                "url": item.get('link'),
-                                "snippet": item.get('snippet'),
-                                "credibility_score": credibility,
-                                "query_matched": query # Keep track of which query yielded this
-                            })
-                else:
-                    logging.warning(f"No items found for query: '{query}'")
-
-            except requests.exceptions.RequestException as e:
-                logging.error(f"Search API request failed for '{query}': {e}")
-            except Exception as e:
-                logging.error(f"An unexpected error occurred during search for '{query}': {e}")
+            if deadline.remaining() < MIN_CALL_SECONDS:
+                deadline.degrade("skipped_queries")
+                logging.warning(f"Search deadline reached; skipping query '{query}'.")
+                continue
+            items = self._cached_items(query, num_results)
+            if items is None:
+                if max_api_calls is not None and api_calls >= max_api_calls:
+                    # A budget of 0 means the quota had nothing left for this case
+                    deadline.degrade("search_quota_exhausted" if max_api_calls == 0 else "search_budget_exceeded")
+                    logging.info(f"Search budget of {max_api_calls} calls used; skipping query '{query}'.")
+                    continue
+                if self.search_quota is not None and not self.search_quota.try_acquire():
+                    deadline.degrade("search_quota_exhausted")
+                    logging.warning(f"Search quota exhausted; skipping query '{query}'.")
+                    continue
+                api_calls += 1
+                items = self._fetch_items(query, num_results, timeout=deadline.timeout(15))
+            for item in items or []:
+                # Basic filtering and scoring based on URL
+                credibility = self.source_evaluator.evaluate_url(item.get('link', ''))
+                if credibility > 0: # Only consider trusted sources
+                    all_results.append({
+                        "title": item.get('title'),
+                        "url": item.get('link'),
+                        "snippet": item.get('snippet'),
+                        "credibility_score": credibility,
+                        "query_matched": query # Keep track of which query yielded this
+                    })
 
         # Sort all results by credibility and then by a simple relevance (e.g., query match count)
         # For full relevance, you'd integrate more sophisticated ranking algorithms here.
         all_results.sort(key=lambda x: x['credibility_score'], reverse=True)
+        return all_results
 
-        # Now, attempt to crawl the content for the top N highly credible results
+    def crawl_results(self, results: list[dict], page_cache: dict | None = None,
+                      deadline: Deadline | None = None) -> list[dict]:
+        """
+        Crawls the top Config.MAX_SEARCH_RESULTS distinct URLs of a ranked result list
+        and returns copies of them with their 'content'. `page_cache` (url -> content,
+        None for pages that could not be crawled) can be shared between calls so that
+        a URL is fetched at most once, e.g. across the cases of a batch.
+        Once `deadline` is reached, pages are no longer fetched: results use stored
+        content if there is any and otherwise their search snippet, marked with
+        'content_source': 'snippet'.
+        """
+        deadline = deadline or Deadline()
+        if page_cache is None:
+            page_cache = {}
         final_results = []
         crawled_urls = set()
-        for result in all_results:
+        for result in results:
             if len(final_results) >= Config.MAX_SEARCH_RESULTS:
                 break
             if result['url'] in crawled_urls: # Avoid crawling same URL multiple times if from different queries
                 continue
 
-            content = self.web_crawler.fetch_page(result['url'])
-            if content:
-                parsed_content = self.web_crawler.parse_html(content)
-                result['content'] = parsed_content
-                final_results.append(result)
+            if result['url'] not in page_cache and deadline.remaining() < MIN_CALL_SECONDS:
+                stored = self._get_stored_content(result['url'])
+                if stored:
+                    page_cache[result['url']] = stored
+                elif result.get('snippet'):
+                    deadline.degrade("snippets_instead_of_crawl")
+                    final_results.append({**result, 'content': result['snippet'], 'content_source': 'snippet'})
+                    crawled_urls.add(result['url'])
+                    continue
+                else:
+                    continue
+
+            if result['url'] not in page_cache:
+                page_cache[result['url']] = self._get_page_content(result, timeout=deadline.timeout(10))
+            parsed_content = page_cache[result['url']]
+            if parsed_content:
+                final_results.append({**result, 'content': parsed_content})
                 crawled_urls.add(result['url'])
             else:
                 logging.warning(f"Could not crawl content for {result['url']}, skipping.")
 
         return final_results
+
+    def snippet_results(self, results: list[dict]) -> list[dict]:
+        """
+        Builds evidence from search titles and snippets alone, without crawling: results
+        are merged by URL (distinct snippets joined, highest credibility kept), ranked by
+        credibility and capped at Config.MAX_SEARCH_RESULTS. The merged snippet is the
+        result's 'content', marked with 'content_source': 'snippet'.
+        """
+        merged = {}
+        for result in results:
+            snippet = (result.get('snippet') or "").strip()
+            entry = merged.get(result['url'])
+            if entry is None:
+                entry = merged[result['url']] = {**result, 'snippets': []}
+            elif result['credibility_score'] > entry['credibility_score']:
+                entry['credibility_score'] = result['credibility_score']
+                entry['query_matched'] = result['query_matched']
+            if snippet and snippet not in entry['snippets']:
+                entry['snippets'].append(snippet)
+
+        snippet_results = []
+        for entry in sorted(merged.values(), key=lambda x: x['credibility_score'], reverse=True):
+            snippets = entry.pop('snippets')
+            if not snippets:
+                continue
+            entry['snippet'] = " ... ".join(snippets)
+            snippet_results.append({**entry, 'content': entry['snippet'], 'content_source': 'snippet'})
+            if len(snippet_results) >= Config.MAX_SEARCH_RESULTS:
+                break
+        return snippet_results
+
+    def _cached_items(self, query: str, num_results: int) -> list[dict] | None:
+        if self.search_cache is None:
+            return None
+        cached = self.search_cache.get(query, num_results, self.search_engine_id)
+        if cached is not None:
+            logging.info(f"Search cache hit for query: '{query}' ({len(cached)} items)")
+        return cached
+
+    def _fetch_items(self, query: str, num_results: int, timeout: float = 15) -> list[dict] | None:
+        """Calls the search API and caches the response; None means the request failed."""
+        logging.info(f"Searching for query: '{query}'")
+        params = {
+            "key": self.api_key,
+            "cx": self.search_engine_id,
+            "q": query,
+            "num": num_results
+        }
+        try:
+            with span("search_api.query", kind="outbound"):
+                response = requests.get(self.search_endpoint, params=params, timeout=timeout)
+                record_bytes("search_api", len(response.content))
+                response.raise_for_status()
+                search_data = response.json()
+        except requests.exceptions.RequestException as e:
+            if self.search_quota is not None and getattr(e.response, "status_code", None) == 429:
+                self.search_quota.mark_rate_limited()
+            logging.error(f"Search API request failed for '{query}': {e}")
+            return None
+        except Exception as e:
+            record_error("search_engine", type(e).__name__)
+            logging.error(f"An unexpected error occurred during search for '{query}': {e}")
+            return None
+
+        items = [
+            {"title": item.get('title'), "link": item.get('link'), "snippet": item.get('snippet')}
+            for item in search_data.get("items", [])
+        ]
+        if not items:
+            logging.warning(f"No items found for query: '{query}'")
+        if self.search_cache is not None:
+            self.search_cache.put(query, num_results, self.search_engine_id, items)
+        return items
+
+    def _get_stored_content(self, url: str) -> str | None:
+        """Returns the text of a page crawled before, if the article store has it."""
+        if self.article_store is None:
+            return None
+        article = self.article_store.get_article_by_url(url)
+        record_cache("article_store", article is not None)
+        if article and article.get('content'):
+            return article['content']
+        return None
+
+    def _get_page_content(self, result: dict, timeout: float = 10) -> str | None:
+        """Returns the main text of a result page, from the article store if it was crawled before."""
+        url = result['url']
+        stored = self._get_stored_content(url)
+        if stored:
+            return stored
+
+        with span("crawler.fetch_page", kind="outbound"):
+            content = self.web_crawler.fetch_page(url, timeout=timeout)
+        if not content:
+            return None
+        with span("crawler.parse_html"):
+            if self.cpu_executor is not None:
+                parsed_content = self.cpu_executor.parse_html_sync(content)
+            else:
+                parsed_content = self.web_crawler.parse_html(content)
+
+        if self.article_store is not None and parsed_content:
+            self.article_store.insert_article(
+                url=url,
+                title=result.get('title') or "",
+                content=parsed_content,
+                source=urlparse(url).netloc,
+                publish_date="",
+                credibility_score=result['credibility_score']
+            )
+        return parsed_content
     
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
@@ -0,0 +1,144 @@
+# information_retrieval/search_quota.py
+import datetime
+import logging
+import sqlite3
+import time
+from zoneinfo import ZoneInfo
+
+from utils.metrics import REGISTRY
+from utils.sqlite_utils import connect
+
+SEARCH_QUOTA = REGISTRY.counter(
+    "medai_search_quota_total",
+    "Search API call admissions by outcome (granted/denied_day/denied_minute/rate_limited).",
+    ("outcome",),
+)
+
+# The Custom Search daily quota resets at midnight Pacific time
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+
+class SearchQuota:
+    """
+    Daily and per-minute call quota of the search API, counted in SQLite so that all
+    worker processes share it. Every API call first takes a slot with `try_acquire()`;
+    `case_budget()` spreads what is left over the cases in flight.
+    """
+    def __init__(self, db_path: str = "search_quota.db", daily_limit: int = 10000, per_minute_limit: int = 100,
+                 max_queries_per_case: int = 10):
+        self.db_path = db_path
+        self.daily_limit = daily_limit
+        self.per_minute_limit = per_minute_limit
+        self.max_queries_per_case = max_queries_per_case
+        self._initialize_db()
+        logging.info(f"Initialized SearchQuota at {db_path} ({daily_limit}/day, {per_minute_limit}/minute)")
+
+    def _initialize_db(self):
+        conn = None
+        try:
+            conn = connect(self.db_path)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS search_quota (
+                    period TEXT PRIMARY KEY,
+                    calls INTEGER,
+                    expires_at REAL
+                )
+            """)
+            conn.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Error initializing search quota: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def _windows(now: float) -> tuple[str, str]:
+        day = datetime.datetime.fromtimestamp(now, QUOTA_TIMEZONE).date().isoformat()
+        return f"day:{day}", f"minute:{int(now // 60)}"
+
+    def _counts(self, conn, day_window: str, minute_window: str) -> tuple[int, int]:
+        counts = dict(conn.execute(
+            "SELECT period, calls FROM search_quota WHERE period IN (?, ?)", (day_window, minute_window)
+        ).fetchall())
+        return counts.get(day_window, 0), counts.get(minute_window, 0)
+
+    def remaining(self) -> dict:
+        """Calls left today and in the current minute."""
+        now = time.time()
+        day_window, minute_window = self._windows(now)
+        conn = None
+        try:
+            conn = connect(self.db_path)
+            day_calls, minute_calls = self._counts(conn, day_window, minute_window)
+        except sqlite3.Error as e:
+            logging.error(f"Error reading search quota: {e}")
+            day_calls, minute_calls = 0, 0
+        finally:
+            if conn:
+                conn.close()
+        return {
+            "day": max(0, self.daily_limit - day_calls),
+            "minute": max(0, self.per_minute_limit - minute_calls),
+        }
+
+    def try_acquire(self) -> bool:
+        """Counts one API call if both windows have room; False means the call must not be made."""
+        now = time.time()
+        day_window, minute_window = self._windows(now)
+        conn = None
+        try:
+            conn = connect(self.db_path)
+            conn.execute("BEGIN IMMEDIATE")
+            day_calls, minute_calls = self._counts(conn, day_window, minute_window)
+            if day_calls >= self.daily_limit or minute_calls >= self.per_minute_limit:
+                conn.rollback()
+                SEARCH_QUOTA.inc(outcome="denied_day" if day_calls >= self.daily_limit else "denied_minute")
+                return False
+            conn.executemany(
+                "INSERT INTO search_quota (period, calls, expires_at) VALUES (?, 1, ?) "
+                "ON CONFLICT(period) DO UPDATE SET calls = calls + 1",
+                [(day_window, now + 2 * 86400), (minute_window, now + 120)]
+            )
+            conn.execute("DELETE FROM search_quota WHERE expires_at <= ?", (now,))
+            conn.commit()
+        except sqlite3.Error as e:
+            # Quota bookkeeping must not take search down with it
+            logging.error(f"Error updating search quota: {e}")
+            return True
+        finally:
+            if conn:
+                conn.close()
+        SEARCH_QUOTA.inc(outcome="granted")
+        return True
+
+    def mark_rate_limited(self):
+        """Records that the API answered 429: no further calls are made this minute."""
+        now = time.time()
+        _, minute_window = self._windows(now)
+        conn = None
+        try:
+            conn = connect(self.db_path)
+            conn.execute(
+                "INSERT INTO search_quota (period, calls, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(period) DO UPDATE SET calls = MAX(calls, excluded.calls)",
+                (minute_window, self.per_minute_limit, now + 120)
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Error updating search quota: {e}")
+        finally:
+            if conn:
+                conn.close()
+        SEARCH_QUOTA.inc(outcome="rate_limited")
+
+    def case_budget(self, queue_depth: int = 1) -> int:
+        """
+        API calls one case may make: what is left of the minute and of the day, shared
+        by the `queue_depth` cases in flight (at least one call while any is left),
+        capped at max_queries_per_case.
+        """
+        remaining = self.remaining()
+        available = min(remaining["day"], remaining["minute"])
+        if available <= 0:
+            return 0
+        return min(self.max_queries_per_case, max(1, available // max(1, queue_depth)))
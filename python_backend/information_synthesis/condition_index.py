@@ -0,0 +1,82 @@
+# information_synthesis/condition_index.py
+import numpy as np
+
+# Symptom -> condition incidence of the knowledge graph as a sparse matrix in CSR form:
+# row i (symptom i) lists the indices of the conditions it is a SYMPTOM_OF, with the
+# rows of its SYNONYM_OF targets merged in. Scoring a symptom set concatenates its rows
+# and counts occurrences per condition with one np.bincount, so ranking all conditions
+# costs time proportional to the matched relations rather than to the number of
+# conditions or SQL round trips.
+
+
+class ConditionIndex:
+    """
+    Immutable symptom x condition incidence built from (symptom, condition) pairs and
+    (symptom, synonym target) pairs. Texts are expected lowercased, as stored in the KG.
+    """
+    def __init__(self, symptom_of: list[tuple[str, str]], synonym_of: list[tuple[str, str]] = ()):
+        conditions_by_symptom: dict[str, set[str]] = {}
+        for symptom, condition in symptom_of:
+            conditions_by_symptom.setdefault(symptom, set()).add(condition)
+
+        self.conditions = sorted({condition for _, condition in symptom_of})
+        condition_ids = {condition: i for i, condition in enumerate(self.conditions)}
+
+        synonyms: dict[str, set[str]] = {}
+        for symptom, target in synonym_of:
+            synonyms.setdefault(symptom, set()).add(target)
+
+        self.symptom_ids: dict[str, int] = {}
+        indptr = [0]
+        indices = []
+        for symptom in sorted(set(conditions_by_symptom) | set(synonyms)):
+            row = set()
+            for related in self._synonym_closure(symptom, synonyms):
+                row |= conditions_by_symptom.get(related, set())
+            if not row:
+                continue
+            self.symptom_ids[symptom] = len(indptr) - 1
+            indices.extend(sorted(condition_ids[condition] for condition in row))
+            indptr.append(len(indices))
+
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        # Symptoms (synonyms included) per condition, for ranking ties by coverage
+        self.symptom_counts = np.bincount(self.indices, minlength=len(self.conditions))
+
+    @staticmethod
+    def _synonym_closure(symptom: str, synonyms: dict[str, set[str]]) -> set[str]:
+        seen = {symptom}
+        pending = [symptom]
+        while pending:
+            for target in synonyms.get(pending.pop(), ()):
+                if target not in seen:
+                    seen.add(target)
+                    pending.append(target)
+        return seen
+
+    def __len__(self):
+        return len(self.conditions)
+
+    def rank(self, symptoms: list[str], limit: int | None = None) -> list[dict]:
+        """
+        Conditions matching at least one of `symptoms`, best first: most matched symptoms,
+        then the larger share of the condition's symptoms matched, then by name. Each entry
+        is {"condition", "match_count", "symptom_count"}.
+        """
+        rows = {self.symptom_ids[s] for s in (symptom.strip().lower() for symptom in symptoms) if s in self.symptom_ids}
+        if not rows:
+            return []
+        indices = np.concatenate([self.indices[self.indptr[row]:self.indptr[row + 1]] for row in rows])
+        counts = np.bincount(indices, minlength=len(self.conditions))
+        matched = np.flatnonzero(counts)
+        match_counts = counts[matched]
+        totals = self.symptom_counts[matched]
+        # lexsort sorts by the last key first; matched is already in name order
+        order = np.lexsort((matched, totals, -match_counts))
+        if limit is not None:
+            order = order[:limit]
+        return [
+            {"condition": self.conditions[matched[i]], "match_count": int(match_counts[i]), "symptom_count": int(totals[i])}
+            for i in order
+        ]
@@ -1,7 +1,8 @@
 # information_synthesis/entity_extractor.py
 import logging
-import re
 from typing import List, Dict
+from information_synthesis.spans import EntitySpans, Vocabulary
+from utils.document import Document, analyze, tokenize
 
 # For a real system, you'd use a dedicated pre-trained medical NER model.
 # Example: from transformers import pipeline
@@ -18,28 +19,49 @@ class MedicalEntityExtractor:
             "allergy": ["penicillin", "latex", "nuts"],
             "lab_test": ["a1c", "glucose", "cholesterol", "blood pressure"]
         }
+        # Keywords are looked up by their first token in the document's token index
+        # (DISEASE, SYMPTOM, DRUG etc.)
+        self._keywords = [
+            (label.upper(), keyword, tokenize(keyword)[0])
+            for label, keywords in self.medical_terms_keywords.items()
+            for keyword in keywords
+        ]
+        # Matched terms are interned once and shared by the spans of every document
+        self.terms = Vocabulary()
         logging.info("Initialized MedicalEntityExtractor (using simple keyword matching).")
 
-    def extract(self, text: str) -> list[dict]:
+    def extract(self, text: str | Document) -> list[dict]:
         """
         Extracts medical entities (e.g., diseases, symptoms, drugs) from text.
         Returns a list of dictionaries with 'text', 'label', 'start', 'end'.
         """
-        entities = []
-        cleaned_text = text.lower() # Work with lowercase for simple matching
-
-        for label, keywords in self.medical_terms_keywords.items():
-            for keyword in keywords:
-                # Use regex to find all occurrences of the keyword
-                for match in re.finditer(r'\b' + re.escape(keyword) + r'\b', cleaned_text):
-                    entities.append({
-                        "text": match.group(0),
-                        "label": label.upper(), # DISEASE, SYMPTOM, DRUG etc.
-                        "start": match.start(),
-                        "end": match.end()
-                    })
+        return self.extract_spans(text).to_dicts()
+
+    def extract_spans(self, text: str | Document) -> EntitySpans:
+        """Like extract(), but returns the compact EntitySpans form (see information_synthesis/spans.py)."""
+        entities = EntitySpans(self.terms)
+        document = analyze(text)
+        lower = document.lower # Work with lowercase for simple matching
+
+        for label, keyword, first_token in self._keywords:
+            # Whole-word occurrences of the keyword, without overlaps (as a \bkeyword\b regex finds them)
+            last_end = 0
+            for index in document.positions(first_token):
+                start = document.token_starts[index]
+                end = start + len(keyword)
+                if start < last_end or not lower.startswith(keyword, start):
+                    continue
+                if _is_word_char(lower, start - 1) or _is_word_char(lower, end):
+                    continue
+                entities.append(start, end, label, keyword)
+                last_end = end
         logging.debug(f"Extracted {len(entities)} entities.")
         return entities
+
+
+def _is_word_char(text: str, index: int) -> bool:
+    """Whether text[index] exists and is a regex word character."""
+    return 0 <= index < len(text) and (text[index].isalnum() or text[index] == "_")
     
 
 if __name__ == "__main__":
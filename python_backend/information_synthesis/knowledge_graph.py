@@ -2,10 +2,22 @@
 import sqlite3
 import json
 import logging
+import threading
+import time
+from information_synthesis.condition_index import ConditionIndex
+from utils.sqlite_utils import connect
+
+# How often rank_conditions checks whether another process added relations
+CONDITION_INDEX_CHECK_SECONDS = 30.0
 
 class MedicalKnowledgeGraph:
     def __init__(self, db_path: str = "knowledge_graph.db", ontology_path: str = None):
         self.db_path = db_path
+        # In-memory ConditionIndex, rebuilt when the relations table has grown
+        self._condition_index = None
+        self._condition_index_watermark = None
+        self._condition_index_checked = 0.0
+        self._condition_index_lock = threading.Lock()
         self._initialize_db()
         self.ontology_path = ontology_path # Path to external ontology file/API if used for initial population
         self._load_initial_ontology_data()
@@ -15,7 +27,7 @@ class MedicalKnowledgeGraph:
         """Initializes the SQLite database for the knowledge graph."""
         conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = connect(self.db_path)
             cursor = conn.cursor()
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS entities (
@@ -79,30 +91,63 @@ class MedicalKnowledgeGraph:
             {"head_text": "type 2 diabetes", "relation_type": "SYNONYM_OF", "tail_text": "diabetes mellitus type 2"},
         ]
 
-        for entity in initial_entities:
-            self.add_entity(entity['text'], entity['label'], "initial_ontology")
+        # Seed everything through one connection and one transaction; skip entirely if a
+        # previous start already seeded this database (relations have no UNIQUE constraint).
+        # BEGIN IMMEDIATE serializes the check-and-insert between concurrently starting workers.
+        conn = connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT COUNT(*) FROM relations WHERE source_url = 'initial_ontology'")
+            if cursor.fetchone()[0] > 0:
+                conn.rollback()
+                logging.info("Initial ontology data already present in Knowledge Graph.")
+                return
 
-        for rel in initial_relations:
-            # Need to get entity IDs first
-            head_id = self._get_entity_id(rel['head_text'])
-            tail_id = self._get_entity_id(rel['tail_text'])
-            if head_id and tail_id:
-                self.add_relation(head_id, rel['relation_type'], tail_id, "initial_ontology")
+            cursor.executemany(
+                "INSERT OR IGNORE INTO entities (text, label, source_url) VALUES (?, ?, ?)",
+                [(entity['text'].lower(), entity['label'].upper(), "initial_ontology") for entity in initial_entities]
+            )
+            entity_ids = dict(cursor.execute("SELECT text, id FROM entities").fetchall())
+            relation_rows = []
+            for rel in initial_relations:
+                head_id = entity_ids.get(rel['head_text'].lower())
+                tail_id = entity_ids.get(rel['tail_text'].lower())
+                if head_id and tail_id:
+                    relation_rows.append((head_id, rel['relation_type'].upper(), tail_id, "initial_ontology"))
+            cursor.executemany(
+                "INSERT OR IGNORE INTO relations (head_id, relation_type, tail_id, source_url) VALUES (?, ?, ?, ?)",
+                relation_rows
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Error loading initial ontology data: {e}")
+            return
+        finally:
+            conn.close()
 
         logging.info("Initial ontology data loaded into Knowledge Graph.")
 
 
     def _get_entity_id(self, text: str) -> int | None:
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         cursor.execute("SELECT id FROM entities WHERE text = ?", (text.lower(),))
         row = cursor.fetchone()
         conn.close()
         return row[0] if row else None
 
+    def entity_texts(self, label: str) -> list[str]:
+        """Texts of all entities with the given label (e.g. "DRUG")."""
+        conn = connect(self.db_path)
+        try:
+            return [row[0] for row in conn.execute("SELECT text FROM entities WHERE label = ?", (label.upper(),))]
+        finally:
+            conn.close()
+
     def add_entity(self, text: str, label: str, source_url: str) -> int:
         """Adds an entity to the knowledge graph."""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         try:
             cursor.execute("INSERT OR IGNORE INTO entities (text, label, source_url) VALUES (?, ?, ?)",
@@ -125,12 +170,13 @@ class MedicalKnowledgeGraph:
 
     def add_relation(self, head_id: int, relation_type: str, tail_id: int, source_url: str):
         """Adds a relation between two entities."""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         try:
             cursor.execute("INSERT OR IGNORE INTO relations (head_id, relation_type, tail_id, source_url) VALUES (?, ?, ?, ?)",
                            (head_id, relation_type.upper(), tail_id, source_url))
             conn.commit()
+            self._condition_index_checked = 0.0
         except sqlite3.Error as e:
             logging.error(f"Error adding relation {relation_type} between {head_id} and {tail_id}: {e}")
         finally:
@@ -138,7 +184,7 @@ class MedicalKnowledgeGraph:
 
     def add_relations(self, relations_data: list[dict], source_url: str = "search_result"):
         """Adds multiple relations extracted from a document."""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         for rel in relations_data:
             head_id = self._get_entity_id(rel['head']['text'])
@@ -151,11 +197,55 @@ class MedicalKnowledgeGraph:
                     logging.warning(f"Could not add relation {rel['relation']} ({rel['head']['text']} -> {rel['tail']['text']}): {e}")
         conn.commit()
         conn.close()
+        self._condition_index_checked = 0.0
+
+    def condition_index(self) -> ConditionIndex:
+        """
+        The SYMPTOM_OF/SYNONYM_OF incidence as a ConditionIndex. It is rebuilt when the
+        relations table has grown, checked at most every CONDITION_INDEX_CHECK_SECONDS
+        (immediately after relations are added through this instance).
+        """
+        now = time.monotonic()
+        if self._condition_index is not None and now - self._condition_index_checked < CONDITION_INDEX_CHECK_SECONDS:
+            return self._condition_index
+        with self._condition_index_lock:
+            conn = connect(self.db_path)
+            try:
+                watermark = conn.execute("SELECT MAX(id), COUNT(*) FROM relations").fetchone()
+                if self._condition_index is None or watermark != self._condition_index_watermark:
+                    symptom_of = conn.execute("""
+                        SELECT T1.text, T2.text FROM relations R
+                        JOIN entities T1 ON R.head_id = T1.id
+                        JOIN entities T2 ON R.tail_id = T2.id
+                        WHERE R.relation_type = 'SYMPTOM_OF'
+                    """).fetchall()
+                    synonym_of = conn.execute("""
+                        SELECT T1.text, T2.text FROM relations R
+                        JOIN entities T1 ON R.head_id = T1.id
+                        JOIN entities T2 ON R.tail_id = T2.id
+                        WHERE R.relation_type = 'SYNONYM_OF' AND T2.label = 'SYMPTOM'
+                    """).fetchall()
+                    self._condition_index = ConditionIndex(symptom_of, synonym_of)
+                    self._condition_index_watermark = watermark
+                    logging.info(f"Built condition index: {len(self._condition_index)} conditions, "
+                                 f"{len(symptom_of)} SYMPTOM_OF relations.")
+            finally:
+                conn.close()
+            self._condition_index_checked = now
+        return self._condition_index
+
+    def rank_conditions(self, symptoms: list[str], limit: int | None = None) -> list[dict]:
+        """
+        Ranks the conditions related to any of `symptoms` (directly or through a symptom
+        synonym) by how many of the symptoms they match. Returns
+        [{"condition", "match_count", "symptom_count"}, ...], best first.
+        """
+        return self.condition_index().rank(symptoms, limit)
 
 
     def query_related_conditions(self, symptom_text: str) -> list[str]:
         """Queries the KG for conditions related to a symptom."""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         conditions = []
         symptom_id = self._get_entity_id(symptom_text)
@@ -185,7 +275,7 @@ class MedicalKnowledgeGraph:
 
     def query_drugs_for_condition(self, condition_text: str) -> list[str]:
         """Queries the KG for drugs that treat a condition."""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         drugs = []
         condition_id = self._get_entity_id(condition_text)
@@ -202,7 +292,7 @@ class MedicalKnowledgeGraph:
 
     def check_drug_interaction(self, drug1_text: str, drug2_text: str) -> bool:
         """Checks for interactions between two drugs."""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         drug1_id = self._get_entity_id(drug1_text)
         drug2_id = self._get_entity_id(drug2_text)
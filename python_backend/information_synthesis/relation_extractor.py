@@ -1,66 +1,58 @@
 # information_synthesis/relation_extractor.py
 import logging
+from information_synthesis.spans import EntitySpans, RelationSpans
+from utils.document import Document, analyze
 # For a real system, you'd use a dedicated pre-trained medical relation extraction model.
 # Example: from transformers import pipeline
 # For this example, we'll use a very simple rule-based approach.
 
+# head label -> [(tail label, relation, cue phrases)]
+RELATION_RULES = {
+    # Example 1: Drug A treats Disease B
+    # Example 3: Drug A side effect is Symptom B
+    "DRUG": [("DISEASE", "TREATS", ("treats", "is used for")), ("SYMPTOM", "HAS_SIDE_EFFECT", ("side effect", "can cause"))],
+    # Example 2: Symptom A caused by Disease B
+    "SYMPTOM": [("DISEASE", "CAUSED_BY", ("caused by", "symptom of"))],
+}
+
 class MedicalRelationExtractor:
     def __init__(self, model_path: str = None):
         # In a real scenario, model_path would point to a fine-tuned model for relation extraction.
         # self.rel_pipeline = pipeline("relation-extraction", model=model_path, tokenizer=model_path)
         logging.info("Initialized MedicalRelationExtractor (using simple rule-based matching).")
 
-    def extract(self, text: str, entities: list[dict]) -> list[dict]:
+    def extract(self, text: str | Document, entities: list[dict]) -> list[dict]:
         """
         Extracts relationships between identified entities in the text.
         This is a very simplistic rule-based approach.
         A real system would use advanced NLP models.
         """
-        relations = []
-        cleaned_text = text.lower()
-
-        # Simple rule: If "treats" or "is treated by" is between a drug and a disease
-        for i, entity1 in enumerate(entities):
-            for j, entity2 in enumerate(entities):
-                if i == j: continue
-
-                # Example 1: Drug A treats Disease B
-                if entity1['label'] == 'DRUG' and entity2['label'] == 'DISEASE':
-                    # Check if 'treats' or similar verb is between them in the text
-                    # This is highly simplified and prone to errors.
-                    start_idx = min(entity1['start'], entity2['start'])
-                    end_idx = max(entity1['end'], entity2['end'])
-                    segment = cleaned_text[start_idx:end_idx]
-                    if "treats" in segment or "is used for" in segment:
-                        relations.append({
-                            "head": entity1,
-                            "relation": "TREATS",
-                            "tail": entity2
-                        })
+        if not isinstance(entities, EntitySpans):
+            entities = EntitySpans.from_dicts(entities)
+        return self.extract_spans(text, entities).to_dicts()
 
-                # Example 2: Symptom A caused by Disease B
-                elif entity1['label'] == 'SYMPTOM' and entity2['label'] == 'DISEASE':
-                    start_idx = min(entity1['start'], entity2['start'])
-                    end_idx = max(entity1['end'], entity2['end'])
-                    segment = cleaned_text[start_idx:end_idx]
-                    if "caused by" in segment or "symptom of" in segment:
-                        relations.append({
-                            "head": entity1,
-                            "relation": "CAUSED_BY",
-                            "tail": entity2
-                        })
+    def extract_spans(self, text: str | Document, entities: EntitySpans) -> RelationSpans:
+        """Like extract(), but works on and returns the compact span form (see information_synthesis/spans.py)."""
+        relations = RelationSpans(entities)
+        cleaned_text = analyze(text).lower
+        # Possible tails for each head label, in document order
+        tails = {
+            head_label: sorted(
+                ((j, relation, cues) for tail_label, relation, cues in rules for j in entities.indices_with_label(tail_label)),
+                key=lambda tail: tail[0]
+            )
+            for head_label, rules in RELATION_RULES.items()
+        }
 
-                # Example 3: Drug A side effect is Symptom B
-                elif entity1['label'] == 'DRUG' and entity2['label'] == 'SYMPTOM':
-                    start_idx = min(entity1['start'], entity2['start'])
-                    end_idx = max(entity1['end'], entity2['end'])
-                    segment = cleaned_text[start_idx:end_idx]
-                    if "side effect" in segment or "can cause" in segment:
-                        relations.append({
-                            "head": entity1,
-                            "relation": "HAS_SIDE_EFFECT",
-                            "tail": entity2
-                        })
+        # Simple rule: a cue phrase between the two mentions, for each pair of labels above.
+        # This is highly simplified and prone to errors.
+        for i in range(len(entities)):
+            for j, relation, cues in tails.get(entities.label(i), ()):
+                start_idx = min(entities.starts[i], entities.starts[j])
+                end_idx = max(entities.ends[i], entities.ends[j])
+                segment = cleaned_text[start_idx:end_idx]
+                if any(cue in segment for cue in cues):
+                    relations.append(i, relation, j)
         logging.debug(f"Extracted {len(relations)} relations.")
         return relations
     
@@ -0,0 +1,167 @@
+# information_synthesis/spans.py
+import sys
+from array import array
+
+# Compact results for entity and relation extraction. A document with many mentions
+# would otherwise allocate one dict (plus its key and value strings) per entity and
+# per relation; here every mention is four integers in parallel arrays, strings are
+# interned once in a vocabulary, and relations point at entity indices. Iterating or
+# indexing still yields the dict format of MedicalEntityExtractor.extract and
+# MedicalRelationExtractor.extract, built on demand.
+
+
+class Vocabulary:
+    """
+    Maps strings to small integer ids and back; every string is stored once. With
+    `intern_strings`, strings are also interned process-wide (sys.intern), which only
+    pays off for vocabularies that live as long as the process.
+    """
+    def __init__(self, strings=(), intern_strings: bool = True):
+        self.strings: list[str] = []
+        self._ids: dict[str, int] = {}
+        self.intern_strings = intern_strings
+        for string in strings:
+            self.id(string)
+
+    def id(self, string: str) -> int:
+        string_id = self._ids.get(string)
+        if string_id is None:
+            string_id = len(self.strings)
+            if self.intern_strings:
+                string = sys.intern(string)
+            self.strings.append(string)
+            self._ids[string] = string_id
+        return string_id
+
+    def get(self, string: str) -> int | None:
+        """The id of `string`, or None if it was never added."""
+        return self._ids.get(string)
+
+    def __getitem__(self, string_id: int) -> str:
+        return self.strings[string_id]
+
+    def __len__(self):
+        return len(self.strings)
+
+
+# Entity labels and relation types are shared by all documents
+LABELS = Vocabulary()
+
+
+class EntitySpans:
+    """
+    Entity mentions of one document as parallel arrays of start, end, label id and
+    term id. Indexing and iteration return {"text", "label", "start", "end"} dicts.
+    """
+    __slots__ = ("terms", "starts", "ends", "label_ids", "term_ids")
+
+    def __init__(self, terms: Vocabulary | None = None):
+        self.terms = terms if terms is not None else Vocabulary()
+        self.starts = array("i")
+        self.ends = array("i")
+        self.label_ids = array("i")
+        self.term_ids = array("i")
+
+    @classmethod
+    def from_dicts(cls, entities: list[dict], terms: Vocabulary | None = None) -> "EntitySpans":
+        spans = cls(terms)
+        for entity in entities:
+            spans.append(entity["start"], entity["end"], entity["label"], entity["text"])
+        return spans
+
+    def append(self, start: int, end: int, label: str, text: str):
+        self.starts.append(start)
+        self.ends.append(end)
+        self.label_ids.append(LABELS.id(label))
+        self.term_ids.append(self.terms.id(text))
+
+    def label(self, index: int) -> str:
+        return LABELS[self.label_ids[index]]
+
+    def text(self, index: int) -> str:
+        return self.terms[self.term_ids[index]]
+
+    def indices_with_label(self, label: str) -> list[int]:
+        label_id = LABELS.id(label)
+        return [i for i, value in enumerate(self.label_ids) if value == label_id]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index: int) -> dict:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("entity index out of range")
+        return {"text": self.text(index), "label": self.label(index), "start": self.starts[index], "end": self.ends[index]}
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def to_dicts(self) -> list[dict]:
+        return list(self)
+
+    def __getstate__(self):
+        # Label ids are only meaningful within one process (e.g. spans returned by a
+        # CPU executor worker), so labels travel as strings.
+        return self.terms, self.starts, self.ends, [LABELS[label_id] for label_id in self.label_ids], self.term_ids
+
+    def __setstate__(self, state):
+        self.terms, self.starts, self.ends, labels, self.term_ids = state
+        self.label_ids = array("i", [LABELS.id(label) for label in labels])
+
+
+class RelationSpans:
+    """
+    Relations of one document as parallel arrays of head index, relation id and tail
+    index into an EntitySpans. Indexing and iteration return {"head", "relation",
+    "tail"} dicts whose head and tail are entity dicts.
+    """
+    __slots__ = ("entities", "heads", "relation_ids", "tails")
+
+    def __init__(self, entities: EntitySpans):
+        self.entities = entities
+        self.heads = array("i")
+        self.relation_ids = array("i")
+        self.tails = array("i")
+
+    def append(self, head: int, relation: str, tail: int):
+        self.heads.append(head)
+        self.relation_ids.append(LABELS.id(relation))
+        self.tails.append(tail)
+
+    def relation(self, index: int) -> str:
+        return LABELS[self.relation_ids[index]]
+
+    def __len__(self):
+        return len(self.heads)
+
+    def __getitem__(self, index: int) -> dict:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("relation index out of range")
+        return {"head": self.entities[self.heads[index]], "relation": self.relation(index), "tail": self.entities[self.tails[index]]}
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def to_dicts(self) -> list[dict]:
+        """Relation dicts; an entity used by several relations is the same dict object in each."""
+        entity_dicts = {}
+        relations = []
+        for head, relation_id, tail in zip(self.heads, self.relation_ids, self.tails):
+            for index in (head, tail):
+                if index not in entity_dicts:
+                    entity_dicts[index] = self.entities[index]
+            relations.append({"head": entity_dicts[head], "relation": LABELS[relation_id], "tail": entity_dicts[tail]})
+        return relations
+
+    def __getstate__(self):
+        return self.entities, self.heads, [LABELS[relation_id] for relation_id in self.relation_ids], self.tails
+
+    def __setstate__(self, state):
+        self.entities, self.heads, relations, self.tails = state
+        self.relation_ids = array("i", [LABELS.id(relation) for relation in relations])
@@ -1,74 +1,94 @@
+import logging
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import re
-import nltk
 from nltk.corpus import stopwords
-from nltk.stem import PorterStemmer
-
-# Download NLTK data if not already present
-try:
-    stopwords.words('english')
-except LookupError:
-    nltk.download('stopwords')
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-
-def textrank_summarize(text: str, num_sentences: int = 3) -> str:
+from utils.document import Document, analyze, ensure_nltk_data
+
+_stop_words = None
+
+def _english_stop_words() -> frozenset[str]:
+    global _stop_words
+    if _stop_words is None:
+        _stop_words = frozenset(stopwords.words('english'))
+    return _stop_words
+
+def textrank_summarize(text: str | Document, num_sentences: int = 3) -> str:
     """
     Performs extractive summarization using the TextRank algorithm.
 
     Args:
-        text (str): The input text to be summarized.
+        text (str | Document): The input text to be summarized, or its shared
+                               Document (see utils/document.py).
         num_sentences (int): The desired number of sentences in the summary.
                              Defaults to 3.
 
     Returns:
         str: The extracted summary.
     """
+    if isinstance(text, Document):
+        document, text = text, text.text
+    else:
+        document = None
     if not isinstance(text, str) or not text.strip():
-        print("Error: Input text must be a non-empty string.")
+        logging.error("Input text must be a non-empty string.")
         return ""
     if not isinstance(num_sentences, int) or num_sentences <= 0:
-        print("Error: num_sentences must be a positive integer.")
+        logging.error("num_sentences must be a positive integer.")
         return ""
 
+    ensure_nltk_data()
+    document = document or analyze(text)
+
     # 1. Split the text into sentences
-    # Using NLTK's sentence tokenizer for better accuracy
-    sentences = nltk.sent_tokenize(text)
+    # The document's sentence boundaries come from NLTK's sentence tokenizer
+    sentences = [document.sentence_text(i) for i in range(len(document.sentences))]
 
     # Handle cases where the text might be too short for the requested summary length
     if num_sentences > len(sentences):
-        print(f"Warning: Requested {num_sentences} sentences, but only {len(sentences)} available. Returning all sentences.")
+        logging.warning(f"Requested {num_sentences} sentences, but only {len(sentences)} available. Returning all sentences.")
         num_sentences = len(sentences)
 
     # 2. Preprocess sentences for similarity calculation
-    # Remove special characters, convert to lowercase, remove stopwords, and stem words
-    stop_words = set(stopwords.words('english'))
-    stemmer = PorterStemmer()
-
-    clean_sentences = []
-    for sentence in sentences:
-        # Remove non-alphabetic characters and split into words
-        words = re.sub(r'[^a-zA-Z]', ' ', sentence).lower().split()
-        # Remove stopwords and stem words
-        words = [stemmer.stem(word) for word in words if word not in stop_words]
-        clean_sentences.append(' '.join(words))
+    # The document's tokens are already lowercased and stemmed; keep alphabetic
+    # words that are not stopwords, and count each sentence's stems
+    vocabulary = document.vocabulary
+    stop_words = {vocabulary.get(word) for word in _english_stop_words()} - {None}
+    token_ids = document.token_ids
+    stem_ids = document.stem_ids
+    rows, columns = [], []
+    for i in range(len(sentences)):
+        for t in document.sentence_tokens(i):
+            if token_ids[t] in stop_words or not vocabulary[token_ids[t]].isalpha():
+                continue
+            # Single-character stems carry no weight (as in TfidfVectorizer's default token pattern)
+            if len(vocabulary[stem_ids[t]]) > 1:
+                rows.append(i)
+                columns.append(stem_ids[t])
+
+    # scikit-learn is slow to import, so only pull it in when a summary is actually requested
+    from scipy.sparse import csr_matrix
+    from sklearn.feature_extraction.text import TfidfTransformer
+    from sklearn.metrics.pairwise import cosine_similarity
 
     # 3. Create TF-IDF vectors for sentences
     # TF-IDF (Term Frequency-Inverse Document Frequency) reflects the importance of a word
     # in a document relative to a corpus. Here, each sentence is a "document".
-    vectorizer = TfidfVectorizer()
-    # Fit the vectorizer to the cleaned sentences and transform them into TF-IDF vectors
-    sentence_vectors = vectorizer.fit_transform(clean_sentences)
-
-    # 4. Calculate similarity between sentences
-    # Compute cosine similarity between all pairs of sentence vectors
-    # This creates a similarity matrix where each entry [i, j] is the similarity
-    # between sentence i and sentence j.
-    similarity_matrix = cosine_similarity(sentence_vectors)
+    # The stem counts of each sentence are weighted directly, without re-tokenizing
+    if columns:
+        vocabulary, column_indices = np.unique(np.asarray(columns, dtype=np.int64), return_inverse=True)
+        counts = csr_matrix(
+            (np.ones(len(rows)), (np.asarray(rows, dtype=np.int64), column_indices)),
+            shape=(len(sentences), len(vocabulary))
+        )
+        sentence_vectors = TfidfTransformer().fit_transform(counts)
+
+        # 4. Calculate similarity between sentences
+        # Compute cosine similarity between all pairs of sentence vectors
+        # This creates a similarity matrix where each entry [i, j] is the similarity
+        # between sentence i and sentence j.
+        similarity_matrix = cosine_similarity(sentence_vectors)
+    else:
+        # Nothing but stopwords: no sentence is similar to another
+        similarity_matrix = np.zeros((len(sentences), len(sentences)))
 
     # 5. Build the TextRank graph and run the algorithm
     # Initialize scores for each sentence (equivalent to PageRank initialization)
@@ -0,0 +1,232 @@
+# loadtest/run_loadtest.py
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+# Ensure the backend root is in sys.path for imports
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(BACKEND_DIR)
+
+from loadtest.stub_servers import GeminiStub, LatencyModel, SearchStub
+
+# Drives /process_case/ of a locally started app.py whose Config points at the
+# stub servers, and reports throughput and latency percentiles.
+
+REPORT_TEMPLATE = """
+Patient Name: Load Test {index}
+Date of Birth: 1970-01-01
+Last Visit: 2025-01-10
+Diagnosis: {diagnosis}
+Medications: Amlodipine 5mg QD, Hydrochlorothiazide 25mg QD
+Allergies: None known
+Previous Symptoms: Occasional headaches, mild dizziness.
+Lab Results (Recent): Blood Pressure 150/95 mmHg, Cholesterol (LDL) 135 mg/dL.
+"""
+DIAGNOSES = ["Essential Hypertension", "Type 2 Diabetes Mellitus", "Migraine", "Asthma", "Hyperlipidemia"]
+SYMPTOMS = ["severe headache", "nausea", "shortness of breath upon exertion", "fatigue", "blurred vision",
+            "frequent urination", "increased thirst", "dizziness", "chest pain", "cough"]
+
+
+def make_payloads(count: int, distinct: int, seed: int = 0) -> list[dict]:
+    """`count` request bodies drawn from `distinct` different cases."""
+    rng = random.Random(seed)
+    cases = [
+        {
+            "medical_report_text": REPORT_TEMPLATE.format(index=i, diagnosis=rng.choice(DIAGNOSES)),
+            "current_symptoms": rng.sample(SYMPTOMS, 3),
+        }
+        for i in range(max(1, distinct))
+    ]
+    return [cases[i % len(cases)] for i in range(count)]
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+async def drive_load(base_url: str, payloads: list[dict], concurrency: int, timeout: float) -> dict:
+    queue: asyncio.Queue = asyncio.Queue()
+    for payload in payloads:
+        queue.put_nowait(payload)
+    latencies, failures = [], {}
+
+    async def worker(client: httpx.AsyncClient):
+        while True:
+            try:
+                payload = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            try:
+                response = await client.post(f"{base_url}/process_case/", json=payload, timeout=timeout)
+                body = response.json()
+                ok = response.status_code == 200 and body.get("status") == "success"
+                reason = "ok" if ok else f"http_{response.status_code}/{body.get('status')}"
+            except httpx.HTTPError as e:
+                ok, reason = False, type(e).__name__
+            elapsed = time.perf_counter() - start
+            if ok:
+                latencies.append(elapsed)
+            else:
+                failures[reason] = failures.get(reason, 0) + 1
+
+    started = time.perf_counter()
+    async with httpx.AsyncClient(limits=httpx.Limits(max_connections=concurrency)) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(payloads),
+        "succeeded": len(latencies),
+        "failed": sum(failures.values()),
+        "failures": failures,
+        "concurrency": concurrency,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 3) if wall else 0.0,
+        "latency_seconds": {
+            "mean": round(sum(latencies) / len(latencies), 4) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50), 4),
+            "p95": round(percentile(latencies, 95), 4),
+            "p99": round(percentile(latencies, 99), 4),
+            "max": round(latencies[-1], 4) if latencies else 0.0,
+        },
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(env_overrides: dict, port: int, workdir: str, workers: int = 0) -> subprocess.Popen:
+    """Starts a single uvicorn process, or the serve.py supervisor when workers > 0."""
+    env = dict(os.environ, **env_overrides)
+    log_path = os.path.join(workdir, "app.log")
+    log_file = open(log_path, "w")
+    logging.info(f"Starting app on port {port} (log: {log_path})")
+    if workers > 0:
+        command = [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port)]
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+
+
+def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"App exited early with code {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/ready", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"App at {base_url} did not become ready within {timeout}s")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline load test of /process_case/ against local API stubs.")
+    parser.add_argument("-n", "--requests", type=int, default=50, help="Total number of cases to submit.")
+    parser.add_argument("-c", "--concurrency", type=int, default=5)
+    parser.add_argument("--distinct-cases", type=int, default=10, help="Number of distinct payloads to cycle through.")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request client timeout in seconds.")
+    parser.add_argument("--llm-latency", default="lognormal:0.8,0.5", help="const:S | uniform:LO,HI | lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--llm-429-rate", type=float, default=0.0, help="Fraction of Gemini calls answered with 429.")
+    parser.add_argument("--search-latency", default="lognormal:0.3,0.3")
+    parser.add_argument("--search-empty-rate", type=float, default=0.0, help="Fraction of queries returning no items.")
+    parser.add_argument("--page-latency", default="lognormal:0.2,0.5")
+    parser.add_argument("--page-paragraphs", type=int, default=20)
+    parser.add_argument("--crawl-delay", type=float, default=0.0, help="CRAWLER_RATE_LIMIT_SECONDS for the app.")
+    parser.add_argument("--workers", type=int, default=0, help="Run the app through serve.py with this many workers.")
+    parser.add_argument("--app-url", help="Drive an already running app instead of starting one (stubs are still started).")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra environment for the app.")
+    parser.add_argument("-o", "--output", help="Write the JSON report here.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    gemini = GeminiStub(LatencyModel(args.llm_latency, seed=args.seed), error_rate=args.llm_429_rate, seed=args.seed).start()
+    search = SearchStub(LatencyModel(args.search_latency, seed=args.seed + 1), LatencyModel(args.page_latency, seed=args.seed + 2),
+                        page_paragraphs=args.page_paragraphs, empty_rate=args.search_empty_rate).start()
+    workdir = tempfile.mkdtemp(prefix="medai_loadtest_")
+    process = None
+    try:
+        if args.app_url:
+            base_url = args.app_url.rstrip("/")
+        else:
+            kg_path = os.path.join(workdir, "knowledge_graph.db")
+            shutil.copy(os.path.join(BACKEND_DIR, "data", "knowledge_graph.db"), kg_path)
+            env = {
+                "GEMINI_API_KEY": "stub-key",
+                "GEMINI_API_BASE_URL": gemini.api_base_url,
+                "SEARCH_API_KEY": "stub-key",
+                "SEARCH_API_ENDPOINT": search.search_endpoint,
+                "EXTRA_TRUSTED_DOMAINS": search.trusted_domain,
+                "CRAWLER_RATE_LIMIT_SECONDS": str(args.crawl_delay),
+                "KNOWLEDGE_GRAPH_DB_PATH": kg_path,
+                "ARTICLE_DB_PATH": os.path.join(workdir, "medical_data.db"),
+                "SEARCH_CACHE_DB_PATH": os.path.join(workdir, "search_cache.db"),
+                "CASE_STATE_DB_PATH": os.path.join(workdir, "case_state.db"),
+                "SEARCH_QUOTA_DB_PATH": os.path.join(workdir, "search_quota.db"),
+                # Repeated cases would otherwise be answered from the result cache instead of the pipeline
+                "CASE_RESULT_CACHE_ENABLED": "False",
+                "CASE_RESULT_CACHE_DB_PATH": os.path.join(workdir, "case_results.db"),
+            }
+            env.update(dict(item.split("=", 1) for item in args.env))
+            port = _free_port()
+            base_url = f"http://127.0.0.1:{port}"
+            process = start_app(env, port, workdir, args.workers)
+            wait_until_ready(base_url, process)
+            if args.workers > 1:
+                # /ready answers from whichever worker accepts first; give the rest time to warm up.
+                time.sleep(2.0)
+
+        payloads = make_payloads(args.requests, args.distinct_cases, seed=args.seed)
+        report = asyncio.run(drive_load(base_url, payloads, args.concurrency, args.timeout))
+        report["stubs"] = {
+            "gemini_requests": gemini.requests_served,
+            "gemini_throttled": gemini.throttled,
+            "search_and_page_requests": search.requests_served,
+        }
+        report["settings"] = {k: v for k, v in vars(args).items() if k not in ("output", "env")}
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        gemini.stop()
+        search.stop()
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if process is not None:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0 if report["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    sys.exit(main())
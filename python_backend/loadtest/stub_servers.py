@@ -0,0 +1,260 @@
+# loadtest/stub_servers.py
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlparse
+
+# Ensure the backend root is in sys.path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks import fixtures
+
+# Local stand-ins for the Gemini generateContent endpoint and the Custom Search API
+# (plus the pages its results link to), so the service can be load-tested offline.
+
+FORMAT_PROMPT_MARKER = "Convert the following AI-generated prescription summary into a clean JSON object"
+PACKED_DOCUMENT_PATTERN = re.compile(r"\[\[DOCUMENT (\w+)\]\]")
+
+STUB_PRESCRIPTION_JSON = {
+    "assessment": "Likely uncontrolled essential hypertension (stub response).",
+    "treatment": [
+        {"medication": "Amlodipine", "dosage": "5mg QD", "instructions": "Continue; monitor blood pressure."},
+        {"lifestyle": "Reduce sodium intake and exercise regularly."}
+    ],
+    "considerations": ["Seek urgent care for chest pain or severe headache."],
+    "follow_up": "Recheck blood pressure in two weeks."
+}
+
+
+def _stable_hash(value: str) -> int:
+    return zlib.crc32(value.encode("utf-8"))
+
+
+class LatencyModel:
+    """
+    Samples artificial response delays. Specs are `const:S`, `uniform:LOW,HIGH` or
+    `lognormal:MEDIAN,SIGMA`, all in seconds.
+    """
+    def __init__(self, spec: str = "const:0", seed: int | None = None):
+        self.spec = spec
+        kind, _, params = spec.partition(":")
+        self.kind = kind
+        self.params = [float(p) for p in params.split(",") if p] or [0.0]
+        if kind not in ("const", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution '{spec}'")
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            if self.kind == "const":
+                return self.params[0]
+            if self.kind == "uniform":
+                low, high = self.params[0], self.params[1]
+                return self._rng.uniform(low, high)
+            median, sigma = self.params[0], self.params[1]
+            return self._rng.lognormvariate(0.0, sigma) * median
+
+    def sleep(self):
+        delay = self.sample()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class StubServer:
+    """Runs a ThreadingHTTPServer with the given handler on a background thread."""
+    def __init__(self, handler_cls, host: str = "127.0.0.1", port: int = 0):
+        self.httpd = ThreadingHTTPServer((host, port), handler_cls)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self.requests_served = 0
+        self._counter_lock = threading.Lock()
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def host(self) -> str:
+        return self.httpd.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def count_request(self):
+        with self._counter_lock:
+            self.requests_served += 1
+
+    def start(self):
+        self._thread.start()
+        logging.info(f"{type(self).__name__} listening on {self.base_url}")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} - {format % args}")
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: dict):
+        self._send(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+
+class GeminiStubHandler(_JSONHandler):
+    def do_POST(self):
+        stub = self.server.stub
+        stub.count_request()
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not re.search(r"/models/[^/:]+:generateContent$", urlparse(self.path).path):
+            self._send_json(404, {"error": {"code": 404, "message": "Not found"}})
+            return
+
+        stub.latency.sleep()
+        if stub.rng_uniform() < stub.error_rate:
+            stub.count_throttled()
+            self._send_json(429, {"error": {"code": 429, "message": "Resource has been exhausted (stub)", "status": "RESOURCE_EXHAUSTED"}})
+            return
+
+        prompt = "".join(part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", []))
+        if FORMAT_PROMPT_MARKER in prompt:
+            answer = "```json\n" + json.dumps(STUB_PRESCRIPTION_JSON, indent=2) + "\n```"
+        elif PACKED_DOCUMENT_PATTERN.search(prompt):
+            summaries = [
+                {"id": doc_id, "summary": f"Stub summary of document {doc_id}. " + fixtures.make_medical_text(2, seed=_stable_hash(doc_id))}
+                for doc_id in PACKED_DOCUMENT_PATTERN.findall(prompt)
+            ]
+            answer = "```json\n" + json.dumps({"summaries": summaries}) + "\n```"
+        else:
+            answer = f"Stub summary of a {len(prompt)}-character prompt. " + fixtures.make_medical_text(3, seed=len(prompt))
+        self._send_json(200, {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": answer}]}}],
+            "usageMetadata": {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(answer) // 4},
+        })
+
+
+class GeminiStub(StubServer):
+    """Emulates `POST /models/<model>:generateContent` with configurable latency and 429 injection."""
+    def __init__(self, latency: LatencyModel, error_rate: float = 0.0, seed: int = 0, **kwargs):
+        super().__init__(GeminiStubHandler, **kwargs)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttled = 0
+        self._rng = random.Random(seed)
+
+    def rng_uniform(self) -> float:
+        with self._counter_lock:
+            return self._rng.random()
+
+    def count_throttled(self):
+        with self._counter_lock:
+            self.throttled += 1
+
+    @property
+    def api_base_url(self) -> str:
+        return f"{self.base_url}/v1beta/models"
+
+
+class SearchStubHandler(_JSONHandler):
+    def do_GET(self):
+        stub = self.server.stub
+        stub.count_request()
+        parsed = urlparse(self.path)
+        if parsed.path == "/search":
+            stub.search_latency.sleep()
+            params = parse_qs(parsed.query)
+            query = params.get("q", [""])[0]
+            num = int(params.get("num", ["5"])[0])
+            if stub.is_empty_query(query):
+                self._send_json(200, {"kind": "customsearch#search", "searchInformation": {"totalResults": "0"}})
+                return
+            items = [
+                {
+                    "title": f"{query.title()} - overview {i + 1}",
+                    "link": f"{stub.base_url}/pages/{quote(query)}/{i}",
+                    "snippet": fixtures.make_medical_text(2, seed=_stable_hash(f"{query}/{i}")),
+                }
+                for i in range(num)
+            ]
+            self._send_json(200, {"kind": "customsearch#search", "items": items})
+        elif parsed.path.startswith("/pages/"):
+            stub.page_latency.sleep()
+            slug = unquote(parsed.path[len("/pages/"):])
+            html = fixtures.make_html(stub.page_paragraphs, seed=_stable_hash(slug))
+            self._send(200, html.encode("utf-8"), "text/html; charset=utf-8")
+        else:
+            self._send_json(404, {"error": "not found"})
+
+
+class SearchStub(StubServer):
+    """Emulates the Custom Search JSON API at `/search` and serves fixture pages under `/pages/`."""
+    def __init__(self, search_latency: LatencyModel, page_latency: LatencyModel, page_paragraphs: int = 20,
+                 empty_rate: float = 0.0, **kwargs):
+        super().__init__(SearchStubHandler, **kwargs)
+        self.search_latency = search_latency
+        self.page_latency = page_latency
+        self.page_paragraphs = page_paragraphs
+        self.empty_rate = empty_rate
+
+    def is_empty_query(self, query: str) -> bool:
+        # Deterministic per query, so empty results behave like a real "no items" query.
+        return (_stable_hash(query) % 1000) / 1000 < self.empty_rate
+
+    @property
+    def search_endpoint(self) -> str:
+        return f"{self.base_url}/search"
+
+    @property
+    def trusted_domain(self) -> str:
+        # SourceEvaluator compares the full netloc, which includes the port.
+        return f"{self.host}:{self.port}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Gemini and search API stubs in the foreground.")
+    parser.add_argument("--gemini-port", type=int, default=8701)
+    parser.add_argument("--search-port", type=int, default=8702)
+    parser.add_argument("--llm-latency", default="lognormal:0.8,0.5")
+    parser.add_argument("--llm-429-rate", type=float, default=0.0)
+    parser.add_argument("--search-latency", default="lognormal:0.3,0.3")
+    parser.add_argument("--page-latency", default="lognormal:0.2,0.5")
+    args = parser.parse_args(argv)
+
+    gemini = GeminiStub(LatencyModel(args.llm_latency), error_rate=args.llm_429_rate, port=args.gemini_port).start()
+    search = SearchStub(LatencyModel(args.search_latency), LatencyModel(args.page_latency), port=args.search_port).start()
+    print(f"GEMINI_API_BASE_URL={gemini.api_base_url}")
+    print(f"SEARCH_API_ENDPOINT={search.search_endpoint}")
+    print(f"EXTRA_TRUSTED_DOMAINS={search.trusted_domain}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        gemini.stop()
+        search.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -1,62 +1,377 @@
 # main.py
 import logging
 from config import Config
-from patient_data_processor.report_parser import MedicalReportParser
-from information_retrieval.search_engine import MedicalSearchEngine
-from information_retrieval.query_expander import QueryExpander
-from information_retrieval.source_evaluator import SourceEvaluator
-from information_synthesis.entity_extractor import MedicalEntityExtractor
-from information_synthesis.relation_extractor import MedicalRelationExtractor
 #from information_synthesis.summarizer import MedicalSummarizer
-from information_synthesis.knowledge_graph import MedicalKnowledgeGraph
-from prompt import text, text2, text3, extract_from_json  # Import your prompt text from a separate file
-from gemini_llm import GeminiLLM  # Import your LLM class
+from prompt import text, text2, text3, extract_from_json, packed_text, parse_packed_summaries, SUMMARY_PROMPT_VERSION, RECOMMENDATION_PROMPT_VERSION  # Import your prompt text from a separate file
+from gemini_llm import GeminiLLMError, GeminiLLMTimeout
+from utils.deadline import Deadline
+from utils.llm_scheduler import llm_client, is_urgent
+from utils.metrics import span, startup_step, record_cache
+from utils.structured_logging import REDACTED_FIELDS, configure_logging, parse_sample_rates
 import asyncio
+import itertools
+import threading
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+configure_logging(
+    level=Config.LOG_LEVEL,
+    json_format=Config.LOG_JSON,
+    max_chars=Config.LOG_MAX_FIELD_CHARS,
+    sample_rates=parse_sample_rates(Config.LOG_SAMPLE_RATES),
+    redact_fields=Config.LOG_REDACT_FIELDS or REDACTED_FIELDS,
+)
+
+RETRIEVAL_MODES = ("full", "snippets")
 
 class MedicalAIOrchestrator:
-    def __init__(self, config: Config):
+    """
+    Coordinates the pipeline. Components (and the modules that define them) are
+    built lazily on first use so that importing the app stays cheap; call
+    `warm_up()` to build everything ahead of the first request.
+    """
+    COMPONENTS = (
+        "report_parser", "query_expander", "source_evaluator", "article_store", "search_cache", "search_engine",
+        "entity_extractor", "relation_extractor", "knowledge_graph", "llm", "case_state_store", "cpu_executor",
+        "medication_normalizer", "search_quota", "case_result_cache",
+    )
+
+    def __init__(self, config: Config, eager: bool = False):
         self.config = config
-        self.report_parser = MedicalReportParser()
-        self.query_expander = QueryExpander(ontology_path=config.MEDICAL_ONTOLOGY_PATH)
-        self.source_evaluator = SourceEvaluator(trusted_domains=config.TRUSTED_MEDICAL_DOMAINS)
-        self.search_engine = MedicalSearchEngine(
-            api_key=config.SEARCH_API_KEY,
-            search_endpoint=config.SEARCH_API_ENDPOINT,
-            source_evaluator=self.source_evaluator
+        self._components = {}
+        self._init_lock = threading.RLock()
+        # Cases currently being processed by this worker, for the per-case search budget
+        self._active_cases = 0
+        # Client ids of cases and batches for the LLM scheduler's fair queuing
+        self._case_ids = itertools.count(1)
+        # Case key -> (task, deadline) of the run that duplicate requests wait for
+        self._inflight_cases = {}
+        if eager:
+            self.warm_up()
+
+    def _component(self, name: str):
+        # Optional components that are disabled in Config are stored as None.
+        if name not in self._components:
+            with self._init_lock:
+                if name not in self._components:
+                    with startup_step(f"init.{name}"):
+                        self._components[name] = getattr(self, f"_build_{name}")()
+        return self._components[name]
+
+    def warm_up(self) -> dict:
+        """Builds every component that is not built yet and returns which ones are ready."""
+        for name in self.COMPONENTS:
+            self._component(name)
+        with startup_step("warm_up.cpu_executor"):
+            self.cpu_executor.warm_up()
+        logging.info("MedicalAIOrchestrator warm-up complete.")
+        return self.component_status()
+
+    def component_status(self) -> dict:
+        return {name: name in self._components for name in self.COMPONENTS}
+
+    def shutdown(self):
+        """Stops the worker processes of the CPU executor, if it was built."""
+        cpu_executor = self._components.get("cpu_executor")
+        if cpu_executor is not None:
+            cpu_executor.shutdown()
+
+    def _build_report_parser(self):
+        from patient_data_processor.report_parser import MedicalReportParser
+        return MedicalReportParser()
+
+    def _build_query_expander(self):
+        from information_retrieval.query_expander import QueryExpander
+        return QueryExpander(ontology_path=self.config.MEDICAL_ONTOLOGY_PATH)
+
+    def _build_source_evaluator(self):
+        from information_retrieval.source_evaluator import SourceEvaluator
+        return SourceEvaluator(trusted_domains=self.config.TRUSTED_MEDICAL_DOMAINS)
+
+    def _build_article_store(self):
+        from data_ingestion.database_connector import DatabaseConnector
+        return DatabaseConnector(db_path=self.config.ARTICLE_DB_PATH)
+
+    def _build_search_cache(self):
+        if not self.config.SEARCH_CACHE_ENABLED:
+            return None
+        from information_retrieval.search_cache import SearchResultCache
+        return SearchResultCache(
+            db_path=self.config.SEARCH_CACHE_DB_PATH,
+            ttl_seconds=self.config.SEARCH_CACHE_TTL_SECONDS,
+            negative_ttl_seconds=self.config.SEARCH_CACHE_NEGATIVE_TTL_SECONDS
+        )
+
+    def _build_search_engine(self):
+        from information_retrieval.search_engine import MedicalSearchEngine
+        return MedicalSearchEngine(
+            api_key=self.config.SEARCH_API_KEY,
+            search_endpoint=self.config.SEARCH_API_ENDPOINT,
+            source_evaluator=self.source_evaluator,
+            article_store=self.article_store,
+            search_cache=self.search_cache,
+            cpu_executor=self.cpu_executor,
+            search_quota=self.search_quota
+        )
+
+    def _build_entity_extractor(self):
+        from information_synthesis.entity_extractor import MedicalEntityExtractor
+        return MedicalEntityExtractor(model_path=self.config.NER_MODEL_PATH)
+
+    def _build_relation_extractor(self):
+        from information_synthesis.relation_extractor import MedicalRelationExtractor
+        return MedicalRelationExtractor(model_path=self.config.REL_MODEL_PATH)
+
+    def _build_knowledge_graph(self):
+        from information_synthesis.knowledge_graph import MedicalKnowledgeGraph
+        return MedicalKnowledgeGraph(
+            db_path=self.config.KNOWLEDGE_GRAPH_DB_PATH,
+            ontology_path=self.config.MEDICAL_ONTOLOGY_PATH
+        )
+
+    def _build_llm(self):
+        from gemini_llm import GeminiLLM
+        return GeminiLLM.from_config(self.config)
+
+    def _build_case_state_store(self):
+        if not self.config.CASE_STATE_ENABLED:
+            return None
+        from patient_data_processor.case_state_store import CaseStateStore
+        return CaseStateStore(
+            db_path=self.config.CASE_STATE_DB_PATH,
+            ttl_seconds=self.config.CASE_STATE_TTL_SECONDS
+        )
+
+    def _build_cpu_executor(self):
+        from utils.cpu_executor import CpuExecutor
+        return CpuExecutor(max_workers=self.config.CPU_POOL_WORKERS)
+
+    def _build_medication_normalizer(self):
+        from patient_data_processor.medication_normalizer import MedicationNormalizer
+        return MedicationNormalizer.from_sources(
+            self.knowledge_graph.entity_texts("DRUG"), ontology=self.query_expander.ontology
         )
-        self.entity_extractor = MedicalEntityExtractor(model_path=config.NER_MODEL_PATH)
-        self.relation_extractor = MedicalRelationExtractor(model_path=config.REL_MODEL_PATH)
-        #self.summarizer = MedicalSummarizer(model_name=config.SUMMARIZER_MODEL_NAME)
-        self.knowledge_graph = MedicalKnowledgeGraph(
-            db_path=config.KNOWLEDGE_GRAPH_DB_PATH,
-            ontology_path=config.MEDICAL_ONTOLOGY_PATH
+
+    def _build_search_quota(self):
+        if not self.config.SEARCH_QUOTA_ENABLED:
+            return None
+        from information_retrieval.search_quota import SearchQuota
+        return SearchQuota(
+            db_path=self.config.SEARCH_QUOTA_DB_PATH,
+            daily_limit=self.config.SEARCH_DAILY_QUOTA,
+            per_minute_limit=self.config.SEARCH_PER_MINUTE_QUOTA,
+            max_queries_per_case=self.config.SEARCH_MAX_QUERIES_PER_CASE
         )
-        self.llm = GeminiLLM(api_key=config.GEMINI_API_KEY)
 
+    def _build_case_result_cache(self):
+        if not self.config.CASE_RESULT_CACHE_ENABLED:
+            return None
+        from patient_data_processor.case_result_cache import CaseResultCache
+        return CaseResultCache(
+            db_path=self.config.CASE_RESULT_CACHE_DB_PATH,
+            ttl_seconds=self.config.CASE_RESULT_CACHE_TTL_SECONDS
+        )
+
+    @property
+    def report_parser(self):
+        return self._component("report_parser")
+
+    @property
+    def query_expander(self):
+        return self._component("query_expander")
+
+    @property
+    def source_evaluator(self):
+        return self._component("source_evaluator")
 
-    async def process_patient_case(self, medical_report_text: str, current_symptoms: list):
+    @property
+    def article_store(self):
+        return self._component("article_store")
+
+    @property
+    def search_cache(self):
+        return self._component("search_cache")
+
+    @property
+    def search_engine(self):
+        return self._component("search_engine")
+
+    @property
+    def entity_extractor(self):
+        return self._component("entity_extractor")
+
+    @property
+    def relation_extractor(self):
+        return self._component("relation_extractor")
+
+    @property
+    def knowledge_graph(self):
+        return self._component("knowledge_graph")
+
+    @property
+    def llm(self):
+        return self._component("llm")
+
+    @property
+    def case_state_store(self):
+        return self._component("case_state_store")
+
+    @property
+    def cpu_executor(self):
+        return self._component("cpu_executor")
+
+    @property
+    def medication_normalizer(self):
+        return self._component("medication_normalizer")
+
+    @property
+    def search_quota(self):
+        return self._component("search_quota")
+
+    @property
+    def case_result_cache(self):
+        return self._component("case_result_cache")
+
+    async def process_patient_case(self, medical_report_text: str, current_symptoms: list, deadline: Deadline | None = None,
+                                   retrieval_mode: str | None = None, idempotency_key: str | None = None):
+        """
+        Runs the pipeline for one case. With a bounded `deadline`, each stage gets a share
+        of the remaining time and degrades instead of running over (fewer queries,
+        snippets instead of crawled pages, no per-source summaries, the fast model for
+        the recommendation, LLM calls cut to the time left and a knowledge-graph
+        recommendation once it is gone); the applied degradations are listed in
+        `deadline.degradations`.
+        `retrieval_mode` (default Config.RETRIEVAL_MODE) is "full" (crawl and summarize
+        sources) or "snippets" (use search titles and snippets as the evidence).
+        With the case result cache, a case identical to an earlier one (same normalized
+        report and symptoms, and no new articles or summaries since) is answered from the
+        cache, and concurrent duplicates share one run. A duplicate runs under the first
+        request's deadline rather than its own: it receives that run's degradations in
+        `deadline.degradations`, and its request timings only cover the wait. An
+        `idempotency_key` already used for a different case raises IdempotencyKeyConflict.
+        """
+        deadline = deadline or Deadline()
+        retrieval_mode = retrieval_mode or self.config.RETRIEVAL_MODE
+        cache = self.case_result_cache
+        if cache is None:
+            return await self._run_case(medical_report_text, current_symptoms, deadline, retrieval_mode)
+
+        case_key = cache.case_key(medical_report_text, current_symptoms, retrieval_mode, self._result_fingerprint())
+        if idempotency_key:
+            cache.claim_idempotency_key(idempotency_key, case_key)
+        cached = cache.get(case_key, self._corpus_generation(retrieval_mode))
+        if cached is not None:
+            logging.info(f"Returning cached result for case {case_key[:12]}.")
+            return cached
+
+        run, run_deadline = self._inflight_cases.get(case_key, (None, deadline))
+        if run is None:
+            run = asyncio.ensure_future(
+                self._run_and_cache_case(case_key, medical_report_text, current_symptoms, deadline, retrieval_mode)
+            )
+            self._inflight_cases[case_key] = (run, deadline)
+            run.add_done_callback(lambda task: self._forget_inflight_case(case_key, task))
+        else:
+            logging.info(f"Case {case_key[:12]} is already running; waiting for its result.")
+            record_cache("case_inflight", True)
+        # Shielded so that a cancelled request does not cancel the run other requests wait for
+        result = await asyncio.shield(run)
+        if run_deadline is not deadline:
+            for name in run_deadline.degradations:
+                deadline.degrade(name)
+        return result
+
+    async def _run_and_cache_case(self, case_key: str, medical_report_text: str, current_symptoms: list,
+                                  deadline: Deadline, retrieval_mode: str):
+        result = await self._run_case(medical_report_text, current_symptoms, deadline, retrieval_mode)
+        # Degraded and failed (empty) results are not reused; LLM failures raise and never get here.
+        # The generation is read after the run so that the summaries it stored do not make
+        # its own entry stale.
+        if result and not deadline.degradations:
+            self.case_result_cache.put(case_key, result, self._corpus_generation(retrieval_mode))
+        return result
+
+    def _forget_inflight_case(self, case_key: str, task: asyncio.Task):
+        self._inflight_cases.pop(case_key, None)
+        if not task.cancelled() and task.exception() is not None:
+            logging.error(f"Case {case_key[:12]} failed: {task.exception()}")
+
+    def _result_fingerprint(self) -> str:
+        """Everything besides the case itself that a cached result depends on."""
+        return "|".join((
+            f"recommendation_prompt={RECOMMENDATION_PROMPT_VERSION}",
+            f"summary_prompt={SUMMARY_PROMPT_VERSION}",
+            f"strong={self.llm.model_for('strong')}",
+            f"fast={self.llm.model_for('fast')}",
+        ))
+
+    def _corpus_generation(self, retrieval_mode: str) -> str | None:
+        """Generation of the article store a result in this mode depends on (None for snippets)."""
+        if retrieval_mode != "full":
+            return None
+        return self.article_store.corpus_generation()
+
+    async def _run_case(self, medical_report_text: str, current_symptoms: list, deadline: Deadline,
+                        retrieval_mode: str):
+        self._active_cases += 1
+        try:
+            with llm_client(f"case-{next(self._case_ids)}", urgent=self._is_urgent(current_symptoms)):
+                return await self._process_patient_case(medical_report_text, current_symptoms, deadline, retrieval_mode)
+        finally:
+            self._active_cases -= 1
+
+    async def _process_patient_case(self, medical_report_text: str, current_symptoms: list, deadline: Deadline,
+                                    retrieval_mode: str):
+        """The pipeline behind process_patient_case()."""
         logging.info("Starting patient case processing...")
+        if retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode '{retrieval_mode}'; expected one of {RETRIEVAL_MODES}.")
+
+        # Work already done for this report on an earlier visit, if any
+        report_hash = None
+        case_state = None
+        use_case_state = self.case_state_store is not None and retrieval_mode == "full"
+        if use_case_state:
+            report_hash = self.case_state_store.report_hash(medical_report_text)
+            case_state = self.case_state_store.get(report_hash)
 
         # 1. Process Patient Data
-        parsed_report = self.report_parser.parse(medical_report_text)
-        patient_data = {
-            "symptoms": current_symptoms + parsed_report.get("diagnosed_conditions", []),
-            "medications": parsed_report.get("medications", []),
-            "allergies": parsed_report.get("allergies", []),
-            "patient_history_keywords": parsed_report.get("keywords", [])
-            # Add more relevant patient data fields
-        }
-        logging.info(f"Parsed patient data: {patient_data}")
+        if case_state is not None:
+            parsed_report = case_state["parsed_report"]
+        else:
+            with span("parse_report"):
+                parsed_report = await self.cpu_executor.parse_report(medical_report_text)
+        patient_data = self._patient_data(parsed_report, current_symptoms)
+        logging.info("Parsed patient data", extra={"stage": "parse_report", "payload": patient_data})
 
         # 2. Formulate Search Queries
-        base_query_terms = patient_data["symptoms"] + patient_data["patient_history_keywords"]
-        expanded_queries = self.query_expander.expand_queries(base_query_terms)
-        logging.info(f"Expanded search queries: {expanded_queries}")
+        expanded_queries = self._expand_queries(patient_data)
+        logging.info("Expanded search queries", extra={"stage": "expand_queries", "payload": {"queries": expanded_queries}})
+
+        # Only queries that were not searched for this report before need a search
+        previous_queries = set(case_state["queries"]) if case_state is not None else set()
+        new_queries = [query for query in expanded_queries if query not in previous_queries]
+        if case_state is not None:
+            logging.info(f"Returning patient: {len(new_queries)} of {len(expanded_queries)} queries are new.")
 
         # 3. Information Retrieval (Internet Search)
-        search_results = self.search_engine.search_medical_information(expanded_queries)
+        # Searching and crawling block on the network, so they run in a thread; pages are
+        # parsed in the CPU executor's worker processes. Uncached queries are limited to
+        # this case's share of the search quota, most valuable first.
+        search_results = []
+        if new_queries:
+            new_queries = self._prioritize_queries(new_queries, current_symptoms, patient_data)
+            search_budget = self._search_budget(1)
+            with span("search"):
+                candidates = await asyncio.to_thread(
+                    self.search_engine.collect_results,
+                    new_queries, deadline=deadline.stage(self.config.DEADLINE_SEARCH_SHARE), max_api_calls=search_budget
+                )
+                if retrieval_mode == "snippets":
+                    search_results = self.search_engine.snippet_results(candidates)
+                else:
+                    search_results = await asyncio.to_thread(
+                        self.search_engine.crawl_results,
+                        candidates, deadline=deadline.stage(self.config.DEADLINE_CRAWL_SHARE)
+                    )
         
         logging.info(f"Retrieved {len(search_results)} search results.")
 
@@ -64,9 +379,32 @@ class MedicalAIOrchestrator:
         extracted_entities_all = []
         extracted_relations_all = []
         synthesized_summaries = {}
+        new_evidence = []
 
         summaries  = ""
 
+        # Summarize relevant sections (materialized summaries if they exist, packed calls if enabled).
+        # Snippets stand in for a page without being summarized.
+        summaries_by_url = {
+            result['url']: self._snippet_summary(result)
+            for result in search_results if result.get('content_source') == 'snippet'
+        }
+        summary_deadline = deadline.reserve(self.config.DEADLINE_RECOMMENDATION_RESERVE_SECONDS)
+        to_summarize = [result for result in search_results if result['url'] not in summaries_by_url]
+        if to_summarize and summary_deadline.expired():
+            deadline.degrade("skipped_source_summaries")
+        elif to_summarize:
+            summaries_by_url.update(await self._summarize_sources(
+                to_summarize, timeout=summary_deadline.remaining() if summary_deadline.bounded else None
+            ))
+        missing = [result for result in to_summarize if result['url'] not in summaries_by_url]
+        if missing and "skipped_source_summaries" not in deadline.degradations:
+            deadline.degrade("partial_source_summaries")
+        for result in missing:
+            # Summary skipped or cut off by the deadline: fall back to the search snippet
+            if result.get('snippet'):
+                summaries_by_url[result['url']] = self._snippet_summary(result)
+
         for i, result in enumerate(search_results):
             logging.info(f"Synthesizing information from result {i+1}: {result['title']}")
             text_content = result.get('content', '') # Assume 'content' is the main text from the search result
@@ -84,11 +422,16 @@ class MedicalAIOrchestrator:
             # logging.debug(f"Extracted relations: {relations}")
             # print(extracted_relations_all)
 
-            # Summarize relevant sections
-            t = text(text_content)
-            summary = await self.llm.predict(t)  # Await the coroutine
-            summaries += summary + "\n \n"
-            synthesized_summaries[result['url']] = summary
+            summary = summaries_by_url.get(result['url'])
+            if summary is None:
+                continue
+            new_evidence.append({
+                "url": result['url'],
+                "title": result['title'],
+                "credibility_score": result['credibility_score'],
+                "query_matched": result['query_matched'],
+                "summary": summary
+            })
             #print(summary)
 
             logging.debug(f"Generated summary: {summary}")
@@ -101,6 +444,26 @@ class MedicalAIOrchestrator:
 
         # logging.info("Information synthesis complete.")
 
+        # New evidence first, then evidence kept from earlier visits for queries that still apply
+        new_urls = {item["url"] for item in new_evidence}
+        previous_evidence = [
+            item for item in (case_state["evidence"] if case_state is not None else [])
+            if item["url"] not in new_urls
+        ]
+        still_relevant = [item for item in previous_evidence if item["query_matched"] in expanded_queries]
+        evidence = new_evidence + still_relevant[:max(0, self.config.MAX_SEARCH_RESULTS - len(new_evidence))]
+        for item in evidence:
+            summaries += item["summary"] + "\n \n"
+            synthesized_summaries[item["url"]] = item["summary"]
+
+        if use_case_state and not deadline.degradations:
+            # A search round that produced nothing may have failed; leave its queries to be retried.
+            # Degraded runs are not remembered, so the next visit does the full work.
+            searched = new_queries if search_results else []
+            self.case_state_store.save(
+                report_hash, parsed_report, list(previous_queries) + searched, new_evidence + previous_evidence
+            )
+
         # 5. Integrate Synthesized Information for Prescription Recommendation (Placeholder)
         # This is where the core "AI Brain" for diagnosis and prescription would live.
         # It would use the patient_data, extracted_entities_all, extracted_relations_all,
@@ -116,7 +479,18 @@ class MedicalAIOrchestrator:
         #     synthesized_summaries # Pass summaries for context
         # )
 
-        res = await self.recommend_prescription(summaries, medical_report_text, current_symptoms)
+        tier = "strong"
+        if deadline.bounded and deadline.remaining() < self.config.DEADLINE_RECOMMENDATION_RESERVE_SECONDS:
+            deadline.degrade("fast_model_recommendation")
+            tier = "fast"
+        res = await self.recommend_prescription(summaries, medical_report_text, current_symptoms, tier=tier,
+                                                deadline=deadline)
+        if res is None:
+            # The deadline ran out before or during the LLM calls: answer from the knowledge graph
+            deadline.degrade("knowledge_graph_recommendation")
+            res = self._generate_prescription_recommendation(
+                patient_data, [], [], self.knowledge_graph, synthesized_summaries
+            )
 
         # return {
         #     "patient_summary": patient_data,
@@ -126,6 +500,246 @@ class MedicalAIOrchestrator:
         # }
         return res
 
+    async def process_patient_cases(self, cases: list[dict]) -> list[dict]:
+        """
+        Processes several cases (each a dict with 'medical_report_text' and
+        'current_symptoms') with shared retrieval: the expanded queries of all cases
+        are searched once, each URL is crawled and summarized once, and the evidence
+        is then fanned out to one recommendation per case. Returns one
+        {"status", "result"} or {"status", "message"} entry per case, in order.
+        """
+        logging.info(f"Starting batch processing of {len(cases)} cases...")
+        self._active_cases += len(cases)
+        try:
+            # Shared summaries are urgent if any case of the batch is
+            urgent = any(self._is_urgent(case["current_symptoms"]) for case in cases)
+            with llm_client(f"batch-{next(self._case_ids)}", urgent=urgent):
+                return await self._process_patient_cases(cases)
+        finally:
+            self._active_cases -= len(cases)
+
+    async def _process_patient_cases(self, cases: list[dict]) -> list[dict]:
+        # 1-2. Parse every report and formulate its queries, most valuable first
+        case_queries = []
+        for case in cases:
+            with span("parse_report"):
+                parsed_report = await self.cpu_executor.parse_report(case["medical_report_text"])
+            patient_data = self._patient_data(parsed_report, case["current_symptoms"])
+            case_queries.append(self._prioritize_queries(self._expand_queries(patient_data), case["current_symptoms"], patient_data))
+        # Interleave the cases' queries so that a limited search budget covers every case's best queries
+        unique_queries = list(dict.fromkeys(
+            query for round_ in itertools.zip_longest(*case_queries) for query in round_ if query is not None
+        ))
+        logging.info(f"Batch of {len(cases)} cases needs {len(unique_queries)} distinct queries.")
+
+        # 3. Search each distinct query once, then pick and crawl each case's top sources
+        with span("search"):
+            candidates = await asyncio.to_thread(
+                self.search_engine.collect_results, unique_queries, max_api_calls=self._search_budget(len(cases))
+            )
+            page_cache = {}
+            case_results = []
+            for queries in case_queries:
+                wanted = set(queries)
+                case_results.append(await asyncio.to_thread(
+                    self.search_engine.crawl_results,
+                    [result for result in candidates if result['query_matched'] in wanted], page_cache
+                ))
+
+        # 4. Summarize each distinct source once
+        sources = {result['url']: result for results in case_results for result in results}
+        summaries_by_url = await self._summarize_sources(list(sources.values()), self.config.BATCH_SUMMARY_CONCURRENCY)
+        logging.info(f"Summarized {len(sources)} distinct sources for the batch.")
+
+        # 5. One recommendation per case from its share of the evidence
+        async def recommend(case, results):
+            summaries = ""
+            for result in results:
+                if summaries_by_url.get(result['url']) is not None:
+                    summaries += summaries_by_url[result['url']] + "\n \n"
+            with llm_client(f"case-{next(self._case_ids)}", urgent=self._is_urgent(case["current_symptoms"])):
+                return await self.recommend_prescription(summaries, case["medical_report_text"], case["current_symptoms"])
+
+        outcomes = await asyncio.gather(
+            *(recommend(case, results) for case, results in zip(cases, case_results)), return_exceptions=True
+        )
+        responses = []
+        for outcome in outcomes:
+            if isinstance(outcome, Exception):
+                logging.error(f"Batch case failed: {outcome}")
+                responses.append({"status": "error", "message": str(outcome)})
+            else:
+                responses.append({"status": "success", "result": outcome})
+        return responses
+
+    def _patient_data(self, parsed_report: dict, current_symptoms: list) -> dict:
+        return {
+            "symptoms": current_symptoms + parsed_report.get("diagnosed_conditions", []),
+            "medications": parsed_report.get("medications", []),
+            "allergies": parsed_report.get("allergies", []),
+            "patient_history_keywords": parsed_report.get("keywords", [])
+            # Add more relevant patient data fields
+        }
+
+    def _prioritize_queries(self, queries: list[str], current_symptoms: list, patient_data: dict) -> list[str]:
+        """
+        Orders queries by expected value: a current symptom itself, then queries that
+        mention one, then diagnosed conditions, then the rest (synonyms, related terms,
+        history keywords). The order is otherwise kept.
+        """
+        preprocess = self.query_expander.preprocessor.preprocess_for_search
+        symptoms = {preprocess(symptom) for symptom in current_symptoms if isinstance(symptom, str)} - {""}
+        conditions = {preprocess(term) for term in patient_data["symptoms"] if isinstance(term, str)} - symptoms - {""}
+
+        def rank(query: str) -> int:
+            if query in symptoms:
+                return 0
+            if any(symptom in query for symptom in symptoms):
+                return 1
+            if query in conditions:
+                return 2
+            return 3
+        return sorted(queries, key=rank)
+
+    def _is_urgent(self, current_symptoms: list) -> bool:
+        if self.config.LLM_URGENT_SYMPTOMS:
+            return is_urgent(current_symptoms, self.config.LLM_URGENT_SYMPTOMS)
+        return is_urgent(current_symptoms)
+
+    def _search_budget(self, num_cases: int) -> int | None:
+        """Search API calls `num_cases` cases may make now (None = unlimited)."""
+        if self.search_quota is None:
+            return None
+        return self.search_quota.case_budget(max(1, self._active_cases)) * num_cases
+
+    def _expand_queries(self, patient_data: dict) -> list[str]:
+        base_query_terms = patient_data["symptoms"] + patient_data["patient_history_keywords"]
+        with span("expand_queries"):
+            return self.query_expander.expand_queries(base_query_terms)
+
+    async def _summarize_sources(self, results: list[dict], concurrency: int = 1, timeout: float | None = None) -> dict:
+        """
+        Returns {url: summary} for the given search results (None for sources that could
+        not be summarized). Materialized summaries from the article store are used when
+        they exist. The remaining sources are summarized one LLM call per source, or,
+        with PACKED_SUMMARIES_ENABLED, several sources per call up to a token budget.
+        Calls still running after `timeout` seconds are cancelled and their sources
+        are left out of the result.
+        """
+        summaries = {}
+        unique_results = list({result['url']: result for result in results}.values())
+        if self.config.PACKED_SUMMARIES_ENABLED:
+            # Packing needs to know up front which sources still need a summary
+            pending = []
+            for result in unique_results:
+                summary = self._stored_summary(result)
+                if summary is not None:
+                    summaries[result['url']] = summary
+                else:
+                    pending.append(result)
+            groups = self._pack_sources(pending)
+        else:
+            groups = [[result] for result in unique_results]
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def summarize(group):
+            async with semaphore:
+                if len(group) > 1:
+                    return await self._summarize_packed(group)
+                result = group[0]
+                if not self.config.PACKED_SUMMARIES_ENABLED:
+                    summary = self._stored_summary(result)
+                    if summary is not None:
+                        return {result['url']: summary}
+                return {result['url']: await self._summarize_source(result)}
+
+        tasks = [asyncio.ensure_future(summarize(group)) for group in groups]
+        if tasks:
+            done, unfinished = await asyncio.wait(tasks, timeout=timeout)
+            for task in unfinished:
+                task.cancel()
+            for task in tasks:
+                if task in done:
+                    summaries.update(task.result())
+        return summaries
+
+    @staticmethod
+    def _snippet_summary(result: dict) -> str:
+        """Evidence text for a source that is used by its search snippet only."""
+        return f"{result.get('title') or result['url']}: {result.get('snippet') or ''}"
+
+    def _pack_sources(self, results: list[dict]) -> list[list[dict]]:
+        """Groups sources in order so that each group's estimated prompt size fits the token budget."""
+        groups = []
+        group = []
+        group_tokens = 0
+        for result in results:
+            tokens = len(result.get('content', '')) // 4 + 1  # ~4 characters per token
+            if group and (group_tokens + tokens > self.config.PACKED_SUMMARY_TOKEN_BUDGET
+                          or len(group) >= self.config.PACKED_SUMMARY_MAX_DOCUMENTS):
+                groups.append(group)
+                group = []
+                group_tokens = 0
+            group.append(result)
+            group_tokens += tokens
+        if group:
+            groups.append(group)
+        return groups
+
+    async def _summarize_packed(self, group: list[dict]) -> dict:
+        """
+        Summarizes several sources with one packed_text() call. Sources missing from the
+        answer (or all of them, if it cannot be parsed) are summarized one by one.
+        """
+        doc_ids = [str(i + 1) for i in range(len(group))]
+        parsed = {}
+        try:
+            with span("summarize_packed"):
+                response = await self.llm.generate(packed_text(
+                    [(doc_id, result.get('content', '')) for doc_id, result in zip(doc_ids, group)]
+                ), tier="fast")
+            parsed = parse_packed_summaries(response, doc_ids)
+        except GeminiLLMError as e:
+            logging.warning(f"Packed summarization of {len(group)} sources failed: {e}")
+
+        summaries = {}
+        for doc_id, result in zip(doc_ids, group):
+            if doc_id in parsed:
+                summaries[result['url']] = parsed[doc_id]
+                self._store_summary(result, parsed[doc_id])
+            else:
+                logging.info(f"Packed answer did not cover {result['url']}; summarizing it on its own.")
+                summaries[result['url']] = await self._summarize_source(result)
+        return summaries
+
+    async def _summarize_source(self, result: dict) -> str | None:
+        """
+        Returns the summary of one search result from a single-document LLM call and
+        stores it for later cases. Returns None if the LLM call fails.
+        """
+        try:
+            with span("summarize_source"):
+                summary = await self.llm.generate(text(result.get('content', '')), tier="fast")
+        except GeminiLLMError as e:
+            logging.warning(f"Could not summarize {result['url']}: {e}")
+            return None
+        self._store_summary(result, summary)
+        return summary
+
+    def _stored_summary(self, result: dict) -> str | None:
+        """Materialized summary for the result's content and the current prompt version, if any."""
+        if not self.config.MATERIALIZED_SUMMARIES_ENABLED:
+            return None
+        content_hash = self.article_store.content_hash(result.get('content', ''))
+        summary = self.article_store.get_summary(content_hash, SUMMARY_PROMPT_VERSION)
+        record_cache("article_summary", summary is not None)
+        return summary
+
+    def _store_summary(self, result: dict, summary: str):
+        if self.config.MATERIALIZED_SUMMARIES_ENABLED:
+            content_hash = self.article_store.content_hash(result.get('content', ''))
+            self.article_store.upsert_summary(content_hash, SUMMARY_PROMPT_VERSION, result['url'], summary, self.llm.model_for("fast"))
+
     def _generate_prescription_recommendation(self, patient_data, entities, relations, kg, summaries):
         """
         Placeholder for the complex logic to generate a prescription.
@@ -139,29 +753,26 @@ class MedicalAIOrchestrator:
         """
         logging.info("Generating prescription recommendation (placeholder logic)...")
         # Example very simplistic logic:
-        possible_conditions = []
-        for symptom in patient_data['symptoms']:
-            # Query KG or synthesized info for conditions related to symptom
-            related = kg.query_related_conditions(symptom)
-            possible_conditions.extend(related)
-
-        # Remove duplicates and prioritize
-        possible_conditions = list(set(possible_conditions))
-        if not possible_conditions:
+        # Rank the KG conditions by how many of the symptoms they explain
+        ranked_conditions = kg.rank_conditions(patient_data['symptoms'], limit=5)
+        if not ranked_conditions:
             return {"status": "No specific condition identified for prescription. Recommend human review.", "details": "Please consult a doctor."}
 
-        # Select a primary condition (simplistic)
-        primary_condition = possible_conditions[0]
+        # Select the best-matching condition as the primary one
+        primary_condition = ranked_conditions[0]["condition"]
 
         # Look up typical drugs for primary_condition in KG or extracted info
         recommended_drugs = kg.query_drugs_for_condition(primary_condition)
 
-        # Check for conflicts (very basic)
+        # Check for conflicts (very basic). Report entries such as "Amlodipine 5mg QD" are
+        # normalized to the KG's drug names first so that the lookups can match.
+        allergies = set(self.medication_normalizer.canonical_names(patient_data['allergies']))
+        current_medications = self.medication_normalizer.canonical_names(patient_data['medications'])
         conflicts = []
         for drug in recommended_drugs:
-            if drug in patient_data['allergies']:
+            if drug in allergies:
                 conflicts.append(f"Patient is allergic to {drug}.")
-            for existing_med in patient_data['medications']:
+            for existing_med in current_medications:
                 if kg.check_drug_interaction(drug, existing_med):
                     conflicts.append(f"Potential interaction between {drug} and {existing_med}.")
 
@@ -169,6 +780,7 @@ class MedicalAIOrchestrator:
             return {
                 "status": "Potential issues found. Human oversight REQUIRED.",
                 "condition_considered": primary_condition,
+                "ranked_conditions": ranked_conditions,
                 "suggested_drugs_if_no_conflicts": recommended_drugs,
                 "conflicts": conflicts,
                 "details": "AI detected conflicts. A medical professional must review."
@@ -177,6 +789,7 @@ class MedicalAIOrchestrator:
             return {
                 "status": "Preliminary recommendation (requires human validation).",
                 "condition_identified": primary_condition,
+                "ranked_conditions": ranked_conditions,
                 "suggested_prescription": {
                     "drug": recommended_drugs[0] if recommended_drugs else "No specific drug recommended for this condition.",
                     "dosage": "Standard adult dose (to be confirmed by doctor)",
@@ -186,12 +799,39 @@ class MedicalAIOrchestrator:
                 "details": "This is an AI-generated suggestion. A qualified doctor must review, confirm diagnosis, and finalize the prescription considering all patient-specific factors."
             }
         
-    async def recommend_prescription(self,summaries, patient_history, current_symptoms):
+    def _llm_call_timeout(self, deadline: Deadline) -> float | None:
+        """Timeout of an LLM call under `deadline`: the time left, but at least the configured floor."""
+        if not deadline.bounded:
+            return None
+        return max(self.config.LLM_MIN_CALL_TIMEOUT_SECONDS, deadline.remaining())
+
+    async def recommend_prescription(self, summaries, patient_history, current_symptoms, tier="strong",
+                                     deadline: Deadline | None = None):
+        """
+        Recommendation from the LLM, formatted as a dict. With a bounded `deadline`, each
+        LLM call gets the time left (see _llm_call_timeout); returns None instead of
+        calling the LLM once the deadline has passed, or if a call runs out of time.
+        """
+        deadline = deadline or Deadline()
         current_symptoms = ", ".join(current_symptoms)
-        response = await self.llm.predict(text2(summaries, patient_history, current_symptoms))
-        formatted_response = text3(response)
-        formatted_response = await self.llm.predict(formatted_response)
-        print(formatted_response)
+        # generate() rather than predict(): a failed call raises GeminiLLMError instead of
+        # passing the error text on as if it were a recommendation
+        try:
+            if deadline.expired():
+                return None
+            with span("recommend"):
+                response = await self.llm.generate(text2(summaries, patient_history, current_symptoms), tier=tier,
+                                                   call_type="recommendation", timeout=self._llm_call_timeout(deadline))
+            formatted_response = text3(response)
+            if deadline.expired():
+                return None
+            with span("format_json"):
+                formatted_response = await self.llm.generate(formatted_response, tier="fast", call_type="recommendation",
+                                                             timeout=self._llm_call_timeout(deadline))
+        except GeminiLLMTimeout as e:
+            logging.warning(f"Recommendation ran out of time: {e}")
+            return None
+        logging.debug("Formatted recommendation", extra={"stage": "format_json", "payload": formatted_response})
         dict_response = await extract_from_json(formatted_response)
         return dict_response
 
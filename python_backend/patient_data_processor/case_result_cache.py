@@ -0,0 +1,165 @@
+# patient_data_processor/case_result_cache.py
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+
+from utils.metrics import record_cache
+from utils.sqlite_utils import connect
+
+
+class IdempotencyKeyConflict(ValueError):
+    """Raised when an idempotency key is reused for a different case."""
+
+
+class CaseResultCache:
+    """
+    Final results of whole cases, shared by all worker processes, so that resubmitted
+    and retried requests are answered without running the pipeline. Results are keyed
+    by a hash of the normalized report, the sorted normalized symptoms, the retrieval
+    mode and a fingerprint of everything else the result depends on (prompt versions,
+    models). An entry also records the generation of the article store it was built
+    against (DatabaseConnector.corpus_generation) and is dropped when a lookup sees a
+    different one, so new articles and summaries invalidate it; otherwise the TTL bounds
+    its staleness. Idempotency keys map to the case key of their first request.
+    """
+    def __init__(self, db_path: str = "case_results.db", ttl_seconds: float = 3600,
+                 idempotency_ttl_seconds: float = 24 * 3600):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.idempotency_ttl_seconds = idempotency_ttl_seconds
+        self._initialize_db()
+        logging.info(f"Initialized CaseResultCache at {db_path} (ttl={ttl_seconds}s)")
+
+    def _initialize_db(self):
+        conn = None
+        try:
+            conn = connect(self.db_path)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(case_results)")}
+            if columns and "corpus" not in columns:
+                # Results cached before entries recorded their corpus generation
+                conn.execute("DROP TABLE case_results")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS case_results (
+                    case_key TEXT PRIMARY KEY,
+                    result TEXT,
+                    corpus TEXT,
+                    created_at REAL,
+                    expires_at REAL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS idempotency_keys (
+                    idempotency_key TEXT PRIMARY KEY,
+                    case_key TEXT,
+                    expires_at REAL
+                )
+            """)
+            now = time.time()
+            conn.execute("DELETE FROM case_results WHERE expires_at <= ?", (now,))
+            conn.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (now,))
+            conn.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Error initializing case result cache: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def case_key(report_text: str, symptoms: list[str], retrieval_mode: str, fingerprint: str) -> str:
+        """Canonical hash of a case: case, whitespace and symptom order do not matter."""
+        canonical = json.dumps({
+            "report": " ".join((report_text or "").lower().split()),
+            "symptoms": sorted({" ".join(symptom.lower().split()) for symptom in symptoms if isinstance(symptom, str)} - {""}),
+            "retrieval_mode": retrieval_mode,
+            "fingerprint": fingerprint,
+        }, sort_keys=True)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def claim_idempotency_key(self, idempotency_key: str, case_key: str):
+        """
+        Binds an idempotency key to a case on first use. Raises IdempotencyKeyConflict
+        if the key is already bound to a different case.
+        """
+        now = time.time()
+        conn = None
+        try:
+            conn = connect(self.db_path)
+            conn.execute(
+                "INSERT OR IGNORE INTO idempotency_keys (idempotency_key, case_key, expires_at) VALUES (?, ?, ?)",
+                (idempotency_key, case_key, now + self.idempotency_ttl_seconds)
+            )
+            conn.commit()
+            row = conn.execute(
+                "SELECT case_key FROM idempotency_keys WHERE idempotency_key = ?", (idempotency_key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logging.error(f"Error reading idempotency key: {e}")
+            return
+        finally:
+            if conn:
+                conn.close()
+        if row is not None and row[0] != case_key:
+            raise IdempotencyKeyConflict("Idempotency key was already used for a different case.")
+
+    def get(self, case_key: str, corpus: str | None = None) -> dict | None:
+        """
+        The cached result, or None if there is none, it expired, or it was built
+        against a different corpus generation than `corpus`.
+        """
+        conn = None
+        row = None
+        try:
+            conn = connect(self.db_path)
+            row = conn.execute(
+                "SELECT result, corpus FROM case_results WHERE case_key = ? AND expires_at > ?",
+                (case_key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            logging.error(f"Error reading case result {case_key[:12]}: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+        if row is not None and row[1] != corpus:
+            logging.info(f"Cached case result {case_key[:12]} is stale: the article store changed.")
+            self.invalidate(case_key)
+            row = None
+        record_cache("case_result", row is not None)
+        return json.loads(row[0]) if row is not None else None
+
+    def put(self, case_key: str, result, corpus: str | None = None):
+        """Stores a result, built against corpus generation `corpus`, for the TTL."""
+        now = time.time()
+        conn = None
+        try:
+            conn = connect(self.db_path)
+            conn.execute(
+                "INSERT OR REPLACE INTO case_results (case_key, result, corpus, created_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (case_key, json.dumps(result), corpus, now, now + self.ttl_seconds)
+            )
+            conn.commit()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logging.error(f"Error caching case result {case_key[:12]}: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    def invalidate(self, case_key: str | None = None) -> int:
+        """Drops one cached result, or all of them; returns how many were removed."""
+        conn = None
+        try:
+            conn = connect(self.db_path)
+            if case_key is None:
+                cursor = conn.execute("DELETE FROM case_results")
+            else:
+                cursor = conn.execute("DELETE FROM case_results WHERE case_key = ?", (case_key,))
+            conn.commit()
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            logging.error(f"Error invalidating case results: {e}")
+            return 0
+        finally:
+            if conn:
+                conn.close()
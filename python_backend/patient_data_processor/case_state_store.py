@@ -0,0 +1,91 @@
+# patient_data_processor/case_state_store.py
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+
+from utils.metrics import record_cache
+from utils.sqlite_utils import connect
+
+
+class CaseStateStore:
+    """
+    Remembers the work done for a patient's medical report so that follow-up visits
+    with the same report only pay for what changed. State is keyed by a hash of the
+    normalized report text and holds the parsed report, the search queries already
+    run, and the evidence (per-source summaries) they produced.
+    """
+    def __init__(self, db_path: str = "case_state.db", ttl_seconds: float = 7 * 24 * 3600, max_evidence: int = 50):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_evidence = max_evidence
+        self._initialize_db()
+        logging.info(f"Initialized CaseStateStore at {db_path}")
+
+    def _initialize_db(self):
+        conn = None
+        try:
+            conn = connect(self.db_path)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS case_state (
+                    report_hash TEXT PRIMARY KEY,
+                    parsed_report TEXT,
+                    queries TEXT,
+                    evidence TEXT,
+                    updated_at REAL,
+                    expires_at REAL
+                )
+            """)
+            conn.execute("DELETE FROM case_state WHERE expires_at <= ?", (time.time(),))
+            conn.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Error initializing case state store: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def report_hash(report_text: str) -> str:
+        """Hash of the report with case and whitespace differences removed."""
+        normalized = " ".join((report_text or "").lower().split())
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def get(self, report_hash: str) -> dict | None:
+        """Returns {"parsed_report", "queries", "evidence"} for a report, or None if unknown or expired."""
+        conn = None
+        row = None
+        try:
+            conn = connect(self.db_path)
+            row = conn.execute(
+                "SELECT parsed_report, queries, evidence FROM case_state WHERE report_hash = ? AND expires_at > ?",
+                (report_hash, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            logging.error(f"Error reading case state {report_hash[:12]}: {e}")
+        finally:
+            if conn:
+                conn.close()
+        record_cache("case_state", row is not None)
+        if row is None:
+            return None
+        return {"parsed_report": json.loads(row[0]), "queries": json.loads(row[1]), "evidence": json.loads(row[2])}
+
+    def save(self, report_hash: str, parsed_report: dict, queries: list[str], evidence: list[dict]):
+        """Stores the state for a report, keeping at most `max_evidence` evidence entries."""
+        now = time.time()
+        conn = None
+        try:
+            conn = connect(self.db_path)
+            conn.execute(
+                "INSERT OR REPLACE INTO case_state (report_hash, parsed_report, queries, evidence, updated_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (report_hash, json.dumps(parsed_report), json.dumps(sorted(set(queries))),
+                 json.dumps(evidence[:self.max_evidence]), now, now + self.ttl_seconds)
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Error saving case state {report_hash[:12]}: {e}")
+        finally:
+            if conn:
+                conn.close()
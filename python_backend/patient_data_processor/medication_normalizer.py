@@ -0,0 +1,136 @@
+# patient_data_processor/medication_normalizer.py
+import functools
+import logging
+import re
+
+# Medications arrive from MedicalReportParser as free text ("Amlodipine 5mg QD",
+# "metformin 500 mg twice daily"). The normalizer splits such an entry into drug name,
+# strength, unit and frequency, and maps the name to the canonical KG entity text
+# through a lexicon of KG DRUG entities and their ontology synonyms, so that KG lookups
+# (interactions, allergies) use the same key the KG stores.
+
+# Frequency phrases -> standard abbreviation; the longest phrase wins
+FREQUENCIES = {
+    "qd": "QD", "od": "QD", "daily": "QD", "once daily": "QD", "once a day": "QD", "every day": "QD",
+    "bid": "BID", "twice daily": "BID", "twice a day": "BID",
+    "tid": "TID", "three times daily": "TID", "three times a day": "TID",
+    "qid": "QID", "four times daily": "QID", "four times a day": "QID",
+    "qhs": "QHS", "hs": "QHS", "at bedtime": "QHS", "nightly": "QHS",
+    "qam": "QAM", "every morning": "QAM",
+    "qod": "QOD", "every other day": "QOD",
+    "qw": "QW", "weekly": "QW", "once weekly": "QW", "once a week": "QW",
+    "prn": "PRN", "as needed": "PRN",
+}
+_FREQUENCY_PATTERN = re.compile(
+    r"\b(?:q\s*(\d+)\s*h|every\s+(\d+)\s+hours?|"
+    + "|".join(re.escape(phrase) for phrase in sorted(FREQUENCIES, key=len, reverse=True))
+    + r")\b"
+)
+
+UNITS = {
+    "mg": "mg", "mcg": "mcg", "ug": "mcg", "µg": "mcg", "g": "g", "gm": "g",
+    "ml": "mL", "l": "L", "unit": "units", "units": "units", "iu": "IU", "meq": "mEq", "%": "%",
+}
+_STRENGTH_PATTERN = re.compile(
+    r"(\d+(?:\.\d+)?)\s*(" + "|".join(re.escape(unit) for unit in sorted(UNITS, key=len, reverse=True)) + r")"
+    r"(?:\s*/\s*(\d+(?:\.\d+)?)?\s*(ml|l|h|hr|dose|tab|tablet))?(?![a-z])"  # e.g. 250mg/5ml
+)
+
+# Dose counts ("2 puffs", "1 tablet") are not part of the drug name
+_DOSE_COUNT_PATTERN = re.compile(
+    r"\b\d+(?:\.\d+)?\s*(?:puffs?|tablets?|tabs?|capsules?|caps?|pills?|drops?|sprays?)\b"
+)
+
+# Dosage forms and routes that are not part of the drug name
+_NOISE_PATTERN = re.compile(
+    r"\b(?:tablets?|tabs?|capsules?|caps?|pills?|puffs?|drops?|sprays?|oral(?:ly)?|po|iv|im|sc|subq|sl|inhaler|"
+    r"solution|suspension|injection|cream|ointment|patch|er|xr|sr|cr|dr|take|takes|by mouth)\b"
+)
+
+
+class MedicationNormalizer:
+    """
+    Normalizes medication entries against a lexicon of {surface form: canonical name}.
+    Results are memoized per distinct entry (`cache_size` entries).
+    """
+    def __init__(self, lexicon: dict[str, str] | None = None, cache_size: int = 4096):
+        self.lexicon = {surface.lower(): canonical.lower() for surface, canonical in (lexicon or {}).items()}
+        # One alternation of every surface form, longest first so "insulin glargine" beats "insulin"
+        surfaces = sorted(self.lexicon, key=len, reverse=True)
+        self._lexicon_pattern = re.compile(
+            r"(?<![\w-])(" + "|".join(re.escape(surface) for surface in surfaces) + r")(?![\w-])"
+        ) if surfaces else None
+        self._normalize = functools.lru_cache(maxsize=cache_size)(self._parse)
+        logging.info(f"Initialized MedicationNormalizer with {len(self.lexicon)} lexicon entries.")
+
+    @classmethod
+    def from_sources(cls, drug_names: list[str], ontology=None, cache_size: int = 4096) -> "MedicationNormalizer":
+        """
+        Lexicon of the given KG DRUG entity texts plus, for every ontology term whose name
+        or synonym is one of them, the term and all its synonyms.
+        """
+        lexicon = {name.lower(): name.lower() for name in drug_names}
+        if ontology is not None:
+            for term, data in ontology.ontology_data.get("terms", {}).items():
+                names = [term.lower()] + [synonym.lower() for synonym in data.get("synonyms", [])]
+                canonical = next((name for name in names if name in lexicon and lexicon[name] == name), None)
+                if canonical is None:
+                    continue
+                for name in names:
+                    lexicon.setdefault(name, canonical)
+        return cls(lexicon, cache_size)
+
+    def normalize(self, medication: str) -> dict:
+        """
+        Parses one medication entry. Returns {"raw", "name", "canonical", "strength",
+        "unit", "frequency", "in_lexicon"}; "canonical" is the KG entity text when the
+        name is in the lexicon and the cleaned-up name otherwise.
+        """
+        return dict(self._normalize(" ".join(medication.split())))
+
+    def normalize_all(self, medications: list[str]) -> list[dict]:
+        """Normalizes a medication list; repeated entries are parsed once."""
+        return [self.normalize(medication) for medication in medications]
+
+    def canonical_names(self, medications: list[str]) -> list[str]:
+        """The distinct canonical names of a medication list, in order."""
+        return list(dict.fromkeys(entry["canonical"] for entry in self.normalize_all(medications) if entry["canonical"]))
+
+    def _parse(self, medication: str) -> dict:
+        text = medication.lower()
+
+        # Several codes combine, e.g. "q6h prn" -> "Q6H PRN"
+        codes = []
+        for match in _FREQUENCY_PATTERN.finditer(text):
+            hours = match.group(1) or match.group(2)
+            code = f"Q{hours}H" if hours else FREQUENCIES[" ".join(match.group(0).split())]
+            if code not in codes:
+                codes.append(code)
+        frequency = " ".join(codes) or None
+        text = _FREQUENCY_PATTERN.sub(" ", text)
+
+        strength, unit = None, None
+        match = _STRENGTH_PATTERN.search(text)
+        if match:
+            strength = float(match.group(1))
+            unit = UNITS[match.group(2)] + (f"/{match.group(3) or ''}{match.group(4)}" if match.group(4) else "")
+            text = text[:match.start()] + " " + text[match.end():]
+
+        match = self._lexicon_pattern.search(text) if self._lexicon_pattern else None
+        if match:
+            name = match.group(1)
+            canonical = self.lexicon[name]
+        else:
+            text = _NOISE_PATTERN.sub(" ", _DOSE_COUNT_PATTERN.sub(" ", text))
+            name = " ".join(re.sub(r"[^\w\s-]", " ", text).split())
+            canonical = name
+
+        return {
+            "raw": medication,
+            "name": name,
+            "canonical": canonical,
+            "strength": strength,
+            "unit": unit,
+            "frequency": frequency,
+            "in_lexicon": match is not None,
+        }
@@ -1,4 +1,6 @@
 import asyncio
+import json
+import logging
 def text(text):
     new_text = f'''
 **Role:** You are a medical researcher.
@@ -11,6 +13,41 @@ def text(text):
 '''
     return new_text
 
+# Bump whenever text() changes so that materialized article summaries are regenerated
+SUMMARY_PROMPT_VERSION = "1"
+
+
+def packed_text(documents):
+    """Summarization prompt for several documents at once; `documents` is a list of (doc_id, text)."""
+    chunks = "\n".join(f"[[DOCUMENT {doc_id}]]\n{doc_text}\n" for doc_id, doc_text in documents)
+    new_text = f'''
+**Role:** You are a medical researcher.
+**Task:** Summarize each of the following documents separately. For every document, summarize the key medical findings, drug interactions, and treatment protocols. Focus on information relevant to patient care.
+
+**Documents:**
+{chunks}
+**Output:** Return only a JSON object of the form {{"summaries": [{{"id": "<document id>", "summary": "<summary>"}}]}} with exactly one entry per document, and no extra commentary.
+'''
+    return new_text
+
+
+def parse_packed_summaries(response, doc_ids):
+    """
+    Splits the answer to a packed_text() prompt into {doc_id: summary}. Documents the
+    answer does not cover are left out; returns {} if the answer is not valid JSON.
+    """
+    cleaned = response.strip().removeprefix("```json").removesuffix("```").strip()
+    try:
+        data = json.loads(cleaned)
+    except json.JSONDecodeError:
+        return {}
+    entries = data.get("summaries", []) if isinstance(data, dict) else data
+    summaries = {}
+    for entry in entries if isinstance(entries, list) else []:
+        if isinstance(entry, dict) and str(entry.get("id")) in doc_ids and str(entry.get("summary") or "").strip():
+            summaries[str(entry["id"])] = str(entry["summary"]).strip()
+    return summaries
+
 
 def text2(text,patient_history,current_symptoms):
     new_text = f'''
@@ -71,6 +108,10 @@ if __name__ == "__main__":
     print(text2(summaries, patient_history, current_symptoms))
 
 
+# Bump whenever text2() or text3() changes so that cached case results are not reused
+RECOMMENDATION_PROMPT_VERSION = "1"
+
+
 def text3(summary_prescription_text):
     prompt = f"""
 You are a medical assistant. Convert the following AI-generated prescription summary into a clean JSON object.
@@ -108,7 +149,7 @@ import json
 async def extract_from_json(json_response):
     cleaned = json_response.strip().removeprefix("```json").removesuffix("```").strip()
 
-    print(cleaned)  # Debugging line to see the raw JSON response
+    logging.debug("Raw JSON response", extra={"stage": "format_json", "payload": cleaned})
     try:
         data = json.loads(cleaned)
         assessment = data.get("assessment", "")
@@ -138,7 +179,7 @@ async def extract_from_json(json_response):
         }
 
     except json.JSONDecodeError as e:
-        print("JSON Decode Error:", e)
+        logging.warning(f"JSON Decode Error: {e}", extra={"stage": "format_json", "payload": cleaned})
         return {}
     
 
@@ -0,0 +1,200 @@
+# serve.py
+import argparse
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+from config import Config
+
+# Production launcher: binds the listening socket once and runs N uvicorn worker
+# processes on it. Workers share state only through the SQLite files named in
+# Config (WAL mode, see utils/sqlite_utils.py), so they can be added, replaced and
+# restarted independently.
+#
+#   python serve.py --workers 4 --port 8000
+#   kill -HUP <supervisor pid>    # graceful rolling restart, one worker at a time
+#   kill -TERM <supervisor pid>   # graceful shutdown
+#
+# /metrics reports the sum over all workers: each worker exports its registry to a
+# shared directory (METRICS_DIR, or a temporary directory per supervisor run).
+
+WORKER_READY_TIMEOUT_SECONDS = 120.0
+
+
+def default_workers() -> int:
+    """
+    CPUs available to this process (the affinity mask, which respects container CPU
+    sets, unlike os.cpu_count()) divided by the processes each worker occupies: itself
+    and its CPU_POOL_WORKERS pool processes.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    return max(1, cpus // (1 + Config.CPU_POOL_WORKERS))
+
+
+def _run_worker(sock: socket.socket, ready_event, worker_id: int, log_level: str, graceful_timeout: float,
+                metrics_dir: str):
+    """Entry point of one worker process."""
+    os.environ["MEDAI_WORKER_ID"] = str(worker_id)
+    from utils.metrics import enable_multiprocess_metrics
+    exported_metrics = enable_multiprocess_metrics(metrics_dir, str(worker_id))
+    import uvicorn
+    import app as app_module
+
+    def signal_when_warm():
+        app_module.warm_up_done.wait()
+        ready_event.set()
+
+    threading.Thread(target=signal_when_warm, daemon=True).start()
+    config = uvicorn.Config(
+        app_module.app,
+        log_level=log_level,
+        timeout_graceful_shutdown=graceful_timeout,
+    )
+    try:
+        uvicorn.Server(config).run(sockets=[sock])
+    finally:
+        exported_metrics.stop()
+
+
+class Supervisor:
+    def __init__(self, host: str, port: int, num_workers: int, log_level: str, graceful_timeout: float,
+                 metrics_dir: str | None = None):
+        self.host = host
+        self.port = port
+        self.num_workers = num_workers
+        self.log_level = log_level
+        self.graceful_timeout = graceful_timeout
+        self.ctx = multiprocessing.get_context("spawn")
+        self.metrics_dir = metrics_dir
+        self._owns_metrics_dir = metrics_dir is None
+        self.sock = None
+        self.workers: list = []
+        self._next_worker_id = 0
+        self._should_exit = False
+        self._should_restart = False
+
+    def _bind(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET6 if ":" in self.host else socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def _spawn(self):
+        worker_id = self._next_worker_id
+        self._next_worker_id += 1
+        ready_event = self.ctx.Event()
+        process = self.ctx.Process(
+            target=_run_worker,
+            args=(self.sock, ready_event, worker_id, self.log_level, self.graceful_timeout, self.metrics_dir),
+            name=f"medai-worker-{worker_id}",
+        )
+        process.start()
+        process.ready_event = ready_event
+        logging.info(f"Started worker {worker_id} (pid {process.pid})")
+        return process
+
+    def _stop(self, process):
+        if not process.is_alive():
+            return
+        process.terminate()  # SIGTERM: uvicorn stops accepting and drains in-flight requests
+        process.join(self.graceful_timeout + 5)
+        if process.is_alive():
+            logging.warning(f"Worker pid {process.pid} did not stop in time; killing it.")
+            process.kill()
+            process.join()
+
+    def rolling_restart(self):
+        """Replaces workers one at a time, starting each replacement before retiring the old one."""
+        logging.info("Rolling restart started.")
+        for index in range(len(self.workers)):
+            old = self.workers[index]
+            new = self._spawn()
+            if not new.ready_event.wait(WORKER_READY_TIMEOUT_SECONDS) or not new.is_alive():
+                logging.error("Replacement worker did not become ready; aborting rolling restart.")
+                self._stop(new)
+                return
+            self.workers[index] = new
+            self._stop(old)
+            if self._should_exit:
+                return
+        logging.info("Rolling restart complete.")
+
+    def _handle_exit(self, signum, frame):
+        self._should_exit = True
+
+    def _handle_hup(self, signum, frame):
+        self._should_restart = True
+
+    def _prepare_metrics_dir(self):
+        if self._owns_metrics_dir:
+            self.metrics_dir = tempfile.mkdtemp(prefix="medai-metrics-")
+            return
+        # Counts of a previous supervisor run are not part of this one
+        os.makedirs(self.metrics_dir, exist_ok=True)
+        for name in os.listdir(self.metrics_dir):
+            if name.startswith("worker-"):
+                os.remove(os.path.join(self.metrics_dir, name))
+
+    def run(self):
+        self._prepare_metrics_dir()
+        self.sock = self._bind()
+        logging.info(f"Listening on {self.host}:{self.port} with {self.num_workers} workers (supervisor pid {os.getpid()})")
+        signal.signal(signal.SIGINT, self._handle_exit)
+        signal.signal(signal.SIGTERM, self._handle_exit)
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self._handle_hup)
+
+        self.workers = [self._spawn() for _ in range(self.num_workers)]
+        try:
+            while not self._should_exit:
+                if self._should_restart:
+                    self._should_restart = False
+                    self.rolling_restart()
+                for index, process in enumerate(self.workers):
+                    if not process.is_alive() and not self._should_exit:
+                        logging.warning(f"Worker pid {process.pid} exited with code {process.exitcode}; replacing it.")
+                        self.workers[index] = self._spawn()
+                time.sleep(0.5)
+        finally:
+            logging.info("Shutting down workers...")
+            for process in self.workers:
+                if process.is_alive():
+                    process.terminate()
+            for process in self.workers:
+                self._stop(process)
+            self.sock.close()
+            if self._owns_metrics_dir:
+                shutil.rmtree(self.metrics_dir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the API with several worker processes.")
+    parser.add_argument("--host", default=Config.API_HOST)
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", Config.API_PORT)))
+    parser.add_argument("--workers", type=int, default=Config.WEB_CONCURRENCY or default_workers(),
+                        help="Number of worker processes (default: WEB_CONCURRENCY, or the available CPUs "
+                             "divided by 1 + CPU_POOL_WORKERS).")
+    parser.add_argument("--log-level", default=Config.LOG_LEVEL.lower())
+    parser.add_argument("--graceful-timeout", type=float, default=Config.GRACEFUL_SHUTDOWN_SECONDS)
+    parser.add_argument("--metrics-dir", default=Config.METRICS_DIR or None,
+                        help="Directory where workers share their metrics (default: a temporary directory).")
+    args = parser.parse_args(argv)
+    Supervisor(args.host, args.port, max(1, args.workers), args.log_level, args.graceful_timeout,
+               args.metrics_dir).run()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
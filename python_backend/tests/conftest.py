@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# Ensure the backend root is in sys.path for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
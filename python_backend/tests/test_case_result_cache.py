@@ -0,0 +1,33 @@
+# tests/test_case_result_cache.py
+from data_ingestion.database_connector import DatabaseConnector
+from patient_data_processor.case_result_cache import CaseResultCache
+
+
+def _cache_and_store(tmp_path):
+    cache = CaseResultCache(db_path=str(tmp_path / "case_results.db"))
+    store = DatabaseConnector(db_path=str(tmp_path / "medical_data.db"))
+    key = cache.case_key("Patient report", ["headache"], "full", "fingerprint")
+    return cache, store, key
+
+
+def test_unchanged_corpus_is_a_hit(tmp_path):
+    cache, store, key = _cache_and_store(tmp_path)
+    cache.put(key, {"recommendation": "rest"}, store.corpus_generation())
+    assert cache.get(key, store.corpus_generation()) == {"recommendation": "rest"}
+
+
+def test_new_article_is_a_miss(tmp_path):
+    cache, store, key = _cache_and_store(tmp_path)
+    cache.put(key, {"recommendation": "rest"}, store.corpus_generation())
+    store.insert_article("https://example.org/a", "A", "Headache treatment.", "Example", "2024-01-01", 0.9)
+    assert cache.get(key, store.corpus_generation()) is None
+    # The stale entry is dropped, not only skipped
+    assert cache.invalidate(key) == 0
+
+
+def test_replaced_summary_is_a_miss(tmp_path):
+    cache, store, key = _cache_and_store(tmp_path)
+    store.upsert_summary("hash", "v1", "https://example.org/a", "Old summary.", "model")
+    cache.put(key, {"recommendation": "rest"}, store.corpus_generation())
+    store.upsert_summary("hash", "v1", "https://example.org/a", "New summary.", "model")
+    assert cache.get(key, store.corpus_generation()) is None
@@ -0,0 +1,47 @@
+# tests/test_hedging.py
+import asyncio
+
+from utils.hedging import HedgeBudget, HedgePolicy, hedged_call
+
+
+def _policy(max_rate: float = 0.0) -> HedgePolicy:
+    return HedgePolicy("test", min_delay=0.01, max_delay=0.01, budget=HedgeBudget(max_rate=max_rate))
+
+
+async def _cancel_during_call(policy: HedgePolicy, wait: float) -> list[bool]:
+    calls = []
+
+    async def slow_call():
+        calls.append(asyncio.current_task())
+        await asyncio.sleep(10)
+
+    caller = asyncio.ensure_future(hedged_call(policy, slow_call))
+    await asyncio.sleep(wait)
+    caller.cancel()
+    try:
+        await caller
+    except asyncio.CancelledError:
+        pass
+    await asyncio.sleep(0)
+    # Checked inside the loop: asyncio.run() cancels leftover tasks when it returns
+    return [call.cancelled() for call in calls]
+
+
+def test_cancelled_caller_cancels_the_call_before_the_hedge_delay():
+    policy = HedgePolicy("test", min_delay=5, max_delay=5, budget=HedgeBudget())
+    calls = asyncio.run(_cancel_during_call(policy, 0.01))
+    assert calls == [True]
+
+
+def test_cancelled_caller_cancels_primary_and_hedge():
+    policy = _policy(max_rate=1.0)
+    policy.budget.record_call()  # a hedge is allowed once a plain call was recorded
+    calls = asyncio.run(_cancel_during_call(policy, 0.05))
+    assert calls == [True, True]
+
+
+def test_first_result_wins():
+    async def fast_call():
+        return "ok"
+
+    assert asyncio.run(hedged_call(_policy(), fast_call)) == "ok"
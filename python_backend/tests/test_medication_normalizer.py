@@ -0,0 +1,24 @@
+# tests/test_medication_normalizer.py
+from patient_data_processor.medication_normalizer import MedicationNormalizer
+
+
+def test_strength_with_quantity_per_volume():
+    entry = MedicationNormalizer().normalize("Amoxicillin 250mg/5ml TID")
+    assert entry["name"] == "amoxicillin"
+    assert entry["strength"] == 250.0
+    assert entry["unit"] == "mg/5ml"
+    assert entry["frequency"] == "TID"
+
+
+def test_dose_count_is_not_part_of_the_name():
+    entry = MedicationNormalizer().normalize("Ventolin 2 puffs as needed")
+    assert entry["name"] == "ventolin"
+    assert entry["strength"] is None
+    assert entry["frequency"] == "PRN"
+
+
+def test_lexicon_maps_synonym_to_canonical_name():
+    normalizer = MedicationNormalizer({"albuterol": "albuterol", "ventolin": "albuterol"})
+    entry = normalizer.normalize("Ventolin 2 puffs as needed")
+    assert entry["canonical"] == "albuterol"
+    assert entry["in_lexicon"]
@@ -0,0 +1,42 @@
+# tests/test_recommendation_deadline.py
+import asyncio
+import time
+
+from config import Config
+from gemini_llm import GeminiLLM
+from main import MedicalAIOrchestrator
+from utils.deadline import Deadline
+
+
+class _SlowLLM(GeminiLLM):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    async def _generate(self, prompt: str, model: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(5)
+        return "{}"
+
+
+def _orchestrator(llm: GeminiLLM) -> MedicalAIOrchestrator:
+    orchestrator = MedicalAIOrchestrator(Config(), eager=False)
+    orchestrator._components["llm"] = llm
+    return orchestrator
+
+
+def test_llm_call_is_cut_to_the_time_left(monkeypatch):
+    monkeypatch.setattr(Config, "LLM_MIN_CALL_TIMEOUT_SECONDS", 0.1)
+    orchestrator = _orchestrator(_SlowLLM())
+    started = time.monotonic()
+    result = asyncio.run(orchestrator.recommend_prescription("", "", ["cough"], deadline=Deadline(0.3)))
+    assert result is None
+    assert time.monotonic() - started < 1
+
+
+def test_no_llm_call_once_the_deadline_has_passed():
+    llm = _SlowLLM()
+    deadline = Deadline(0.001)
+    time.sleep(0.01)
+    assert asyncio.run(_orchestrator(llm).recommend_prescription("", "", ["cough"], deadline=deadline)) is None
+    assert llm.calls == 0
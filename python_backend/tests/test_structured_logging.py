@@ -0,0 +1,50 @@
+# tests/test_structured_logging.py
+import json
+import logging
+
+from utils.structured_logging import JsonFormatter, configure_logging, shutdown_logging
+
+
+def _format(formatter, message, **extra):
+    record = logging.makeLogRecord({"name": "test", "levelname": "INFO", "msg": message, **extra})
+    return json.loads(formatter.format(record))
+
+
+def test_patient_fields_are_redacted():
+    payload = {
+        "symptoms": ["chest pain", "shortness of breath"],
+        "medications": ["metoprolol 50mg"],
+        "patient_history_keywords": ["smoker"],
+    }
+    entry = _format(JsonFormatter(), "Parsed patient data", stage="parse_report", payload=payload,
+                    medical_report_text="Patient is a 54 year old smoker.")
+    assert entry["stage"] == "parse_report"
+    assert entry["payload"] == {
+        "symptoms": "[redacted 2 items]",
+        "medications": "[redacted 1 items]",
+        "patient_history_keywords": "[redacted 1 items]",
+    }
+    assert entry["medical_report_text"] == "[redacted 32 chars]"
+    assert "smoker" not in json.dumps(entry)
+
+
+def test_other_fields_are_truncated_only():
+    entry = _format(JsonFormatter(max_chars=5), "Formatted recommendation", payload={"summary": "abcdefgh"})
+    assert entry["payload"] == {"summary": "abcde... [3 chars truncated]"}
+
+
+def test_redacted_fields_are_configurable():
+    entry = _format(JsonFormatter(redact_fields={"summary"}), "x", payload={"summary": "abc", "symptoms": ["a"]})
+    assert entry["payload"] == {"summary": "[redacted 3 chars]", "symptoms": ["a"]}
+
+
+def test_shutdown_logging_can_be_called_twice():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    try:
+        configure_logging(json_format=True)
+        shutdown_logging()
+        shutdown_logging()
+    finally:
+        root.handlers[:] = handlers
+        root.setLevel(level)
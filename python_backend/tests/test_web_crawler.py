@@ -0,0 +1,78 @@
+# tests/test_web_crawler.py
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+
+import pytest
+
+from data_ingestion.web_crawler import WebCrawler
+
+BODY = "<html><body><p>Fiebre y tos — naïve</p></body></html>".encode("utf-8")
+
+
+class _BogusCharsetHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=x-bogus-enc")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def bogus_charset_url():
+    server = HTTPServer(("127.0.0.1", 0), _BogusCharsetHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}/page"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_fetch_page_with_unknown_charset_decodes_as_utf8(bogus_charset_url):
+    crawler = WebCrawler(rate_limit_seconds=0)
+    assert crawler.fetch_page(bogus_charset_url, timeout=5) == BODY.decode("utf-8")
+
+
+class _SlowDripHandler(BaseHTTPRequestHandler):
+    """Sends a byte every 50 ms: each read finishes well within any read timeout."""
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.end_headers()
+        try:
+            for _ in range(200):
+                self.wfile.write(b"x")
+                self.wfile.flush()
+                time.sleep(0.05)
+        except OSError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def slow_drip_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SlowDripHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}/page"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_fetch_page_gives_up_on_a_slow_drip_at_the_total_timeout(slow_drip_url):
+    crawler = WebCrawler(rate_limit_seconds=0)
+    started = time.monotonic()
+    assert crawler.fetch_page(slow_drip_url, timeout=0.5) is None
+    assert time.monotonic() - started < 2
+    assert crawler.stats()["deadline"] == 1
@@ -0,0 +1,124 @@
+# utils/cpu_executor.py
+import asyncio
+import concurrent.futures
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+from utils.metrics import span
+
+# Runs the CPU-bound stages of the request path (HTML parsing of crawled pages and
+# report parsing) in a pool of worker processes so they neither hold the GIL of the
+# serving process nor block its event loop. Each worker builds the parser objects
+# once, in its initializer, and reuses them for every task. With max_workers=0
+# every call runs inline in the calling process instead.
+
+_worker_state = {}
+
+
+def _init_worker():
+    from data_ingestion.web_crawler import WebCrawler
+    from patient_data_processor.report_parser import MedicalReportParser
+    logging.getLogger().setLevel(logging.WARNING)
+    _worker_state["crawler"] = WebCrawler(rate_limit_seconds=0)
+    _worker_state["report_parser"] = MedicalReportParser()
+
+
+def _ensure_state():
+    if not _worker_state:
+        _init_worker()
+    return _worker_state
+
+
+def _ping() -> bool:
+    # Keeps a worker busy briefly so that warm-up tasks land on distinct workers
+    time.sleep(0.05)
+    return True
+
+
+def _parse_html(html_content: str) -> str:
+    return _ensure_state()["crawler"].parse_html(html_content)
+
+
+def _parse_report(report_text: str) -> dict:
+    return _ensure_state()["report_parser"].parse(report_text)
+
+
+class CpuExecutor:
+    """
+    Process pool for CPU-bound stages. The async methods are awaited from the
+    orchestrator; `call()` is the blocking form for code already running off the
+    event loop (e.g. crawling in a worker thread).
+    """
+    def __init__(self, max_workers: int = 2):
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_workers > 0
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+            return self._pool
+
+    def _reset_pool(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def warm_up(self):
+        """Starts every worker process and runs its initializer ahead of the first task."""
+        if not self.enabled:
+            _ensure_state()
+            return
+        pool = self._get_pool()
+        for future in [pool.submit(_ping) for _ in range(self.max_workers)]:
+            future.result()
+        logging.info(f"CpuExecutor warmed up {self.max_workers} worker processes.")
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def call(self, fn, *args):
+        """Runs `fn(*args)` in the pool and blocks for the result."""
+        if not self.enabled:
+            return fn(*args)
+        try:
+            return self._get_pool().submit(fn, *args).result()
+        except BrokenProcessPool:
+            logging.error("CPU worker pool broke; restarting it and running the task inline.")
+            self._reset_pool()
+            return fn(*args)
+
+    async def run(self, fn, *args):
+        """Awaitable form of call(); the event loop stays free while the task runs."""
+        if not self.enabled:
+            return fn(*args)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_pool(), fn, *args)
+        except BrokenProcessPool:
+            logging.error("CPU worker pool broke; restarting it and running the task inline.")
+            self._reset_pool()
+            return fn(*args)
+
+    def parse_html_sync(self, html_content: str) -> str:
+        return self.call(_parse_html, html_content)
+
+    async def parse_report(self, report_text: str) -> dict:
+        with span("cpu.parse_report"):
+            return await self.run(_parse_report, report_text)
@@ -0,0 +1,51 @@
+# utils/deadline.py
+import math
+import time
+
+
+class Deadline:
+    """
+    A point in time by which a case should be answered, and the degradations that
+    were applied to meet it. Stages take a share of the remaining time with
+    `stage()`; all stages of a case record into the same degradation list.
+    A Deadline created without `seconds` never expires.
+    """
+    def __init__(self, seconds: float | None = None):
+        self.end = time.monotonic() + seconds if seconds else math.inf
+        self.degradations = []
+
+    def _child(self, end: float) -> "Deadline":
+        child = Deadline()
+        child.end = min(self.end, end)
+        child.degradations = self.degradations
+        return child
+
+    @property
+    def bounded(self) -> bool:
+        return self.end != math.inf
+
+    def remaining(self) -> float:
+        return max(0.0, self.end - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, default: float) -> float:
+        """`default` capped to the remaining time, for per-call timeouts."""
+        return min(default, self.remaining())
+
+    def stage(self, share: float) -> "Deadline":
+        """Deadline for a stage that may use `share` of the remaining time."""
+        if not self.bounded:
+            return self
+        return self._child(time.monotonic() + self.remaining() * share)
+
+    def reserve(self, seconds: float) -> "Deadline":
+        """Deadline that ends `seconds` before this one, keeping that time for later stages."""
+        if not self.bounded:
+            return self
+        return self._child(self.end - seconds)
+
+    def degrade(self, name: str):
+        if name not in self.degradations:
+            self.degradations.append(name)
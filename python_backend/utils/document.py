@@ -0,0 +1,201 @@
+# utils/document.py
+import collections
+import functools
+import hashlib
+import re
+import threading
+from array import array
+from bisect import bisect_left
+
+from information_synthesis.spans import Vocabulary
+from utils.metrics import record_cache
+
+# One analysis of a text, shared by every NLP stage that reads it. The text
+# preprocessor, the entity extractor, the relation extractor and TextRank used to
+# lowercase, split and regex-scan the same page independently; a Document does each
+# of these once:
+#   lower       the lowercased text, with the same length as the text (offsets index both)
+#   tokens      letter and digit runs as start/end offset arrays and ids into the
+#               document's own vocabulary
+#   sentences   sentence boundaries (NLTK Punkt), computed on first use
+#   stems       Porter stem ids per token (in the same vocabulary), on first use
+# `analyze()` returns the Document of a text from an LRU cache keyed by content hash,
+# so stages that receive the same page as a string share one analysis as well.
+# Nothing is interned process-wide: a vocabulary lives as long as its Document, and
+# the stem memo is a bounded LRU, so long-lived workers do not grow with the corpus.
+# The orchestrator's entity, relation and TextRank stages are disabled (see
+# MedicalAIOrchestrator._process_patient_case), so Documents are currently built only
+# where those stages run directly: offline extraction and benchmarks/, not the request path.
+
+TOKEN_PATTERN = re.compile(r"[^\W\d_]+|\d+")
+
+_stem_lock = threading.Lock()
+_stemmer = None
+
+DOCUMENT_CACHE_SIZE = 32
+STEM_CACHE_SIZE = 50000
+
+_nltk_data_checked = False
+
+
+def ensure_nltk_data():
+    """Downloads NLTK data if not already present. Runs once, on first use rather than at import."""
+    global _nltk_data_checked
+    if _nltk_data_checked:
+        return
+    from nltk.corpus import stopwords
+    import nltk
+    try:
+        stopwords.words('english')
+    except LookupError:
+        nltk.download('stopwords')
+    try:
+        nltk.data.find('tokenizers/punkt')
+    except LookupError:
+        nltk.download('punkt')
+    _nltk_data_checked = True
+
+
+def content_hash(text: str) -> str:
+    """Same hash as DatabaseConnector.content_hash, so stored articles and documents share keys."""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+@functools.lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem(token: str) -> str:
+    """Porter stem of a lowercase token, memoized for the most recent distinct tokens."""
+    global _stemmer
+    if _stemmer is None:
+        from nltk.stem import PorterStemmer
+        _stemmer = PorterStemmer()
+    return _stemmer.stem(token)
+
+
+def tokenize(text: str) -> list[str]:
+    """The tokens a Document would have for `text`."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def _lowercase(text: str) -> str:
+    lower = text.lower()
+    if len(lower) == len(text):
+        return lower
+    # A few characters lowercase to two (e.g. "İ"); keep those as they are so offsets stay aligned
+    return "".join(char.lower() if len(char.lower()) == 1 else char for char in text)
+
+
+class Document:
+    """
+    Shared analysis of one text; obtain it with `analyze()`. Token `i` spans
+    `text[token_starts[i]:token_ends[i]]` and is `vocabulary[token_ids[i]]`.
+    """
+    __slots__ = ("text", "lower", "content_hash", "vocabulary", "token_starts", "token_ends", "token_ids",
+                 "_positions", "_sentences", "_stem_ids")
+
+    def __init__(self, text: str, text_hash: str | None = None):
+        self.text = text
+        self.lower = _lowercase(text)
+        self.content_hash = text_hash or content_hash(text)
+        self.token_starts = array("i")
+        self.token_ends = array("i")
+        self.token_ids = array("i")
+        # Per document and not interned process-wide, so it is freed with the document
+        self.vocabulary = Vocabulary(intern_strings=False)
+        token_id = self.vocabulary.id
+        for match in TOKEN_PATTERN.finditer(self.lower):
+            self.token_starts.append(match.start())
+            self.token_ends.append(match.end())
+            self.token_ids.append(token_id(match.group()))
+        self._positions = None
+        self._sentences = None
+        self._stem_ids = None
+
+    def __len__(self):
+        return len(self.token_ids)
+
+    def token(self, index: int) -> str:
+        return self.vocabulary[self.token_ids[index]]
+
+    def positions(self, token: str) -> list[int]:
+        """Indices of the occurrences of `token`, in order."""
+        if self._positions is None:
+            positions = collections.defaultdict(list)
+            for index, token_id in enumerate(self.token_ids):
+                positions[token_id].append(index)
+            self._positions = dict(positions)
+        token_id = self.vocabulary.get(token)
+        return self._positions.get(token_id, []) if token_id is not None else []
+
+    @property
+    def sentences(self) -> list[tuple[int, int]]:
+        """(start, end) offsets of the sentences, in order."""
+        if self._sentences is None:
+            import nltk
+            ensure_nltk_data()
+            spans = []
+            position = 0
+            # Punkt returns the sentences as substrings of the text, in order
+            for sentence in nltk.sent_tokenize(self.text):
+                start = self.text.find(sentence, position)
+                if start < 0:
+                    start = position
+                position = start + len(sentence)
+                spans.append((start, position))
+            self._sentences = spans
+        return self._sentences
+
+    def sentence_text(self, index: int) -> str:
+        start, end = self.sentences[index]
+        return self.text[start:end]
+
+    def sentence_tokens(self, index: int) -> range:
+        """Indices of the tokens of sentence `index`."""
+        start, end = self.sentences[index]
+        return range(bisect_left(self.token_starts, start), bisect_left(self.token_starts, end))
+
+    @property
+    def stem_ids(self) -> array:
+        """Porter stem of every token, as ids into the document's vocabulary."""
+        if self._stem_ids is None:
+            # Stems join the vocabulary, which other threads may be reading the document through
+            with _stem_lock:
+                if self._stem_ids is None:
+                    vocabulary = self.vocabulary
+                    stem_of = {token_id: vocabulary.id(stem(vocabulary[token_id])) for token_id in set(self.token_ids)}
+                    self._stem_ids = array("i", [stem_of[token_id] for token_id in self.token_ids])
+        return self._stem_ids
+
+
+class DocumentCache:
+    """Thread-safe LRU of Documents keyed by the content hash of their text."""
+    def __init__(self, max_entries: int = DOCUMENT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: collections.OrderedDict[str, Document] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text: str) -> Document:
+        key = content_hash(text)
+        with self._lock:
+            document = self._entries.get(key)
+            if document is not None:
+                self._entries.move_to_end(key)
+        record_cache("document", document is not None)
+        if document is None:
+            document = Document(text, key)
+            with self._lock:
+                self._entries[key] = document
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return document
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+DOCUMENT_CACHE = DocumentCache()
+
+
+def analyze(text) -> Document:
+    """The Document of a text (from the cache), or `text` itself if it already is one."""
+    return text if isinstance(text, Document) else DOCUMENT_CACHE.get(text)
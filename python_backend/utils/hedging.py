@@ -0,0 +1,179 @@
+# utils/hedging.py
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+from collections import deque
+
+from config import Config
+from utils.metrics import REGISTRY
+
+# Hedged requests: if a call has not finished after roughly the p95 (configurable)
+# of its recent latencies, a duplicate is started and whichever finishes first wins.
+# A process-wide budget caps hedges to a fraction of all calls so that tail-latency
+# savings never cost more than that fraction of extra quota.
+
+HEDGES = REGISTRY.counter(
+    "medai_hedges_total",
+    "Hedged calls by call type and event (fired/won/skipped_budget).",
+    ("call", "event"),
+)
+
+
+class HedgeBudget:
+    """Allows a hedge only while hedges stay below `max_rate` of the calls in a sliding window."""
+    def __init__(self, max_rate: float = 0.05, window: int = 1000):
+        self.max_rate = max_rate
+        self._events = deque(maxlen=window)  # True for a hedge, False for a plain call
+        self._hedges = 0
+        self._lock = threading.Lock()
+
+    def _append(self, is_hedge: bool):
+        if len(self._events) == self._events.maxlen and self._events[0]:
+            self._hedges -= 1
+        self._events.append(is_hedge)
+        if is_hedge:
+            self._hedges += 1
+
+    def record_call(self):
+        with self._lock:
+            self._append(False)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            calls = sum(1 for event in self._events if not event)
+            if calls == 0 or (self._hedges + 1) / calls > self.max_rate:
+                return False
+            self._append(True)
+            return True
+
+
+GLOBAL_HEDGE_BUDGET = HedgeBudget(max_rate=Config.HEDGE_MAX_RATE)
+
+
+class HedgePolicy:
+    """
+    Hedging settings for one call type. The hedge delay is the `percentile` of the
+    last `window` latencies observed for a key (e.g. a model name), clamped to
+    [min_delay, max_delay]; until `min_samples` latencies are known `max_delay` is used.
+    """
+    def __init__(self, name: str, percentile: float = 0.95, min_delay: float = 0.05, max_delay: float = 10.0,
+                 window: int = 200, min_samples: int = 20, budget: HedgeBudget = GLOBAL_HEDGE_BUDGET):
+        self.name = name
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.window = window
+        self.min_samples = min_samples
+        self.budget = budget
+        self._latencies = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, key: str = ""):
+        with self._lock:
+            self._latencies.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def delay(self, key: str = "") -> float:
+        with self._lock:
+            samples = sorted(self._latencies.get(key, ()))
+        if len(samples) < self.min_samples:
+            return self.max_delay
+        value = samples[min(len(samples) - 1, int(self.percentile * len(samples)))]
+        return min(self.max_delay, max(self.min_delay, value))
+
+
+async def hedged_call(policy: HedgePolicy, make_call, key: str = ""):
+    """
+    Awaits `make_call()` (a coroutine factory) and, if it is still running after the
+    policy's delay and the budget allows, a second `make_call()`. Returns the first
+    successful result and cancels the other call; an exception is raised only if
+    every started call failed.
+    """
+    loop = asyncio.get_running_loop()
+    policy.budget.record_call()
+    started = loop.time()
+    primary = asyncio.ensure_future(make_call())
+    tasks = [primary]
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=policy.delay(key))
+        if done:
+            policy.observe(loop.time() - started, key)
+            return primary.result()
+        if not policy.budget.try_acquire():
+            HEDGES.inc(call=policy.name, event="skipped_budget")
+            result = await primary
+            policy.observe(loop.time() - started, key)
+            return result
+
+        HEDGES.inc(call=policy.name, event="fired")
+        hedge = asyncio.ensure_future(make_call())
+        tasks.append(hedge)
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        HEDGES.inc(call=policy.name, event="won")
+                    policy.observe(loop.time() - started, key)
+                    return task.result()
+        # Both calls failed; surface the primary's error
+        return primary.result()
+    finally:
+        # Also reached when the caller is cancelled (e.g. by a deadline), which asyncio.wait
+        # does not pass on to the calls it waits for
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge")
+        return _executor
+
+
+def hedged_call_sync(policy: HedgePolicy, fn, key: str = ""):
+    """
+    Blocking counterpart of hedged_call() for functions such as requests.get. Calls run
+    on a shared thread pool; a losing call that has already started cannot be
+    interrupted, so it is left to finish (bounded by its own timeout) and its result
+    is discarded.
+    """
+    executor = _get_executor()
+    policy.budget.record_call()
+    started = time.perf_counter()
+    primary = executor.submit(fn)
+    try:
+        result = primary.result(timeout=policy.delay(key))
+        policy.observe(time.perf_counter() - started, key)
+        return result
+    except concurrent.futures.TimeoutError:
+        pass
+    if not policy.budget.try_acquire():
+        HEDGES.inc(call=policy.name, event="skipped_budget")
+        result = primary.result()
+        policy.observe(time.perf_counter() - started, key)
+        return result
+
+    HEDGES.inc(call=policy.name, event="fired")
+    hedge = executor.submit(fn)
+    pending = {primary, hedge}
+    while pending:
+        done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is hedge:
+                    HEDGES.inc(call=policy.name, event="won")
+                for other in pending:
+                    other.cancel()
+                policy.observe(time.perf_counter() - started, key)
+                return future.result()
+    logging.debug(f"Both hedged calls of {policy.name} failed.")
+    return primary.result()
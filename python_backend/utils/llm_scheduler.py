@@ -0,0 +1,142 @@
+# utils/llm_scheduler.py
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass
+
+from utils.metrics import REGISTRY
+
+# Shared admission control for LLM calls. At most `max_concurrency` calls of this
+# process are in flight; the rest wait in a weighted fair queue (start-time fair
+# queuing). Every case is a client with its own flow, weighted by the call's priority
+# class, which combines the case's urgency with the call type: the final
+# recommendation of an urgent case is admitted ahead of the backlog of routine
+# per-source summaries, while routine cases still share the remaining capacity fairly.
+
+LLM_QUEUE_SECONDS = REGISTRY.histogram(
+    "medai_llm_queue_seconds",
+    "Time LLM calls waited for a concurrency slot, by priority class.",
+    ("priority",),
+)
+
+# Relative share of LLM capacity per flow of each priority class
+DEFAULT_WEIGHTS = {
+    "urgent_recommendation": 32.0,
+    "urgent_summary": 16.0,
+    "recommendation": 4.0,
+    "summary": 1.0,
+    "background": 0.5,
+}
+
+DEFAULT_URGENT_SYMPTOMS = (
+    "shortness of breath", "difficulty breathing", "chest pain", "severe headache", "confusion",
+    "slurred speech", "fainting", "loss of consciousness", "seizure", "severe bleeding",
+    "coughing blood", "vomiting blood", "suicidal",
+)
+
+
+@dataclass(frozen=True)
+class LLMClient:
+    """The case (or batch) on whose behalf LLM calls are made."""
+    client_id: str
+    urgent: bool = False
+
+
+_current_client: contextvars.ContextVar[LLMClient | None] = contextvars.ContextVar("llm_client", default=None)
+
+
+@contextlib.contextmanager
+def llm_client(client_id: str, urgent: bool = False):
+    """Attributes the LLM calls made inside the block (and tasks started from it) to a client."""
+    token = _current_client.set(LLMClient(client_id, urgent))
+    try:
+        yield
+    finally:
+        _current_client.reset(token)
+
+
+def is_urgent(symptoms: list[str], urgent_symptoms=DEFAULT_URGENT_SYMPTOMS) -> bool:
+    """True if any symptom mentions one of the urgent symptom phrases."""
+    return any(
+        phrase in symptom.lower()
+        for symptom in symptoms if isinstance(symptom, str)
+        for phrase in urgent_symptoms
+    )
+
+
+def priority_class(call_type: str) -> str:
+    """Priority class of a call of `call_type` made by the current client."""
+    client = _current_client.get()
+    if client is not None and client.urgent and call_type != "background":
+        return f"urgent_{call_type}"
+    return call_type
+
+
+class LLMScheduler:
+    """Bounds concurrent LLM calls and admits waiting calls in weighted fair order."""
+    def __init__(self, max_concurrency: int = 8, weights: dict[str, float] | None = None):
+        self.max_concurrency = max_concurrency
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self._active = 0
+        # Heap of (finish tag, sequence, start tag, future)
+        self._queue = []
+        self._sequence = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish: dict[tuple, float] = {}
+
+    def stats(self) -> dict:
+        return {"active": self._active, "queued": sum(1 for entry in self._queue if not entry[3].done())}
+
+    @contextlib.asynccontextmanager
+    async def slot(self, call_type: str = "summary", cost: float = 1.0):
+        """Holds one of the concurrency slots for the duration of the block."""
+        priority = priority_class(call_type)
+        client = _current_client.get()
+        started = time.perf_counter()
+        await self._acquire((priority, client.client_id if client else None), self.weights.get(priority, 1.0), cost)
+        LLM_QUEUE_SECONDS.observe(time.perf_counter() - started, priority=priority)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, flow: tuple, weight: float, cost: float):
+        start = max(self._virtual_time, self._last_finish.get(flow, 0.0))
+        finish = start + cost / weight
+        self._last_finish[flow] = finish
+        if self._active < self.max_concurrency and not self._queue:
+            self._active += 1
+            self._virtual_time = start
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (finish, next(self._sequence), start, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just before the cancellation; pass it on
+                self._release()
+            else:
+                future.cancel()
+            raise
+
+    def _release(self):
+        while self._queue:
+            _, _, start, future = heapq.heappop(self._queue)
+            if future.done():
+                continue
+            # The slot passes directly to the waiter with the smallest finish tag
+            self._virtual_time = start
+            future.set_result(None)
+            break
+        else:
+            self._active -= 1
+        if len(self._last_finish) > 4096:
+            # Flows whose last call finished in virtual time are idle; forget them
+            self._last_finish = {flow: finish for flow, finish in self._last_finish.items() if finish > self._virtual_time}
+        logging.debug(f"LLM scheduler: {self._active} active, {len(self._queue)} queued.")
@@ -0,0 +1,432 @@
+# utils/metrics.py
+import contextvars
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional, Tuple
+
+# In-process metrics with Prometheus text exposition. No external collector is
+# needed: the registry is scraped directly from the /metrics endpoint in app.py.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """
+    A monotonically increasing counter, optionally split by labels.
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(val)}" for key, val in items]
+
+    def dump(self) -> list:
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def merge(self, dumped: list):
+        """Adds the values of another process's dump()."""
+        with self._lock:
+            for key, value in dumped:
+                key = tuple(key)
+                self._values[key] = self._values.get(key, 0) + value
+
+
+class Histogram:
+    """
+    A cumulative histogram with fixed bucket boundaries, optionally split by labels.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [bucket counts..., sum, count]
+                series = [0] * len(self.buckets) + [0.0, 0]
+                self._series[key] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self, **labels) -> Optional[dict]:
+        """Returns the count and sum observed for one label set, or None if unseen."""
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            if series is None:
+                return None
+            return {"count": series[-1], "sum": series[-2]}
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for i, bound in enumerate(self.buckets):
+                cumulative += series[i]
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+    def dump(self) -> list:
+        with self._lock:
+            return [[list(key), list(series)] for key, series in self._series.items()]
+
+    def merge(self, dumped: list):
+        """Adds the series of another process's dump()."""
+        with self._lock:
+            for key, series in dumped:
+                key = tuple(key)
+                current = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+                for i, value in enumerate(series):
+                    current[i] += value
+
+
+class MetricsRegistry:
+    """
+    Holds every metric of the process and renders them in the Prometheus text format.
+    """
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def dump(self) -> dict:
+        """The state of every metric, as JSON-serializable data for merge()."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            metric.name: {
+                "kind": metric.kind,
+                "documentation": metric.documentation,
+                "labelnames": list(metric.labelnames),
+                # The +Inf bucket is implied
+                "buckets": list(metric.buckets[:-1]) if metric.kind == "histogram" else None,
+                "series": metric.dump(),
+            }
+            for metric in metrics
+        }
+
+    def merge(self, dumped: dict):
+        """Adds another process's dump() to this registry."""
+        for name, data in dumped.items():
+            if data["kind"] == "histogram":
+                metric = self.histogram(name, data["documentation"], data["labelnames"], data["buckets"])
+            else:
+                metric = self.counter(name, data["documentation"], data["labelnames"])
+            metric.merge(data["series"])
+
+
+class MultiprocessMetrics:
+    """
+    Shares the metrics of the worker processes of serve.py. Every worker writes its
+    registry to `<directory>/worker-<id>.json` every `interval` seconds (and when
+    scraped); /metrics, whichever worker serves it, renders the sum of all files, so
+    counters stay monotonic across scrapes. Files of exited workers are kept so their
+    counts are not lost.
+    """
+    def __init__(self, registry: MetricsRegistry, directory: str, worker_id: str, interval: float = 5.0):
+        self.registry = registry
+        self.directory = directory
+        self.path = os.path.join(directory, f"worker-{worker_id}.json")
+        self.interval = interval
+        self._stop = threading.Event()
+
+    def write(self):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as handle:
+                json.dump(self.registry.dump(), handle)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.error(f"Error writing metrics to {self.path}: {e}")
+
+    def start(self):
+        def loop():
+            while not self._stop.wait(self.interval):
+                self.write()
+        self.write()
+        threading.Thread(target=loop, name="metrics-export", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        self.write()
+
+    def render(self) -> str:
+        self.write()
+        merged = MetricsRegistry()
+        for path in sorted(glob.glob(os.path.join(self.directory, "worker-*.json"))):
+            try:
+                with open(path) as handle:
+                    merged.merge(json.load(handle))
+            except (OSError, ValueError) as e:
+                logging.warning(f"Skipping unreadable metrics file {path}: {e}")
+        return merged.render()
+
+
+REGISTRY = MetricsRegistry()
+_multiprocess: Optional[MultiprocessMetrics] = None
+
+
+def enable_multiprocess_metrics(directory: str, worker_id: str, interval: float = 5.0) -> MultiprocessMetrics:
+    """Makes render_metrics() report the sum over all worker processes sharing `directory`."""
+    global _multiprocess
+    os.makedirs(directory, exist_ok=True)
+    _multiprocess = MultiprocessMetrics(REGISTRY, directory, worker_id, interval)
+    _multiprocess.start()
+    return _multiprocess
+
+
+def render_metrics() -> str:
+    """The /metrics body: this process's registry, or the sum over all workers under serve.py."""
+    if _multiprocess is not None:
+        return _multiprocess.render()
+    return REGISTRY.render()
+
+SPAN_SECONDS = REGISTRY.histogram(
+    "medai_span_duration_seconds",
+    "Duration of pipeline stages and outbound calls.",
+    ("span", "kind"),
+)
+ERRORS = REGISTRY.counter(
+    "medai_errors_total",
+    "Errors by component and error type.",
+    ("component", "error"),
+)
+BYTES_FETCHED = REGISTRY.counter(
+    "medai_bytes_fetched_total",
+    "Response bytes received from outbound calls.",
+    ("source",),
+)
+RESPONSE_SIZE = REGISTRY.histogram(
+    "medai_response_size_bytes",
+    "Size of individual outbound responses.",
+    ("source",),
+    buckets=SIZE_BUCKETS,
+)
+PROMPT_SIZE = REGISTRY.histogram(
+    "medai_prompt_size_chars",
+    "Size of prompts sent to the LLM, in characters.",
+    ("model",),
+    buckets=SIZE_BUCKETS,
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "medai_cache_requests_total",
+    "Cache lookups by cache name and result (hit/miss).",
+    ("cache", "result"),
+)
+
+LLM_CALL_SECONDS = REGISTRY.histogram(
+    "medai_llm_call_duration_seconds",
+    "Duration of LLM API calls by model and outcome (ok/error/cancelled).",
+    ("model", "outcome"),
+)
+LLM_TOKENS = REGISTRY.counter(
+    "medai_llm_tokens_total",
+    "Tokens reported by the LLM API, by model and kind (prompt/completion).",
+    ("model", "kind"),
+)
+LLM_FALLBACKS = REGISTRY.counter(
+    "medai_llm_fallbacks_total",
+    "LLM calls that missed their tier's deadline and were retried on the fallback model.",
+    ("tier", "model", "fallback_model"),
+)
+
+
+class RequestTimings:
+    """
+    Per-request timing breakdown, aggregated by span name.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._spans: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            entry = self._spans.setdefault(name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            entry["count"] += 1
+            entry["total_seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            spans = {
+                name: {
+                    "count": entry["count"],
+                    "total_seconds": round(entry["total_seconds"], 6),
+                    "max_seconds": round(entry["max_seconds"], 6),
+                }
+                for name, entry in self._spans.items()
+            }
+        return {"total_seconds": round(time.perf_counter() - self.started, 6), "spans": spans}
+
+
+_current_timings: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar("medai_request_timings", default=None)
+
+
+@contextmanager
+def track_request():
+    """Collects every span entered in the current context into a fresh RequestTimings."""
+    timings = RequestTimings()
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current_timings.get()
+
+
+@contextmanager
+def span(name: str, kind: str = "stage"):
+    """
+    Times the enclosed block. The duration is recorded in the span histogram and,
+    when a request is being tracked, in that request's timing breakdown.
+    Exceptions are counted as errors of the span and re-raised.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        ERRORS.inc(component=name, error=type(e).__name__)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        SPAN_SECONDS.observe(elapsed, span=name, kind=kind)
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.record(name, elapsed)
+        logging.debug(f"Span '{name}' took {elapsed:.4f}s")
+
+
+STARTUP_PROFILE: Dict[str, float] = {}
+
+
+@contextmanager
+def startup_step(name: str):
+    """
+    Times one step of service start-up (a deferred import or a component build).
+    Durations are kept in STARTUP_PROFILE for the readiness report and recorded
+    as spans of kind "startup".
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STARTUP_PROFILE[name] = round(elapsed, 6)
+        SPAN_SECONDS.observe(elapsed, span=name, kind="startup")
+        logging.info(f"Startup step '{name}' took {elapsed:.3f}s")
+
+
+def record_error(component: str, error: str):
+    ERRORS.inc(component=component, error=error)
+
+
+def record_bytes(source: str, num_bytes: int):
+    BYTES_FETCHED.inc(num_bytes, source=source)
+    RESPONSE_SIZE.observe(num_bytes, source=source)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    with track_request() as timings:
+        with span("example.stage"):
+            time.sleep(0.01)
+        record_bytes("example", 2048)
+        record_cache("example", hit=True)
+    print(timings.as_dict())
+    print(REGISTRY.render())
@@ -0,0 +1,32 @@
+# utils/sqlite_utils.py
+import logging
+import os
+import sqlite3
+
+# All on-disk state (knowledge graph, article store, caches) is shared between worker
+# processes through SQLite. WAL mode lets readers proceed while one writer commits, the
+# busy timeout makes concurrent writers queue instead of failing with "database is
+# locked", and mmap lets every worker read the same pages from the OS page cache.
+
+BUSY_TIMEOUT_SECONDS = 30.0
+MMAP_SIZE_BYTES = 256 * 1024 * 1024
+
+_wal_enabled: set[str] = set()
+
+
+def connect(db_path: str, timeout: float = BUSY_TIMEOUT_SECONDS) -> sqlite3.Connection:
+    """Opens a connection configured for safe concurrent use from several processes."""
+    directory = os.path.dirname(db_path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=timeout)
+    if db_path not in _wal_enabled and db_path != ":memory:":
+        # journal_mode is persistent, so this only has to succeed once per database.
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            _wal_enabled.add(db_path)
+        except sqlite3.Error as e:
+            logging.warning(f"Could not enable WAL for {db_path}: {e}")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE_BYTES}")
+    return conn
@@ -0,0 +1,157 @@
+# utils/structured_logging.py
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+
+# Request-path logging that never blocks the event loop on I/O: records go onto an
+# in-memory queue and a background thread formats and writes them. Records are JSON
+# objects; values under patient-data keys (report text, symptoms, history, ...) are
+# redacted, and long messages and payloads are truncated. Verbose records (e.g. the
+# parsed patient data) carry a stage name and are kept only at that stage's
+# sampling rate. Redaction is by key only: free text in a log message is not scanned.
+
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+# Keys whose values are patient data, wherever they appear in a record's extra fields
+REDACTED_FIELDS = frozenset({
+    "medical_report_text", "report_text", "current_symptoms", "symptoms", "diagnosed_conditions",
+    "medications", "allergies", "keywords", "patient_history_keywords", "history", "queries",
+})
+
+_listener = None
+
+
+def _truncate(value, max_chars: int):
+    if isinstance(value, str):
+        return value if len(value) <= max_chars else value[:max_chars] + f"... [{len(value) - max_chars} chars truncated]"
+    if isinstance(value, dict):
+        return {key: _truncate(item, max_chars) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_truncate(item, max_chars) for item in value]
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    return _truncate(str(value), max_chars)
+
+
+def _redacted(value) -> str | None:
+    if isinstance(value, (list, tuple, set, dict)):
+        return f"[redacted {len(value)} items]"
+    return f"[redacted {len(str(value))} chars]" if value is not None else None
+
+
+def _redact(value, fields: frozenset):
+    """Replaces the values under `fields` keys, at any depth, with their size."""
+    if isinstance(value, dict):
+        return {key: _redacted(item) if key in fields else _redact(item, fields) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_redact(item, fields) for item in value]
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as one JSON line, including any `extra` fields. Values under
+    `redact_fields` keys are replaced by their size; strings are truncated to `max_chars`.
+    """
+    def __init__(self, max_chars: int = 2000, redact_fields=REDACTED_FIELDS):
+        super().__init__()
+        self.max_chars = max_chars
+        self.redact_fields = frozenset(redact_fields)
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": _truncate(record.getMessage(), self.max_chars),
+        }
+        for key, value in vars(record).items():
+            if key in _STANDARD_ATTRS or key.startswith("_"):
+                continue
+            if key in self.redact_fields:
+                entry[key] = _redacted(value)
+            else:
+                entry[key] = _truncate(_redact(value, self.redact_fields), self.max_chars)
+        if record.exc_info:
+            entry["exception"] = _truncate(self.formatException(record.exc_info), self.max_chars * 4)
+        return json.dumps(entry, default=str)
+
+
+class StageSampler(logging.Filter):
+    """Keeps a record with a `stage` attribute with that stage's rate (default 1.0)."""
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        stage = getattr(record, "stage", None)
+        if stage is None or stage not in self.rates:
+            return True
+        return random.random() < self.rates[stage]
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only merge the message arguments here; formatting happens on the listener thread.
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def parse_sample_rates(spec: str) -> dict[str, float]:
+    """Parses "stage=rate,stage=rate" (e.g. "parse_report=0.1,format_json=0")."""
+    rates = {}
+    for item in (spec or "").split(","):
+        if "=" in item:
+            stage, rate = item.split("=", 1)
+            rates[stage.strip()] = float(rate)
+    return rates
+
+
+def configure_logging(level: str = "INFO", json_format: bool = True, max_chars: int = 2000,
+                      sample_rates: dict[str, float] | None = None, text_format: str | None = None,
+                      redact_fields=REDACTED_FIELDS):
+    """
+    Routes the root logger through a queue to a background writer on stderr. Safe to
+    call more than once; later calls replace the previous configuration.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if json_format:
+        stream_handler.setFormatter(JsonFormatter(max_chars, redact_fields))
+    else:
+        stream_handler.setFormatter(logging.Formatter(text_format or '%(asctime)s - %(levelname)s - %(message)s'))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(StageSampler(sample_rates or {}))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Flushes queued records and stops the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -1,6 +1,9 @@
 import re
 import logging
 from typing import Optional
+from utils.document import Document
+
+_SEARCH_CHARS_PATTERN = re.compile(r'[^a-z0-9\s.,;:!?-]')
 
 class TextPreprocessor:
     """
@@ -10,18 +13,21 @@ class TextPreprocessor:
         self.stop_words = set(['the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'with', 'by', 'about', 'as'])
         logging.info("Initialized TextPreprocessor")
 
-    def preprocess_for_search(self, text: str) -> Optional[str]:
+    def preprocess_for_search(self, text: str | Document) -> Optional[str]:
         """
-        Preprocess text for search operations.
+        Preprocess text for search operations. A Document (see utils/document.py)
+        contributes its already lowercased text.
         """
-        if not text or not isinstance(text, str):
+        if isinstance(text, Document):
+            text = text.lower
+        elif not text or not isinstance(text, str):
             return None
-
-        # Convert to lowercase
-        text = text.lower()
+        else:
+            # Convert to lowercase
+            text = text.lower()
 
         # Remove special characters but keep spaces and basic punctuation
-        text = re.sub(r'[^a-z0-9\s.,;:!?-]', '', text)
+        text = _SEARCH_CHARS_PATTERN.sub('', text)
 
         # Remove extra whitespace
         text = ' '.join(text.split())
@@ -51,7 +57,7 @@ class TextPreprocessor:
 
         return term
 
-    def extract_keywords(self, text: str) -> list[str]:
+    def extract_keywords(self, text: str | Document) -> list[str]:
         """
         Extract keywords from medical text.
         """